@@ -1,8 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .libs.chat import internal_v1 as chat_router
+from .mods.chat.llm_registry import llm_registry, start_llm_registry
+from .mods.chat.memory_store import memory_store
+from .mods.chat.async_store import async_memory_store
+from .mods.chat.snapshot import memory_snapshots
+from .mods.chat.sweeper import memory_sweeper
+from .mods.chat.summarizer import conversation_summarizer
 
-app = FastAPI(title="Gemini Chatbot API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_llm_registry()
+    memory_snapshots.restore()
+    memory_store.start()
+    memory_sweeper.start()
+    memory_snapshots.start()
+    yield
+    await conversation_summarizer.stop()
+    await memory_sweeper.stop()
+    await memory_snapshots.stop()
+    await async_memory_store.close()
+    # Write out anything still buffered before the process exits
+    await memory_store.stop()
+    memory_store.close()
+    llm_registry.clear()
+
+
+app = FastAPI(title="Gemini Chatbot API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,4 +44,3 @@ app.include_router(chat_router)
 @app.get("/")
 def read_root():
     return {"message": "Gemini Chatbot is ready"}
-
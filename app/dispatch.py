@@ -0,0 +1,121 @@
+"""
+Front dispatcher that pins each chat session to one worker process
+
+Run one app worker per node listed in CHAT_AFFINITY_NODES, each with
+CHAT_AFFINITY_SELF set to its own URL, and put this app in front of them:
+
+    CHAT_AFFINITY_NODES=http://127.0.0.1:8001,http://127.0.0.1:8002 \\
+        uvicorn app.dispatch:app --port 8000
+"""
+import json
+import re
+from contextlib import asynccontextmanager
+from itertools import count
+from typing import Optional
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from .mods.chat.affinity import HashRing, ring_from_env
+
+
+# Headers that describe one hop and must not be forwarded
+HOP_HEADERS = frozenset((
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length"
+))
+SESSION_PATH = re.compile(r"^/api/v1/chat/session/([^/]+)")
+
+
+def _session_id(request: Request, body: bytes) -> Optional[str]:
+    """Find the session a request belongs to: header, path, then JSON body"""
+    session_id = request.headers.get("x-session-id")
+    if session_id:
+        return session_id
+    match = SESSION_PATH.match(request.url.path)
+    if match:
+        return match.group(1)
+    if body and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(payload, dict) and isinstance(payload.get("session_id"), str):
+            return payload["session_id"]
+    return None
+
+
+class Dispatcher:
+    """Routes requests with a session to the worker that owns it
+
+    Requests without one go round-robin; the worker that creates the
+    session mints an ID that hashes back to itself.
+    """
+
+    def __init__(self, ring: Optional[HashRing]):
+        self.ring = ring
+        self._next = count()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.routed = 0
+        self.unrouted = 0
+
+    def worker_for(self, session_id: Optional[str]) -> str:
+        if session_id is None:
+            self.unrouted += 1
+            return self.ring.nodes[next(self._next) % len(self.ring.nodes)]
+        self.routed += 1
+        return self.ring.node_for(session_id)
+
+    async def forward(self, request: Request) -> StreamingResponse:
+        body = await request.body()
+        worker = self.worker_for(_session_id(request, body))
+        headers = [
+            (name, value) for name, value in request.headers.items()
+            if name.lower() not in HOP_HEADERS
+        ]
+        upstream = self.client.build_request(
+            request.method, worker.rstrip("/") + request.url.path,
+            params=request.url.query, headers=headers, content=body
+        )
+        response = await self.client.send(upstream, stream=True)
+        forwarded = StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            background=BackgroundTask(response.aclose)
+        )
+        # multi_items keeps repeated headers such as Set-Cookie apart
+        for name, value in response.headers.multi_items():
+            if name.lower() not in HOP_HEADERS:
+                forwarded.headers.append(name, value)
+        return forwarded
+
+
+# None when CHAT_AFFINITY_NODES is unset; the app then refuses to start
+dispatcher = Dispatcher(ring_from_env())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if dispatcher.ring is None:
+        raise RuntimeError("The dispatcher needs CHAT_AFFINITY_NODES to list at least one worker")
+    # No read timeout: chat streams stay open for as long as generation runs
+    dispatcher.client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    yield
+    await dispatcher.client.aclose()
+
+
+app = FastAPI(title="Gemini Chatbot Dispatcher", lifespan=lifespan)
+
+
+@app.get("/dispatch/stats")
+def dispatch_stats():
+    return {
+        "nodes": dispatcher.ring.nodes if dispatcher.ring is not None else [],
+        "routed": dispatcher.routed,
+        "unrouted": dispatcher.unrouted
+    }
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def forward(request: Request):
+    return await dispatcher.forward(request)
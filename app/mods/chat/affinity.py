@@ -0,0 +1,281 @@
+"""
+Session affinity: pin each session to one worker and keep its memory local
+"""
+import os
+import uuid
+from bisect import bisect
+from hashlib import blake2b
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence
+from .memory_backend import MemoryBackend
+
+
+# Local-only marker for sessions whose shared state has been loaded
+HYDRATED_KEY = "__affinity_hydrated__"
+LOCK_STRIPES = 64
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring over worker names
+
+    Each node is placed at ``replicas`` points so sessions spread evenly,
+    and adding or removing a node only moves the sessions next to its
+    points.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 100):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(dict.fromkeys(nodes))
+        self.replicas = replicas
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """The node that owns ``key``"""
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class SessionAffinity:
+    """Which sessions this worker owns, given the ring and its own name
+
+    Disabled unless both are configured, in which case every session is
+    treated as someone else's and nothing is cached locally.
+    """
+
+    def __init__(self, ring: Optional[HashRing] = None, worker: Optional[str] = None):
+        if ring is not None and worker is not None and worker not in ring.nodes:
+            raise ValueError(f"Worker {worker!r} is not on the hash ring")
+        self.ring = ring
+        self.worker = worker
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None and self.worker is not None
+
+    def owns(self, session_id: str) -> bool:
+        return self.enabled and self.ring.node_for(session_id) == self.worker
+
+    def new_session_id(self) -> Optional[str]:
+        """A fresh session ID that hashes to this worker, or None when disabled
+
+        IDs are drawn until one lands on this worker, about one draw per
+        worker on average, so the dispatcher routes the session's later
+        turns back here.
+        """
+        if not self.enabled:
+            return None
+        for _ in range(64 * len(self.ring.nodes)):
+            session_id = str(uuid.uuid4())
+            if self.owns(session_id):
+                return session_id
+        return str(uuid.uuid4())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "worker": self.worker,
+            "nodes": self.ring.nodes if self.ring is not None else []
+        }
+
+
+class AffinityStore(MemoryBackend):
+    """A shared backend with a local, authoritative cache of owned sessions
+
+    With a dispatcher routing every request for a session to the worker
+    that owns it, that worker is the only writer of the session, so its
+    local copy never goes stale. Reads of owned sessions are served from
+    ``local``; the first touch after a restart or eviction loads the
+    session from ``shared`` once. Writes go to ``shared`` first and then
+    to ``local``, so another worker can take over a session at any time.
+
+    Sessions this worker doesn't own are passed straight to ``shared``.
+    Hydrated values get the default TTL, since ``shared`` doesn't report
+    what is left of theirs. The ring is fixed for the life of the process,
+    so ownership never changes under a live cache.
+    """
+
+    def __init__(self, local: MemoryBackend, shared: MemoryBackend, affinity: SessionAffinity):
+        self.local = local
+        self.shared = shared
+        self.affinity = affinity
+        self.default_ttl = shared.default_ttl
+        # Striped per-session locks: an owned session's hydration and writes
+        # run one at a time, so a load can't overwrite a concurrent write
+        self._locks = [Lock() for _ in range(LOCK_STRIPES)]
+        self.local_hits = 0
+        self.hydrations = 0
+        self.passthrough = 0
+
+    def _lock(self, session_id: str) -> Lock:
+        return self._locks[_hash(session_id) % LOCK_STRIPES]
+
+    def _owned(self, session_id: str) -> bool:
+        if self.affinity.owns(session_id):
+            return True
+        self.passthrough += 1
+        return False
+
+    def _hydrate(self, session_id: str) -> None:
+        """Load an owned session from ``shared`` unless it is already local. Caller must hold its lock."""
+        if self.local.retrieve(session_id, HYDRATED_KEY) is not None:
+            self.local_hits += 1
+            return
+        self.hydrations += 1
+        self.local.clear_session(session_id)
+        for key, value in self.shared.get_all(session_id).items():
+            self.local.store(session_id, key, value)
+        self.local.store(session_id, HYDRATED_KEY, True)
+
+    def _wrote(self, session_id: str, ttl_seconds: Optional[int]) -> None:
+        """Keep the marker alive at least as long as what was just written. Caller must hold the lock.
+
+        If the local copy was evicted meanwhile the marker is gone with it,
+        and is left that way so the next touch reloads the whole session.
+        """
+        if self.local.retrieve(session_id, HYDRATED_KEY) is not None:
+            ttl = max(ttl_seconds or self.default_ttl, self.default_ttl)
+            self.local.store(session_id, HYDRATED_KEY, True, ttl)
+
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        if not self.affinity.owns(session_id):
+            return self.shared.create_session(session_id)
+        with self._lock(session_id):
+            self.shared.create_session(session_id)
+            self.local.create_session(session_id)
+            self.local.store(session_id, HYDRATED_KEY, True)
+        return session_id
+
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory"""
+        if not self._owned(session_id):
+            self.shared.store(session_id, key, value, ttl_seconds, metadata)
+            return
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            self.shared.store(session_id, key, value, ttl_seconds, metadata)
+            self.local.store(session_id, key, value, ttl_seconds, metadata)
+            self._wrote(session_id, ttl_seconds)
+
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        if not self._owned(session_id):
+            return self.shared.retrieve(session_id, key)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            return self.local.retrieve(session_id, key)
+
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and return its length"""
+        if not self._owned(session_id):
+            return self.shared.append_messages(session_id, key, messages, ttl_seconds)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            self.shared.append_messages(session_id, key, messages, ttl_seconds)
+            length = self.local.append_messages(session_id, key, messages, ttl_seconds)
+            self._wrote(session_id, ttl_seconds)
+            return length
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        if not self._owned(session_id):
+            return self.shared.read_tail(session_id, key, n)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            return self.local.read_tail(session_id, key, n)
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        if not self._owned(session_id):
+            return self.shared.read_range(session_id, key, start, end)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            return self.local.read_range(session_id, key, start, end)
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        if not self._owned(session_id):
+            return self.shared.read_window(session_id, key, max_tokens, start)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            return self.local.read_window(session_id, key, max_tokens, start)
+
+    def log_length(self, session_id: str, key: str) -> int:
+        if not self._owned(session_id):
+            return self.shared.log_length(session_id, key)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            return self.local.log_length(session_id, key)
+
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        if not self._owned(session_id):
+            return self.shared.get_all(session_id)
+        with self._lock(session_id):
+            self._hydrate(session_id)
+            result = self.local.get_all(session_id)
+        result.pop(HYDRATED_KEY, None)
+        return result
+
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+        with self._lock(session_id):
+            self.local.delete(session_id, key)
+            return self.shared.delete(session_id, key)
+
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+        with self._lock(session_id):
+            self.local.clear_session(session_id)
+            return self.shared.clear_session(session_id)
+
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        return self.shared.cleanup_expired(limit) + self.local.cleanup_expired(limit)
+
+    def has_expired(self) -> bool:
+        return self.shared.has_expired() or self.local.has_expired()
+
+    def get_session_count(self) -> int:
+        return self.shared.get_session_count()
+
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        return self.shared.list_sessions(cursor, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.shared.get_stats()
+        local = self.local.get_stats()
+        stats["affinity"] = {
+            **self.affinity.get_stats(),
+            "local_sessions": local.get("active_sessions"),
+            "local_bytes": local.get("total_bytes"),
+            "local_hits": self.local_hits,
+            "hydrations": self.hydrations,
+            "passthrough": self.passthrough
+        }
+        return stats
+
+    def start(self) -> None:
+        self.shared.start()
+
+    async def stop(self) -> None:
+        await self.shared.stop()
+
+    def close(self) -> None:
+        self.shared.close()
+
+
+def ring_from_env() -> Optional[HashRing]:
+    """The ring listed in CHAT_AFFINITY_NODES, or None when it is unset"""
+    nodes = [node.strip() for node in os.getenv("CHAT_AFFINITY_NODES", "").split(",") if node.strip()]
+    return HashRing(nodes) if nodes else None
+
+
+session_affinity = SessionAffinity(ring_from_env(), os.getenv("CHAT_AFFINITY_SELF") or None)
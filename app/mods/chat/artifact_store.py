@@ -0,0 +1,162 @@
+"""
+Content-addressed storage for generated code files
+"""
+import os
+import re
+import hashlib
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+_ARTIFACT_ID = re.compile(r'^[0-9a-f]{64}$')
+
+
+def artifact_id(content: str) -> str:
+    """SHA-256 of the UTF-8 content, which is also the artifact's ETag"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def is_artifact_id(value: str) -> bool:
+    return bool(_ARTIFACT_ID.match(value))
+
+
+class ArtifactStore:
+    """Deduplicated file contents keyed by their SHA-256.
+
+    Identical contents are held once no matter how many sessions or turns
+    produce them. Memory is an LRU bounded by ``max_bytes``; when a
+    ``directory`` is configured every artifact is also written there, so
+    memory acts as a cache and evicted artifacts can still be served.
+    Without one the store is not ``durable``: IDs stop resolving after
+    eviction or a restart, and on other workers.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        # artifact ID -> (content, size in UTF-8 bytes)
+        self._cache: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.puts = 0
+        self.dedup_hits = 0
+        self.evictions = 0
+        self.disk_reads = 0
+        self.rejected = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def durable(self) -> bool:
+        """Whether IDs stay resolvable, so history may hold references alone"""
+        return bool(self.directory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _write_file(self, key: str, content: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _cache_put(self, key: str, content: str, size: int) -> None:
+        """Caller must hold the lock"""
+        if size > self.max_bytes:
+            return
+        self._cache[key] = (content, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._cache.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def put(self, content: str) -> Optional[str]:
+        """Store ``content`` and return its artifact ID
+
+        Returns None if it can't be kept at all: larger than the cache,
+        with no directory to write it to. May write to disk, so call it
+        off the event loop.
+        """
+        data = content.encode("utf-8")
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.puts += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.dedup_hits += 1
+                return key
+            if len(data) > self.max_bytes and not self.directory:
+                self.rejected += 1
+                return None
+        # Cache only once the file exists, so a failed write can't leave a
+        # dedup hit pointing at an artifact that was never stored
+        if self.directory:
+            self._write_file(key, content)
+        with self._lock:
+            if key not in self._cache:
+                self._cache_put(key, content, len(data))
+        return key
+
+    def put_many(self, contents: Iterable[str]) -> List[Optional[str]]:
+        return [self.put(content) for content in contents]
+
+    def contains(self, key: str) -> bool:
+        if not is_artifact_id(key):
+            return False
+        with self._lock:
+            if key in self._cache:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[str]:
+        if not is_artifact_id(key):
+            return None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached[0]
+        if not self.directory:
+            return None
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.disk_reads += 1
+            if key not in self._cache:
+                self._cache_put(key, content, len(content.encode("utf-8")))
+        return content
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached_artifacts": len(self._cache),
+                "cached_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "directory": self.directory,
+                "puts": self.puts,
+                "dedup_hits": self.dedup_hits,
+                "evictions": self.evictions,
+                "disk_reads": self.disk_reads,
+                "rejected": self.rejected
+            }
+
+
+artifact_store = ArtifactStore(
+    max_bytes=int(os.getenv("CHAT_ARTIFACT_CACHE_BYTES", str(64 * 1024 * 1024))),
+    directory=os.getenv("CHAT_ARTIFACT_DIR") or None
+)
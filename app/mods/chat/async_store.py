@@ -0,0 +1,77 @@
+"""
+Awaitable access to the session memory backend for code on the event loop
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from .memory_backend import AsyncMemoryStore, MemoryBackend
+from .memory_store import memory_store
+
+
+class ExecutorAsyncStore(AsyncMemoryStore):
+    """Runs a synchronous backend's calls on a dedicated thread pool
+
+    The pool is separate from the loop's default executor, so memory
+    calls never queue behind unrelated blocking work and vice versa.
+    Calls from one coroutine still run in the order they are awaited.
+    """
+
+    def __init__(self, backend: MemoryBackend, max_workers: int = 8):
+        self.backend = backend
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-store")
+        self.calls = 0
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self.calls += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+    async def create_session(self, session_id: Optional[str] = None) -> str:
+        return await self._call(self.backend.create_session, session_id)
+
+    async def get(self, session_id: str, key: str) -> Optional[Any]:
+        return await self._call(self.backend.retrieve, session_id, key)
+
+    async def set(self, session_id: str, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        await self._call(self.backend.store, session_id, key, value, ttl_seconds)
+
+    async def append(self, session_id: str, key: str, messages: List[Any],
+                     ttl_seconds: Optional[int] = None) -> int:
+        return await self._call(self.backend.append_messages, session_id, key, messages, ttl_seconds)
+
+    async def expire(self, session_id: str, key: Optional[str] = None) -> bool:
+        if key is None:
+            return await self._call(self.backend.clear_session, session_id)
+        return await self._call(self.backend.delete, session_id, key)
+
+    async def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        return await self._call(self.backend.read_tail, session_id, key, n)
+
+    async def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        return await self._call(self.backend.read_range, session_id, key, start, end)
+
+    async def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        return await self._call(self.backend.read_window, session_id, key, max_tokens, start)
+
+    async def log_length(self, session_id: str, key: str) -> int:
+        return await self._call(self.backend.log_length, session_id, key)
+
+    async def close(self) -> None:
+        # Let queued writes finish without blocking the loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": "executor", "max_workers": self.max_workers, "calls": self.calls}
+
+
+def create_async_store(backend: MemoryBackend) -> AsyncMemoryStore:
+    """Use the backend's native async client when it has one, otherwise a thread pool"""
+    from .redis_store import AsyncRedisStore, RedisStore, redis
+    if type(backend) is RedisStore and redis is not None:
+        return AsyncRedisStore(backend)
+    return ExecutorAsyncStore(backend, max_workers=int(os.getenv("CHAT_MEMORY_EXECUTOR_THREADS", "8")))
+
+
+async_memory_store = create_async_store(memory_store)
@@ -1,64 +1,13 @@
-import re
-import json
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncGenerator, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from .code_stream import CodeFileStreamParser, CodeStreamEvent
+from .intent import classify_intent
+from .json_extract import parse_json_object
 
 
-@dataclass
-class CodeFile:
-    filename: str
-    content: str
-    language: str
-
-
-@dataclass
-class CodeGenerationResult:
-    files: List[CodeFile]
-    description: str
-
-
-class CodeGenerator:
-    def __init__(self, api_key: str, model: str = "gemini-1.5-flash"):
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=api_key,
-            temperature=0.3
-        )
-    
-    def is_programming_question(self, message: str) -> bool:
-        """Detect if the message is asking for code generation"""
-        programming_keywords = [
-            'create', 'build', 'make', 'write', 'generate', 'code',
-            'html', 'css', 'javascript', 'js', 'python', 'react',
-            'component', 'function', 'class', 'button', 'form',
-            'website', 'page', 'app', 'application', 'script'
-        ]
-        
-        code_patterns = [
-            r'\b(html|css|js|javascript|python|react|vue|angular)\b',
-            r'\b(create|build|make|write|generate)\s+(a|an)?\s*(button|form|component|page|website|app)',
-            r'\b(show me|give me|can you)\s+(code|example)',
-            r'\bfiles?\s+(for|with)',
-            r'\b(frontend|backend|full.?stack)\b'
-        ]
-        
-        message_lower = message.lower()
-        
-        # Check for programming keywords
-        keyword_matches = sum(1 for keyword in programming_keywords if keyword in message_lower)
-        
-        # Check for code patterns
-        pattern_matches = sum(1 for pattern in code_patterns if re.search(pattern, message_lower))
-        
-        # Consider it a programming question if we have multiple indicators
-        return keyword_matches >= 2 or pattern_matches >= 1
-    
-    async def generate_code(self, user_request: str) -> CodeGenerationResult:
-        """Generate code files based on user request"""
-        
-        system_prompt = """You are a code generation assistant. When a user asks for code, you should:
+CODE_GENERATION_PROMPT = """You are a code generation assistant. When a user asks for code, you should:
 
 1. Analyze what they're asking for
 2. Generate the appropriate code files
@@ -96,10 +45,61 @@ Rules:
 
 Generate code for the following request:"""
 
-        messages = [
-            SystemMessage(content=system_prompt),
+
+@dataclass
+class CodeFile:
+    filename: str
+    content: str
+    language: str
+
+
+@dataclass
+class CodeGenerationResult:
+    files: List[CodeFile]
+    description: str
+
+
+def _result_from_data(result_data) -> Optional[CodeGenerationResult]:
+    """Build a result from the decoded generator JSON, or None if it doesn't fit the schema"""
+    if not isinstance(result_data, dict) or not isinstance(result_data.get('files'), list):
+        return None
+    
+    files = []
+    for file_data in result_data['files']:
+        files.append(CodeFile(
+            filename=file_data['filename'],
+            content=file_data['content'],
+            language=file_data['language']
+        ))
+    
+    return CodeGenerationResult(
+        files=files,
+        description=result_data.get('description', 'Generated code files')
+    )
+
+
+class CodeGenerator:
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-1.5-flash",
+                 llm: Optional[ChatGoogleGenerativeAI] = None):
+        self.llm = llm or ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=0.3
+        )
+    
+    def is_programming_question(self, message: str) -> bool:
+        """Detect if the message is asking for code generation"""
+        return classify_intent(message).is_programming
+    
+    def _build_messages(self, user_request: str) -> List[BaseMessage]:
+        return [
+            SystemMessage(content=CODE_GENERATION_PROMPT),
             HumanMessage(content=user_request)
         ]
+    
+    async def generate_code(self, user_request: str) -> CodeGenerationResult:
+        """Generate code files based on user request"""
+        messages = self._build_messages(user_request)
         
         try:
             response = await self.llm.ainvoke(messages)
@@ -108,33 +108,19 @@ Generate code for the following request:"""
             content = response.content.strip()
             
             # Try to find JSON in the response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                result_data = json.loads(json_str)
-                
-                files = []
-                for file_data in result_data.get('files', []):
-                    files.append(CodeFile(
-                        filename=file_data['filename'],
-                        content=file_data['content'],
-                        language=file_data['language']
-                    ))
-                
-                return CodeGenerationResult(
-                    files=files,
-                    description=result_data.get('description', 'Generated code files')
-                )
-            else:
-                # Fallback: treat entire response as a single file
-                return CodeGenerationResult(
-                    files=[CodeFile(
-                        filename="generated_code.txt",
-                        content=content,
-                        language="text"
-                    )],
-                    description="Generated code"
-                )
+            result = _result_from_data(parse_json_object(content))
+            if result is not None:
+                return result
+            
+            # Fallback: treat entire response as a single file
+            return CodeGenerationResult(
+                files=[CodeFile(
+                    filename="generated_code.txt",
+                    content=content,
+                    language="text"
+                )],
+                description="Generated code"
+            )
                 
         except Exception as e:
             # Return error as a text file
@@ -146,7 +132,67 @@ Generate code for the following request:"""
                 )],
                 description="Error occurred during code generation"
             )
+    
+    async def stream_code(self, user_request: str) -> AsyncGenerator[Union[CodeStreamEvent, CodeGenerationResult], None]:
+        """Stream code generation, yielding file events as each file arrives.
+
+        The final item is always the complete CodeGenerationResult.
+        """
+        parser = CodeFileStreamParser()
+        parts = []
+        
+        try:
+            async for chunk in self.llm.astream(self._build_messages(user_request)):
+                if not chunk.content:
+                    continue
+                parts.append(chunk.content)
+                for event in parser.feed(chunk.content):
+                    yield event
+        except Exception as e:
+            yield CodeGenerationResult(
+                files=[CodeFile(
+                    filename="error.txt",
+                    content=f"Error generating code: {str(e)}",
+                    language="text"
+                )],
+                description="Error occurred during code generation"
+            )
+            return
+        
+        if parser.finished and parser.files:
+            yield CodeGenerationResult(
+                files=[CodeFile(**file_data) for file_data in parser.files],
+                description=parser.description or 'Generated code files'
+            )
+            return
+        
+        # The stream parser latches onto the first brace; if that was prose,
+        # look for the real object (e.g. inside a ```json fence) in the full text
+        content = "".join(parts).strip()
+        index = len(parser.files)
+        result = _result_from_data(parse_json_object(content))
+        if result is not None:
+            for offset, file in enumerate(result.files):
+                yield CodeStreamEvent(type="file_start", index=index + offset, filename=file.filename, language=file.language)
+                yield CodeStreamEvent(type="file_chunk", index=index + offset, content=file.content)
+                yield CodeStreamEvent(type="file_end", index=index + offset, filename=file.filename, language=file.language)
+            yield result
+            return
+        
+        # Fallback: treat entire response as a single file
+        yield CodeStreamEvent(type="file_start", index=index, filename="generated_code.txt", language="text")
+        yield CodeStreamEvent(type="file_chunk", index=index, content=content)
+        yield CodeStreamEvent(type="file_end", index=index, filename="generated_code.txt", language="text")
+        yield CodeGenerationResult(
+            files=[CodeFile(
+                filename="generated_code.txt",
+                content=content,
+                language="text"
+            )],
+            description="Generated code"
+        )
 
 
-def create_code_generator(api_key: str, model: str = "gemini-1.5-flash") -> CodeGenerator:
-    return CodeGenerator(api_key=api_key, model=model)
\ No newline at end of file
+def create_code_generator(api_key: Optional[str] = None, model: str = "gemini-1.5-flash",
+                          llm: Optional[ChatGoogleGenerativeAI] = None) -> CodeGenerator:
+    return CodeGenerator(api_key=api_key, model=model, llm=llm)
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+Incremental parser for streamed code generation responses
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR = re.compile(r'[^\s,:\[\]{}"]+')
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+_DECODER = json.JSONDecoder(strict=False)
+
+
+@dataclass
+class CodeStreamEvent:
+    """Single event produced while a code generation response streams in.
+
+    ``type`` is one of ``file_start``, ``file_chunk`` or ``file_end``.
+    """
+    type: str
+    index: int
+    filename: Optional[str] = None
+    language: Optional[str] = None
+    content: Optional[str] = None
+
+
+def _decode_string(raw: str) -> str:
+    return _DECODER.decode('"' + raw + '"')
+
+
+def _safe_cut(raw: str) -> int:
+    """Length of the prefix of a raw JSON string body that can be decoded now.
+
+    Holds back a trailing incomplete escape sequence, and a trailing high
+    surrogate whose low half hasn't arrived yet.
+    """
+    end = len(raw)
+    for _ in range(2):
+        backslash = raw.rfind('\\', max(0, end - 6), end)
+        if backslash == -1:
+            return end
+        run_start = backslash
+        while run_start > 0 and raw[run_start - 1] == '\\':
+            run_start -= 1
+        if (backslash - run_start) % 2 == 1:
+            # Second half of an escaped backslash, so nothing is pending
+            return end
+        length = 6 if backslash + 1 < end and raw[backslash + 1] == 'u' else 2
+        if backslash + length > end:
+            end = backslash
+            continue
+        if length == 6 and backslash + 6 == end and _HIGH_SURROGATE.search(raw, 0, end):
+            end = backslash
+            continue
+        return end
+    return end
+
+
+class _Frame:
+    __slots__ = ("is_object", "key", "expect_key", "index", "file")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key: Optional[str] = None
+        self.expect_key = is_object
+        self.index = -1
+        self.file: Optional[Dict[str, Any]] = None
+
+
+class CodeFileStreamParser:
+    """Parses the code generator's JSON schema as it streams in.
+
+    Expected shape::
+
+        {"description": "...", "files": [{"filename": ..., "language": ..., "content": ...}]}
+
+    ``feed`` returns file events as soon as they can be emitted: a file starts
+    when its ``content`` string opens, chunks follow as the string is decoded,
+    and the file ends when its object closes. Text before the first ``{`` (such
+    as a markdown fence) and anything after the closing ``}`` is ignored.
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._started = False
+        self.finished = False
+        self.description: Optional[str] = None
+        self.files: List[Dict[str, Any]] = []
+
+        self._in_string = False
+        self._string_is_key = False
+        self._string_streams = False
+        self._escape = False
+        self._raw: List[str] = []
+        self._in_scalar = False
+
+    def _begin_value(self) -> None:
+        if self._stack and not self._stack[-1].is_object:
+            self._stack[-1].index += 1
+
+    def _current_file(self) -> Optional[Dict[str, Any]]:
+        if len(self._stack) == 3 and self._stack[0].key == "files" and not self._stack[1].is_object:
+            return self._stack[2].file
+        return None
+
+    def _open_string(self, events: List[CodeStreamEvent]) -> None:
+        frame = self._stack[-1] if self._stack else None
+        self._in_string = True
+        self._string_is_key = bool(frame and frame.is_object and frame.expect_key)
+        self._string_streams = False
+        self._raw = []
+        if self._string_is_key:
+            return
+
+        self._begin_value()
+        file = self._current_file()
+        if file is not None and frame.key == "content" and file["filename"] is not None:
+            self._string_streams = True
+            if not file["started"]:
+                file["started"] = True
+                events.append(CodeStreamEvent(
+                    type="file_start",
+                    index=file["index"],
+                    filename=file["filename"],
+                    language=file["language"]
+                ))
+
+    def _flush_stream(self, events: List[CodeStreamEvent], final: bool) -> None:
+        raw = "".join(self._raw)
+        cut = len(raw) if final else _safe_cut(raw)
+        if cut == 0:
+            self._raw = [raw] if raw else []
+            return
+        text = _decode_string(raw[:cut])
+        self._raw = [raw[cut:]] if cut < len(raw) else []
+        if text:
+            file = self._current_file()
+            file["content"].append(text)
+            events.append(CodeStreamEvent(type="file_chunk", index=file["index"], content=text))
+
+    def _close_string(self, events: List[CodeStreamEvent]) -> None:
+        self._in_string = False
+        frame = self._stack[-1] if self._stack else None
+
+        if self._string_streams:
+            self._flush_stream(events, final=True)
+            return
+
+        value = _decode_string("".join(self._raw))
+        self._raw = []
+        if self._string_is_key:
+            frame.key = value
+            frame.expect_key = False
+            return
+
+        if len(self._stack) == 1 and frame.key == "description":
+            self.description = value
+            return
+
+        file = self._current_file()
+        if file is not None and frame.key in ("filename", "language", "content"):
+            if frame.key == "content":
+                file["content"].append(value)
+            else:
+                file[frame.key] = value
+
+    def _open_container(self, is_object: bool) -> None:
+        self._begin_value()
+        frame = _Frame(is_object)
+        self._stack.append(frame)
+        if is_object and len(self._stack) == 3 and self._stack[0].key == "files" \
+                and not self._stack[1].is_object:
+            frame.file = {
+                "index": self._stack[1].index,
+                "filename": None,
+                "language": None,
+                "content": [],
+                "started": False
+            }
+
+    def _close_container(self, events: List[CodeStreamEvent]) -> None:
+        file = self._current_file()
+        if file is not None:
+            if not file["started"]:
+                events.append(CodeStreamEvent(
+                    type="file_start",
+                    index=file["index"],
+                    filename=file["filename"],
+                    language=file["language"]
+                ))
+                if file["content"]:
+                    events.append(CodeStreamEvent(
+                        type="file_chunk",
+                        index=file["index"],
+                        content="".join(file["content"])
+                    ))
+            content = "".join(file["content"])
+            self.files.append({
+                "filename": file["filename"] or f"file_{file['index'] + 1}.txt",
+                "language": file["language"] or "text",
+                "content": content
+            })
+            events.append(CodeStreamEvent(
+                type="file_end",
+                index=file["index"],
+                filename=file["filename"],
+                language=file["language"]
+            ))
+
+        self._stack.pop()
+        if not self._stack:
+            self.finished = True
+
+    def feed(self, text: str) -> List[CodeStreamEvent]:
+        """Consume the next piece of the response and return any new events"""
+        events: List[CodeStreamEvent] = []
+        pos = 0
+        length = len(text)
+
+        if not self._started:
+            pos = text.find("{")
+            if pos == -1:
+                return events
+            self._started = True
+
+        while pos < length and not self.finished:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._raw.append(text[pos])
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    self._raw.append(text[pos:])
+                    pos = length
+                    break
+                special = match.start()
+                if text[special] == '"':
+                    self._raw.append(text[pos:special])
+                    pos = special + 1
+                    self._close_string(events)
+                    continue
+                # Backslash: keep it and the escaped character together
+                if special + 1 < length:
+                    self._raw.append(text[pos:special + 2])
+                    pos = special + 2
+                else:
+                    self._raw.append(text[pos:])
+                    self._escape = True
+                    pos = length
+                continue
+
+            char = text[pos]
+            if char == '"':
+                self._in_scalar = False
+                self._open_string(events)
+                pos += 1
+            elif char == '{' or char == '[':
+                self._in_scalar = False
+                self._open_container(char == '{')
+                pos += 1
+            elif char == '}' or char == ']':
+                self._in_scalar = False
+                self._close_container(events)
+                pos += 1
+            elif char == ':':
+                self._in_scalar = False
+                pos += 1
+            elif char == ',':
+                self._in_scalar = False
+                if self._stack and self._stack[-1].is_object:
+                    self._stack[-1].expect_key = True
+                pos += 1
+            elif char.isspace():
+                self._in_scalar = False
+                pos += 1
+            else:
+                match = _SCALAR.match(text, pos)
+                if not self._in_scalar:
+                    self._begin_value()
+                self._in_scalar = match.end() == length
+                pos = match.end()
+
+        if self._in_string and self._string_streams and self._raw:
+            self._flush_stream(events, final=False)
+
+        return events
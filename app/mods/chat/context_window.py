@@ -0,0 +1,50 @@
+"""
+Token-budgeted selection of conversation history
+"""
+import os
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, List, Sequence
+
+
+# Rough Gemini tokenization for English text and code, plus a small fixed cost
+# per message for role and turn markers.
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for one message's content"""
+    return TOKENS_PER_MESSAGE + (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: Any) -> int:
+    content = getattr(message, "content", None)
+    if not isinstance(content, str):
+        content = str(message)
+    return estimate_tokens(content)
+
+
+def window_start(cumulative: Sequence[int], max_tokens: int, lo: int = 0) -> int:
+    """First index whose suffix fits in ``max_tokens``.
+
+    ``cumulative`` holds prefix sums with a leading 0, so the tokens in
+    messages ``[i:]`` are ``cumulative[-1] - cumulative[i]``.
+    """
+    length = len(cumulative) - 1
+    return bisect_left(cumulative, cumulative[-1] - max_tokens, lo, length)
+
+
+class ContextWindow:
+    """Selects the newest messages that fit in a token budget"""
+
+    def __init__(self, max_tokens: int = 8000):
+        self.max_tokens = max_tokens
+
+    def select(self, messages: List[Any]) -> List[Any]:
+        """Window a plain list, e.g. history supplied by the client"""
+        cumulative = [0, *accumulate(message_tokens(message) for message in messages)]
+        return messages[window_start(cumulative, self.max_tokens):]
+
+
+context_window = ContextWindow(max_tokens=int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "8000")))
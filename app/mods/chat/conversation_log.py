@@ -0,0 +1,121 @@
+"""
+Append-only message log for a chat session
+"""
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from .context_window import message_tokens, window_start
+from .models import ChatMessage
+
+
+# Roles stored as a one-byte code; anything else is kept as the original object
+ROLES = ("user", "assistant", "system")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+LOOSE = 255
+
+
+class ConversationLog:
+    """Messages for one session, stored in a packed form
+
+    ``ChatMessage`` objects carry pydantic's per-instance overhead, which
+    dominates memory once a process holds many long histories. The log
+    instead keeps parallel arrays: a role code byte per message, all
+    contents UTF-8 encoded back to back in one buffer with their end
+    offsets, and a running prefix sum of token estimates, so windows can
+    be chosen by binary search. Artifact references and messages that
+    don't fit the packed form are kept as-is by index. Lone surrogates,
+    which JSON requests can carry, are encoded with ``surrogatepass``.
+
+    Messages are rebuilt as ``ChatMessage`` only when read, so reading the
+    last ``n`` messages costs O(n) however long the log is.
+    """
+    __slots__ = ("_roles", "_text", "_offsets", "_cumulative_tokens", "_loose")
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        self._roles = bytearray()
+        self._text = bytearray()
+        self._offsets = array("Q", (0,))
+        self._cumulative_tokens = array("q", (0,))
+        self._loose: Dict[int, Any] = {}
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self._roles)):
+            yield self._message(index)
+
+    def append(self, message: Any) -> None:
+        index = len(self._roles)
+        code = _ROLE_CODES.get(message.role, LOOSE) if type(message) is ChatMessage else LOOSE
+        if code == LOOSE:
+            self._loose[index] = message
+        else:
+            self._text += message.content.encode("utf-8", "surrogatepass")
+            if message.artifacts is not None:
+                self._loose[index] = message.artifacts
+        self._roles.append(code)
+        self._offsets.append(len(self._text))
+        self._cumulative_tokens.append(self._cumulative_tokens[-1] + message_tokens(message))
+
+    def copy(self) -> "ConversationLog":
+        """Copy the packed buffers without rebuilding any message"""
+        log = ConversationLog.__new__(ConversationLog)
+        log._roles = self._roles[:]
+        log._text = self._text[:]
+        log._offsets = self._offsets[:]
+        log._cumulative_tokens = self._cumulative_tokens[:]
+        log._loose = self._loose.copy()
+        return log
+
+    def _message(self, index: int) -> Any:
+        code = self._roles[index]
+        if code == LOOSE:
+            return self._loose[index]
+        content = self._text[self._offsets[index]:self._offsets[index + 1]].decode("utf-8", "surrogatepass")
+        artifacts = self._loose.get(index)
+        if artifacts is None:
+            return ChatMessage(role=ROLES[code], content=content)
+        return ChatMessage(role=ROLES[code], content=content, artifacts=artifacts)
+
+    @property
+    def token_count(self) -> int:
+        return self._cumulative_tokens[-1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the packed arrays; objects from ``loose()`` come on top"""
+        return (sys.getsizeof(self) + sys.getsizeof(self._roles) + sys.getsizeof(self._text)
+                + sys.getsizeof(self._offsets) + sys.getsizeof(self._cumulative_tokens)
+                + sys.getsizeof(self._loose))
+
+    def loose(self, start: int = 0) -> List[Any]:
+        """Objects kept as-is for messages at or after ``start``"""
+        result = []
+        for index in reversed(self._loose):
+            if index < start:
+                break
+            result.append(self._loose[index])
+        return result
+
+    def extend(self, messages: Iterable[Any]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def slice(self, start: int, end: Optional[int] = None) -> List[Any]:
+        """Return messages ``[start:end]`` in O(end - start)"""
+        length = len(self._roles)
+        end = length if end is None else min(end, length)
+        return [self._message(index) for index in range(max(0, start), end)]
+
+    def tail(self, n: Optional[int] = None) -> List[Any]:
+        """Return the last ``n`` messages (all of them if ``n`` is None), oldest first"""
+        if n is None:
+            return self.slice(0)
+        return self.slice(len(self._roles) - max(0, n))
+
+    def window(self, max_tokens: int, start: int = 0) -> List[Any]:
+        """Return the newest messages at or after ``start`` whose tokens fit in ``max_tokens``"""
+        first = window_start(self._cumulative_tokens, max_tokens, lo=min(start, len(self._roles)))
+        return self.slice(first)
@@ -1,37 +1,81 @@
 import os
 import json
-from typing import Dict, Any, List, AsyncGenerator
-from dataclasses import dataclass
+import asyncio
+from typing import Dict, Any, List, AsyncGenerator, Optional
+from dataclasses import dataclass, field
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from .code_generator import create_code_generator, CodeGenerator
+from .code_generator import create_code_generator, CodeGenerator, CodeGenerationResult
+from .code_stream import CodeStreamEvent
+from .artifact_store import artifact_store
+from .router import intent_router, ROUTE_CODE
+
+
+@dataclass
+class ChatTurnResult:
+    """What a turn produced, filled in by ``stream_chat`` as it streams.
+
+    ``text`` is the assistant's reply alone, without the wire framing, so it
+    can be stored and sent back to the model on later turns.
+    """
+    text: str = ""
+    code_result: Optional[CodeGenerationResult] = None
+    artifact_ids: List[Optional[str]] = field(default_factory=list)
+    error: Optional[str] = None
 
 
 @dataclass
 class GeminiChatBot:
-    def __init__(self, model: str = "gemini-1.5-flash"):
+    def __init__(self, model: str = "gemini-1.5-flash",
+                 llm: Optional[ChatGoogleGenerativeAI] = None,
+                 code_generator_llm: Optional[ChatGoogleGenerativeAI] = None):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        if not self.api_key and (llm is None or code_generator_llm is None):
             raise ValueError("GEMINI_API_KEY environment variable is required")
         
-        self.llm = ChatGoogleGenerativeAI(
+        self.llm = llm or ChatGoogleGenerativeAI(
             model=model,
             google_api_key=self.api_key,
             temperature=0.7,
             streaming=True
         )
         
-        self.code_generator = create_code_generator(self.api_key, model)
+        self.code_generator = create_code_generator(self.api_key, model, llm=code_generator_llm)
     
-    async def stream_chat(self, user_input: str, conversation_history: List[BaseMessage] = None) -> AsyncGenerator[str, None]:
+    @staticmethod
+    def _file_event(event: CodeStreamEvent) -> Dict[str, Any]:
+        if event.type == "file_chunk":
+            return {"type": "tool_call_file_chunk", "index": event.index, "content": event.content}
+        return {
+            "type": f"tool_call_{event.type}",
+            "tool_name": "code_generator",
+            "index": event.index,
+            "filename": event.filename,
+            "language": event.language
+        }
+    
+    async def stream_chat(self, user_input: str, conversation_history: List[BaseMessage] = None,
+                          intent_hint: Optional[str] = None,
+                          result: Optional[ChatTurnResult] = None) -> AsyncGenerator[str, None]:
+        if result is None:
+            result = ChatTurnResult()
         messages = conversation_history or []
         if user_input:
             messages = messages + [HumanMessage(content=user_input)]
         
         try:
-            if self.code_generator.is_programming_question(user_input):
-                code_result = await self.code_generator.generate_code(user_input)
+            if intent_router.route(user_input, hint=intent_hint).route == ROUTE_CODE:
+                code_result = None
+                async for item in self.code_generator.stream_code(user_input):
+                    if isinstance(item, CodeGenerationResult):
+                        code_result = item
+                        result.code_result = item
+                    else:
+                        yield json.dumps(self._file_event(item)) + "\n"
                 
+                result.artifact_ids = await asyncio.to_thread(
+                    artifact_store.put_many, [file.content for file in code_result.files]
+                )
                 tool_call_data = {
                     "type": "tool_call",
                     "tool_name": "code_generator",
@@ -40,14 +84,16 @@ class GeminiChatBot:
                         {
                             "filename": file.filename,
                             "content": file.content,
-                            "language": file.language
+                            "language": file.language,
+                            "artifact_id": artifact_id
                         }
-                        for file in code_result.files
+                        for file, artifact_id in zip(code_result.files, result.artifact_ids)
                     ]
                 }
                 yield json.dumps(tool_call_data) + "\n"
                 
                 response_message = f"I've generated {len(code_result.files)} file(s) for you: {code_result.description}"
+                result.text = response_message
                 yield json.dumps({"type": "chunk", "content": response_message}) + "\n"
                 
                 updated_messages = messages + [AIMessage(content=response_message)]
@@ -57,6 +103,7 @@ class GeminiChatBot:
                 async for chunk in self.llm.astream(messages):
                     if chunk.content:
                         full_response += chunk.content
+                        result.text = full_response
                         yield json.dumps({"type": "chunk", "content": chunk.content}) + "\n"
                 
                 updated_messages = messages + [AIMessage(content=full_response)]
@@ -64,8 +111,15 @@ class GeminiChatBot:
             
         except Exception as e:
             error_msg = f"Error: {str(e)}"
+            result.error = error_msg
             yield json.dumps({"type": "error", "content": error_msg}) + "\n"
 
 
 def create_gemini_bot(model: str = "gemini-1.5-flash") -> GeminiChatBot:
-    return GeminiChatBot(model=model)
\ No newline at end of file
+    return GeminiChatBot(model=model)
+
+
+def get_gemini_bot(model: Optional[str] = None) -> GeminiChatBot:
+    """Get the process-wide bot for a model instead of building a new one"""
+    from .llm_registry import llm_registry
+    return llm_registry.get_bot(model)
\ No newline at end of file
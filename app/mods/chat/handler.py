@@ -1,12 +1,23 @@
-from fastapi import HTTPException
+import os
+import asyncio
+from fastapi import HTTPException, Header, Query, Response
 from fastapi.responses import StreamingResponse
-from typing import List
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from typing import List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from ...libs.chat import internal_v1
-from .gemini_bot import create_gemini_bot
-from .code_generator import create_code_generator
+from .gemini_bot import get_gemini_bot, ChatTurnResult
+from .llm_registry import llm_registry, code_generator_cache
+from .context_window import context_window, estimate_tokens
 from .memory_store import memory_store
+from .async_store import async_memory_store
+from .affinity import session_affinity
+from .artifact_store import artifact_store, is_artifact_id
+from .router import intent_router
+from .sweeper import memory_sweeper
+from .snapshot import memory_snapshots
+from .summarizer import conversation_summarizer
 from .models import (
+    ArtifactRef,
     ChatMessage,
     ChatRequest,
     CodeGenerationRequest,
@@ -28,30 +39,68 @@ def _convert_to_langchain_messages(messages: List[ChatMessage]) -> List[BaseMess
 @internal_v1.post("/chat/stream", tags=["chat"])
 async def chat_stream(request: ChatRequest):
     try:
-        session_id = request.session_id or memory_store.create_session()
+        # With affinity configured, new IDs hash to this worker so later turns stay here
+        session_id = request.session_id or await async_memory_store.create_session(session_affinity.new_session_id())
         
-        if not request.conversation_history:
-            stored_history = memory_store.retrieve(session_id, "conversation_history")
-            if stored_history:
-                request.conversation_history = stored_history
+        # Client-supplied history replaces the stored log; otherwise append to it
+        client_history = request.conversation_history
+        summary = None
+        if client_history:
+            history = context_window.select(client_history)
+        else:
+            # Older turns may already be folded into a summary; only send what follows it
+            summary = await conversation_summarizer.get_summary(session_id)
+            budget, start = context_window.max_tokens, 0
+            if summary:
+                budget = max(0, budget - estimate_tokens(summary["content"]))
+                start = summary["upto"]
+            history = await async_memory_store.read_window(
+                session_id, "conversation_history", budget, start
+            ) or []
         
-        langchain_history = _convert_to_langchain_messages(request.conversation_history)
+        langchain_history = _convert_to_langchain_messages(history)
+        if summary:
+            langchain_history.insert(0, SystemMessage(
+                content=f"Summary of the earlier conversation:\n{summary['content']}"
+            ))
         
-        updated_history = request.conversation_history + [ChatMessage(role="user", content=request.message)]
+        bot = get_gemini_bot()
         
-        bot = create_gemini_bot()
-        
-        response_content = ""
+        result = ChatTurnResult()
         async def stream_with_memory():
-            nonlocal response_content
-            async for chunk in bot.stream_chat(user_input=request.message, conversation_history=langchain_history):
-                response_content += chunk
+            async for chunk in bot.stream_chat(
+                user_input=request.message,
+                conversation_history=langchain_history,
+                intent_hint=request.intent,
+                result=result
+            ):
                 yield chunk
             
-            # Store updated conversation in memory after streaming
-            final_history = updated_history + [ChatMessage(role="assistant", content=response_content)]
-            memory_store.store(session_id, "conversation_history", final_history, ttl_seconds=3600)
-            memory_store.store(session_id, "last_interaction", request.message, ttl_seconds=1800)
+            if result.error and not result.text:
+                return
+            
+            # Store only the reply text; generated files are referenced by artifact ID,
+            # with their content inline unless the artifact store can always serve it
+            artifacts = None
+            if result.code_result is not None:
+                artifacts = [
+                    ArtifactRef(
+                        id=artifact_id, filename=file.filename, language=file.language,
+                        content=None if artifact_id and artifact_store.durable else file.content
+                    )
+                    for file, artifact_id in zip(result.code_result.files, result.artifact_ids)
+                ]
+            turn = [
+                ChatMessage(role="user", content=request.message),
+                ChatMessage(role="assistant", content=result.text, artifacts=artifacts)
+            ]
+            if client_history:
+                await async_memory_store.set(session_id, "conversation_history", client_history + turn, ttl_seconds=3600)
+                await conversation_summarizer.invalidate(session_id)
+            else:
+                await async_memory_store.append(session_id, "conversation_history", turn, ttl_seconds=3600)
+            await async_memory_store.set(session_id, "last_interaction", request.message, ttl_seconds=1800)
+            await conversation_summarizer.maybe_schedule(session_id)
         
         return StreamingResponse(
             stream_with_memory(),
@@ -68,13 +117,13 @@ async def chat_stream(request: ChatRequest):
 async def generate_code(request: CodeGenerationRequest):
     """Generate code files based on user prompt"""
     try:
-        import os
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
         
-        code_generator = create_code_generator(api_key)
+        code_generator = code_generator_cache.get(api_key, llm_registry.default_model)
         result = await code_generator.generate_code(request.prompt)
+        artifact_ids = await asyncio.to_thread(artifact_store.put_many, [file.content for file in result.files])
         
         return CodeGenerationResponse(
             description=result.description,
@@ -82,35 +131,65 @@ async def generate_code(request: CodeGenerationRequest):
                 CodeFile(
                     filename=file.filename,
                     content=file.content,
-                    language=file.language
+                    language=file.language,
+                    artifact_id=artifact_id
                 )
-                for file in result.files
+                for file, artifact_id in zip(result.files, artifact_ids)
             ]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Code generation failed: {str(e)}")
 
 
+@internal_v1.get("/chat/artifacts/stats", tags=["chat"])
+def get_artifact_stats():
+    """Get artifact store statistics"""
+    return artifact_store.get_stats()
+
+
+@internal_v1.get("/chat/artifacts/{artifact_id}", tags=["chat"])
+def get_artifact(artifact_id: str, if_none_match: Optional[str] = Header(default=None)):
+    """Get a generated file by its content hash"""
+    if not is_artifact_id(artifact_id):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    if not artifact_store.contains(artifact_id):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    # The ID is the content hash, so a matching ETag means the client has the content
+    etag = f'"{artifact_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ]):
+        return Response(status_code=304, headers=headers)
+    
+    content = artifact_store.get(artifact_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return Response(content=content, media_type="text/plain; charset=utf-8", headers=headers)
+
+
 @internal_v1.post("/chat/session", tags=["chat"])
-def create_chat_session():
+async def create_chat_session():
     """Create a new chat session with memory"""
-    session_id = memory_store.create_session()
+    session_id = await async_memory_store.create_session(session_affinity.new_session_id())
     return {"session_id": session_id, "status": "created"}
 
 
 @internal_v1.get("/chat/session/{session_id}/history", tags=["chat"])
-def get_session_history(session_id: str):
+async def get_session_history(session_id: str):
     """Get conversation history for a session"""
-    history = memory_store.retrieve(session_id, "conversation_history")
+    history = await async_memory_store.read_tail(session_id, "conversation_history")
     if history is None:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     return {"session_id": session_id, "history": history}
 
 
 @internal_v1.delete("/chat/session/{session_id}", tags=["chat"])
-def clear_session(session_id: str):
+async def clear_session(session_id: str):
     """Clear all memory for a session"""
-    success = memory_store.clear_session(session_id)
+    success = await async_memory_store.expire(session_id)
     if not success:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"session_id": session_id, "status": "cleared"}
@@ -119,7 +198,21 @@ def clear_session(session_id: str):
 @internal_v1.get("/chat/memory/stats", tags=["chat"])
 def get_memory_stats():
     """Get memory store statistics"""
-    return memory_store.get_stats()
+    stats = memory_store.get_stats()
+    stats["async"] = async_memory_store.get_stats()
+    stats["sweeper"] = memory_sweeper.get_stats()
+    stats["summarizer"] = conversation_summarizer.get_stats()
+    stats["snapshots"] = memory_snapshots.get_stats()
+    return stats
+
+
+@internal_v1.get("/chat/memory/sessions", tags=["chat"])
+def list_memory_sessions(cursor: Optional[str] = None, limit: int = Query(default=100, ge=1, le=1000)):
+    """Page through per-session memory usage"""
+    try:
+        return memory_store.list_sessions(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @internal_v1.post("/chat/memory/cleanup", tags=["chat"])
@@ -129,6 +222,21 @@ def cleanup_expired_memory():
     return {"cleaned_entries": cleaned_count, "status": "completed"}
 
 
+@internal_v1.get("/chat/registry/stats", tags=["chat"])
+def get_registry_stats():
+    """Get shared client pool and code generator cache statistics"""
+    return {
+        "llm_pool": llm_registry.get_stats(),
+        "code_generators": code_generator_cache.get_stats()
+    }
+
+
+@internal_v1.get("/chat/router/stats", tags=["chat"])
+def get_router_stats():
+    """Get intent routing cache and per-strategy latency statistics"""
+    return intent_router.get_stats()
+
+
 @internal_v1.get("/chat/health", tags=["chat"])
 def chat_health():
     return {"status": "healthy", "service": "gemini-chat"}
@@ -0,0 +1,113 @@
+"""
+Keyword and pattern classifier for code generation requests
+"""
+import re
+from dataclasses import dataclass
+
+
+PROGRAMMING_KEYWORDS = (
+    'create', 'build', 'make', 'write', 'generate', 'code',
+    'html', 'css', 'javascript', 'js', 'python', 'react',
+    'component', 'function', 'class', 'button', 'form',
+    'website', 'page', 'app', 'application', 'script'
+)
+
+# Keywords count wherever they appear, even inside other words; patterns
+# match as written, from a word start
+CODE_PATTERNS = (
+    r'\b(?:html|css|js|javascript|python|react|vue|angular)\b',
+    r'\b(?:create|build|make|write|generate)\s+(?:a|an)?\s*(?:button|form|component|page|website|app)',
+    r'\b(?:show me|give me|can you)\s+(?:code|example)',
+    r'\bfiles?\s+(?:for|with)',
+    r'\b(?:frontend|backend|full.?stack)\b'
+)
+
+# Letters the patterns above can start with
+PATTERN_FIRST_LETTERS = "abcfghjmprsvw"
+
+# A pattern match counts as two keyword matches: the original rule accepted
+# either two keywords or one pattern.
+PATTERN_WEIGHT = 2
+THRESHOLD = 2
+
+# Stop scanning once the score can't meaningfully change
+SATURATION = 8
+
+# Every keyword found inside each keyword, itself included. Finding the
+# longest keyword that starts at a position accounts for all the keywords
+# that start there, so one scan counts the same keywords as testing each
+# one for a substring match.
+_CONTAINED = {
+    keyword: frozenset(other for other in PROGRAMMING_KEYWORDS if other in keyword)
+    for keyword in PROGRAMMING_KEYWORDS
+}
+
+# Longest first, so each position reports its longest keyword
+_KEYWORDS = "|".join(re.escape(keyword) for keyword in sorted(PROGRAMMING_KEYWORDS, key=len, reverse=True))
+_KEYWORD_AT = re.compile(_KEYWORDS)
+
+
+def _build_classifier() -> "re.Pattern[str]":
+    # Everything sits in a lookahead, so the scan visits every position and
+    # overlapping matches are all seen. No two patterns can match at the same
+    # position, as their first words differ; where a pattern matches, the
+    # keyword there is looked up separately. The first-letter lookahead lets
+    # the engine reject most positions without trying any alternative.
+    alternatives = [f"(?P<p{i}>{pattern})" for i, pattern in enumerate(CODE_PATTERNS)]
+    alternatives.append(f"(?P<keyword>{_KEYWORDS})")
+
+    first_letters = {keyword[0] for keyword in PROGRAMMING_KEYWORDS}
+    first_letters.update(PATTERN_FIRST_LETTERS)
+    lookahead = "".join(sorted(first_letters))
+    return re.compile(rf"(?=[{lookahead}])(?=(?:{'|'.join(alternatives)}))")
+
+
+_CLASSIFIER = _build_classifier()
+
+
+@dataclass(frozen=True)
+class IntentScore:
+    """Result of classifying a message"""
+    is_programming: bool
+    confidence: float
+    keyword_matches: int
+    pattern_matches: int
+
+
+def classify_intent(message: str) -> IntentScore:
+    """Score how likely a message is a code generation request.
+
+    Runs a single pass over the lowercased message, counting the distinct
+    keywords it contains and the patterns it matches, with the same results
+    as testing each one separately. Confidence is ``1 - 0.5 ** weight``
+    where keywords weigh 1 and patterns weigh 2, so the original threshold
+    (two keywords or one pattern) is a confidence of 0.75.
+    """
+    text = message.lower()
+    keywords = set()
+    patterns = set()
+    for match in _CLASSIFIER.finditer(text):
+        group = match.lastgroup
+        if group == "keyword":
+            keyword = match.group(group)
+        else:
+            patterns.add(group)
+            found = _KEYWORD_AT.match(text, match.start())
+            keyword = found.group() if found is not None else None
+        if keyword is not None:
+            keywords |= _CONTAINED[keyword]
+        if len(keywords) + PATTERN_WEIGHT * len(patterns) >= SATURATION:
+            break
+
+    weight = len(keywords) + PATTERN_WEIGHT * len(patterns)
+    return IntentScore(
+        is_programming=weight >= THRESHOLD,
+        confidence=1.0 - 0.5 ** weight,
+        keyword_matches=len(keywords),
+        pattern_matches=len(patterns)
+    )
+
+
+def is_programming_question(message: str) -> bool:
+    """Detect if the message is asking for code generation"""
+    return classify_intent(message).is_programming
@@ -0,0 +1,122 @@
+"""
+Linear-time extraction of JSON objects embedded in LLM responses
+"""
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+_FENCE_OPEN = re.compile(r'```[ \t]*(?:json)?[ \t]*\r?\n', re.IGNORECASE)
+_DECODER = json.JSONDecoder(strict=False)
+
+# Characters that matter inside an object
+_TOKEN = re.compile(r'[{}"]')
+
+
+def loads(data: str) -> Any:
+    """Decode JSON, using orjson when it is installed.
+
+    Falls back to the stdlib decoder in non-strict mode, which accepts the raw
+    control characters LLMs sometimes leave inside strings.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return _DECODER.decode(data)
+
+
+def _fenced_span(text: str) -> Optional[Tuple[int, int]]:
+    """Bounds of the object inside the first ```json fence, if there is one"""
+    fence = _FENCE_OPEN.search(text)
+    if fence is None:
+        return None
+    close = text.find("```", fence.end())
+    if close == -1:
+        close = len(text)
+    begin = text.find("{", fence.end(), close)
+    end = text.rfind("}", fence.end(), close)
+    if begin == -1 or end == -1:
+        return None
+    return begin, end + 1
+
+
+def _object_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Bounds of each outermost balanced ``{...}`` group, in order, from one scan
+
+    Braces inside string literals don't count. Groups are yielded as soon
+    as they close. If a ``{`` in prose is never closed, the groups directly
+    inside it are treated as outermost once the scan reaches the end.
+    """
+    # Open braces, each with the closed groups directly inside it
+    stack: List[Tuple[int, List[Tuple[int, int]]]] = []
+    pos = 0
+    while True:
+        if not stack:
+            # Between objects only braces matter; quotes in prose are ignored
+            begin = text.find("{", pos)
+            if begin == -1:
+                return
+            stack.append((begin, []))
+            pos = begin + 1
+            continue
+        match = _TOKEN.search(text, pos)
+        if match is None:
+            break
+        pos = match.end()
+        token = text[match.start()]
+        if token == '"':
+            # The decoder's C string scanner skips escapes far faster than a regex
+            try:
+                pos = scanstring(text, pos, False)[1]
+            except ValueError:
+                break
+        elif token == "{":
+            stack.append((match.start(), []))
+        elif token == "}":
+            begin, _ = stack.pop()
+            if stack:
+                stack[-1][1].append((begin, pos))
+            else:
+                yield begin, pos
+    for _, children in stack:
+        yield from children
+
+
+def find_json_object(text: str) -> Optional[Tuple[Tuple[int, int], Any]]:
+    """Locate and decode the first JSON object in ``text``.
+
+    A ```json fence is tried first as a single slice, which is the fast path
+    for well-formed responses. Otherwise one string-aware scan finds each
+    outermost ``{...}`` group, and the first that decodes to an object wins.
+
+    Returns ``((begin, end), value)`` or None.
+    """
+    span = _fenced_span(text)
+    if span is not None:
+        try:
+            return span, loads(text[span[0]:span[1]])
+        except ValueError:
+            pass
+
+    for begin, end in _object_spans(text):
+        try:
+            value = loads(text[begin:end])
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return (begin, end), value
+    return None
+
+
+def parse_json_object(text: str) -> Optional[Any]:
+    """Decode the first JSON object found in ``text``, preferring a fenced block"""
+    found = find_json_object(text)
+    return found[1] if found is not None else None
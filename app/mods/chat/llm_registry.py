@@ -0,0 +1,260 @@
+"""
+Process-wide registry of Gemini clients and chat bots
+"""
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from itertools import cycle
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import HumanMessage
+from .code_generator import CodeGenerator, create_code_generator
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+# (model, temperature, streaming)
+ClientKey = Tuple[str, float, bool]
+
+
+def _fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class LLMRegistry:
+    """Shares ChatGoogleGenerativeAI clients and GeminiChatBot instances across requests.
+
+    Clients are keyed by (model, temperature, streaming). Each key holds a small
+    pool of clients handed out round-robin so concurrent streams don't all share
+    one underlying channel. The API key is re-read on every lookup; when it
+    changes, pools and bots built with the old key are dropped.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, pool_size: int = 1,
+                 default_model: str = DEFAULT_MODEL):
+        self._api_key = api_key
+        self.pool_size = max(1, pool_size)
+        self.default_model = default_model
+        self._pools: Dict[ClientKey, Tuple[List[ChatGoogleGenerativeAI], Iterator[ChatGoogleGenerativeAI]]] = {}
+        self._bots: Dict[str, Tuple[List["GeminiChatBot"], Iterator["GeminiChatBot"]]] = {}
+        self._key_fingerprint: Optional[str] = None
+        self.rotations = 0
+        self._lock = Lock()
+
+    @property
+    def api_key(self) -> str:
+        api_key = self._api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+        return api_key
+
+    def _sync_key(self, api_key: str) -> str:
+        """Drop pooled clients and bots if the key changed; caller holds the lock"""
+        fingerprint = _fingerprint(api_key)
+        if fingerprint != self._key_fingerprint:
+            if self._key_fingerprint is not None:
+                self._pools.clear()
+                self._bots.clear()
+                self.rotations += 1
+            self._key_fingerprint = fingerprint
+        return fingerprint
+
+    def _build_pool(self, key: ClientKey, api_key: str) -> List[ChatGoogleGenerativeAI]:
+        model, temperature, streaming = key
+        return [
+            ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=temperature,
+                streaming=streaming
+            )
+            for _ in range(self.pool_size)
+        ]
+
+    def get_llm(self, model: Optional[str] = None, temperature: float = 0.7,
+                streaming: bool = True) -> ChatGoogleGenerativeAI:
+        """Get a shared client for the given configuration, building its pool on first use"""
+        key = (model or self.default_model, float(temperature), bool(streaming))
+        api_key = self.api_key
+        with self._lock:
+            self._sync_key(api_key)
+            pool = self._pools.get(key)
+            if pool is None:
+                clients = self._build_pool(key, api_key)
+                pool = (clients, cycle(clients))
+                self._pools[key] = pool
+            return next(pool[1])
+
+    def get_bot(self, model: Optional[str] = None) -> "GeminiChatBot":
+        """Get a shared chat bot for a model.
+
+        One bot is built per pooled client, and bots are handed out round-robin.
+        """
+        from .gemini_bot import GeminiChatBot
+
+        model = model or self.default_model
+        api_key = self.api_key
+        with self._lock:
+            fingerprint = self._sync_key(api_key)
+            bots = self._bots.get(model)
+            if bots is not None:
+                return next(bots[1])
+
+        built = [
+            GeminiChatBot(
+                model=model,
+                llm=self.get_llm(model, temperature=0.7, streaming=True),
+                code_generator_llm=self.get_llm(model, temperature=0.3, streaming=True)
+            )
+            for _ in range(self.pool_size)
+        ]
+        with self._lock:
+            stale = self._key_fingerprint != fingerprint
+            if not stale:
+                bots = self._bots.setdefault(model, (built, cycle(built)))
+                return next(bots[1])
+        # The key rotated while these bots were built; build again with the new one
+        return self.get_bot(model)
+
+    async def warm_up(self, models: Optional[List[str]] = None, ping: bool = False) -> None:
+        """Build bots for the given models ahead of the first request.
+
+        With ``ping`` set, each pooled client also sends a one-token request so
+        connection setup happens at startup rather than on a user's first turn.
+        """
+        models = models or [self.default_model]
+        for model in models:
+            self.get_bot(model)
+
+        if not ping:
+            return
+
+        with self._lock:
+            clients = [client for pool, _ in self._pools.values() for client in pool]
+        results = await asyncio.gather(
+            *(client.ainvoke([HumanMessage(content="ping")], generation_config={"max_output_tokens": 1}) for client in clients),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("LLM warm-up ping failed: %s", result)
+
+    def clear(self) -> None:
+        """Drop all pooled clients and bots"""
+        with self._lock:
+            self._pools.clear()
+            self._bots.clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "rotations": self.rotations,
+                "bots": {model: len(bots) for model, (bots, _) in self._bots.items()},
+                "pools": [
+                    {"model": model, "temperature": temperature, "streaming": streaming, "clients": len(pool)}
+                    for (model, temperature, streaming), (pool, _) in self._pools.items()
+                ]
+            }
+
+
+class CodeGeneratorCache:
+    """Bounded, thread-safe LRU of CodeGenerator instances keyed by (model, API key).
+
+    API keys are kept only as a SHA-256 fingerprint. When a model is requested
+    with a different key than the one cached, entries for the old key are
+    evicted so rotated credentials don't linger.
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max(1, max_size)
+        self._generators: "OrderedDict[Tuple[str, str], CodeGenerator]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, api_key: str, model: str = DEFAULT_MODEL) -> CodeGenerator:
+        """Get a cached generator, building one on a miss"""
+        key = (model, _fingerprint(api_key))
+        with self._lock:
+            generator = self._generators.get(key)
+            if generator is not None:
+                self._generators.move_to_end(key)
+                self.hits += 1
+                return generator
+            self.misses += 1
+
+        generator = create_code_generator(api_key, model)
+
+        with self._lock:
+            existing = self._generators.get(key)
+            if existing is not None:
+                self._generators.move_to_end(key)
+                return existing
+
+            # Key rotation: drop generators built with an older key for this model
+            for stale in [k for k in self._generators if k[0] == model]:
+                del self._generators[stale]
+                self.evictions += 1
+
+            self._generators[key] = generator
+            while len(self._generators) > self.max_size:
+                self._generators.popitem(last=False)
+                self.evictions += 1
+            return generator
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generators.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._generators),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def warm_up_models() -> List[str]:
+    """Models to build at startup, from GEMINI_WARMUP_MODELS (comma separated)"""
+    models = os.getenv("GEMINI_WARMUP_MODELS", "")
+    return [model.strip() for model in models.split(",") if model.strip()]
+
+
+async def start_llm_registry() -> None:
+    """Warm the shared registry on application startup.
+
+    Missing credentials are not fatal here; requests will report them instead.
+    """
+    if not _env_flag("GEMINI_WARMUP", default=True):
+        return
+    try:
+        await llm_registry.warm_up(warm_up_models() or None, ping=_env_flag("GEMINI_WARMUP_PING"))
+    except ValueError as e:
+        logger.warning("Skipping LLM warm-up: %s", e)
+
+
+llm_registry = LLMRegistry(
+    pool_size=int(os.getenv("GEMINI_POOL_SIZE", "1")),
+    default_model=os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
+)
+
+code_generator_cache = CodeGeneratorCache(
+    max_size=int(os.getenv("CODE_GENERATOR_CACHE_SIZE", "8"))
+)
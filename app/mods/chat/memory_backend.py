@@ -0,0 +1,205 @@
+"""
+Interfaces shared by all session memory backends
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Batched write operations, as accepted by ``MemoryBackend.write_batch``:
+#   (OP_SET, session_id, key, value, ttl_seconds)
+#   (OP_APPEND, session_id, key, messages, ttl_seconds)
+#   (OP_DELETE, session_id, key)
+#   (OP_CLEAR, session_id)
+#   (OP_CREATE, session_id)
+OP_SET = "set"
+OP_APPEND = "append"
+OP_DELETE = "delete"
+OP_CLEAR = "clear"
+OP_CREATE = "create"
+
+WriteOp = Tuple[Any, ...]
+
+# Called with (session_id, version) after a session is written anywhere, or
+# with (None, None) when notifications may have been missed
+InvalidationCallback = Callable[[Optional[str], Optional[int]], None]
+
+
+class MemoryBackend(ABC):
+    """Session memory as seen by the chat handlers
+
+    Values are scoped by ``(session_id, key)`` and expire after their TTL.
+    Keys written with ``append_messages`` hold an append-only message log
+    that can be read back in slices or token-budgeted windows without
+    loading the whole history.
+    """
+
+    default_ttl: int
+
+    @abstractmethod
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+
+    @abstractmethod
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory"""
+
+    @abstractmethod
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        """Retrieve a value from session memory"""
+
+    @abstractmethod
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log, refresh its TTL and return its length"""
+
+    @abstractmethod
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log, or None if there is none"""
+
+    @abstractmethod
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+
+    @abstractmethod
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``"""
+
+    @abstractmethod
+    def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+
+    @abstractmethod
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        """Get all non-expired entries for a session"""
+
+    @abstractmethod
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+
+    @abstractmethod
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+
+    @abstractmethod
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        """Remove up to ``limit`` expired entries (all if None) and return how many were removed"""
+
+    @abstractmethod
+    def has_expired(self) -> bool:
+        """Check whether any entry is due for cleanup"""
+
+    @abstractmethod
+    def get_session_count(self) -> int:
+        """Get number of active sessions"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+
+    @abstractmethod
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of per-session detail as ``{"sessions": [...], "next_cursor": ...}``"""
+
+    def has_session(self, session_id: str) -> bool:
+        """Whether the session holds any non-expired entry. Backends with a cheaper check override this."""
+        return bool(self.get_all(session_id))
+
+    def write_batch(self, ops: List[WriteOp]) -> None:
+        """Apply write operations in order. Durable backends override this to use one transaction."""
+        for op in ops:
+            kind = op[0]
+            if kind == OP_SET:
+                self.store(op[1], op[2], op[3], ttl_seconds=op[4])
+            elif kind == OP_APPEND:
+                self.append_messages(op[1], op[2], op[3], ttl_seconds=op[4])
+            elif kind == OP_DELETE:
+                self.delete(op[1], op[2])
+            elif kind == OP_CLEAR:
+                self.clear_session(op[1])
+            elif kind == OP_CREATE:
+                self.create_session(op[1])
+            else:
+                raise ValueError(f"Unknown write operation: {kind}")
+
+    # Versioning, for caches in front of a shared backend. Backends that
+    # set ``supports_versions`` advance a per-session version on every write
+    # and override both methods; on any other backend they raise TypeError.
+
+    supports_versions = False
+
+    def session_version(self, session_id: str) -> int:
+        """Current version of a session; 0 if it has never been written"""
+        raise TypeError(f"{type(self).__name__} does not track session versions")
+
+    def versioned_write(self, session_id: str, ops: List[WriteOp]) -> int:
+        """Apply writes to one session and return its new version"""
+        raise TypeError(f"{type(self).__name__} does not track session versions")
+
+    def subscribe_invalidations(self, callback: InvalidationCallback) -> bool:
+        """Have ``callback`` notified of writes from every process; False if unsupported"""
+        return False
+
+    def start(self) -> None:
+        """Start any background tasks. Called from the app lifespan."""
+
+    async def stop(self) -> None:
+        """Stop background tasks and write out anything pending"""
+
+    def close(self) -> None:
+        """Release any connections or files held by the backend"""
+
+
+class AsyncMemoryStore(ABC):
+    """Session memory for async handlers
+
+    Every call is awaitable, so a slow backend or a contended lock only
+    delays the request that is waiting on it, never the event loop.
+    ``backend`` is the synchronous store underneath, for callers that
+    already run off the loop.
+    """
+
+    backend: MemoryBackend
+
+    @abstractmethod
+    async def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+
+    @abstractmethod
+    async def get(self, session_id: str, key: str) -> Optional[Any]:
+        """Retrieve a value from session memory"""
+
+    @abstractmethod
+    async def set(self, session_id: str, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        """Store a value in session memory"""
+
+    @abstractmethod
+    async def append(self, session_id: str, key: str, messages: List[Any],
+                     ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log, refresh its TTL and return its length"""
+
+    @abstractmethod
+    async def expire(self, session_id: str, key: Optional[str] = None) -> bool:
+        """Drop one key now, or the whole session if ``key`` is None; returns whether it existed"""
+
+    @abstractmethod
+    async def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log, or None if there is none"""
+
+    @abstractmethod
+    async def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+
+    @abstractmethod
+    async def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``"""
+
+    @abstractmethod
+    async def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+
+    async def close(self) -> None:
+        """Release executors or connections held for async access"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": "native"}
@@ -1,99 +1,381 @@
 """
 In-memory store for short-term chat memory
 """
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
 from threading import Lock
+from itertools import count
+from time import monotonic
+import heapq
+import logging
+import math
+import os
+import sys
 import uuid
+from .conversation_log import ConversationLog
+from .memory_backend import MemoryBackend
 
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+NO_EXPIRY = math.inf
+
+# Bookkeeping per entry: the MemoryEntry itself, its dict slot and heap record
+ENTRY_OVERHEAD = 200
+
+
+def approximate_size(value: Any) -> int:
+    """Rough number of bytes ``value`` keeps alive.
+    
+    Strings and other leaves use ``sys.getsizeof``; containers, logs and
+    model objects add up their contents. Shared objects are counted each
+    time they appear, which overestimates rather than under.
+    """
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approximate_size(k) + approximate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, ConversationLog):
+        return value.nbytes + sum(approximate_size(item) for item in value.loose())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    fields = getattr(value, "__dict__", None)
+    if fields is not None:
+        return sys.getsizeof(value) + sum(approximate_size(v) for v in fields.values())
+    return sys.getsizeof(value)
+
+
+@dataclass(slots=True)
 class MemoryEntry:
-    """Single memory entry with metadata"""
+    """Single memory entry with metadata
+    
+    ``deadline`` is an absolute ``time.monotonic()`` value, so expiry checks
+    are a single float comparison and are immune to wall-clock changes.
+    """
     content: Any
-    timestamp: datetime = field(default_factory=datetime.now)
-    ttl_seconds: Optional[int] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    deadline: float = NO_EXPIRY
+    metadata: Optional[Dict[str, Any]] = None
+    size: int = 0
     
-    def is_expired(self) -> bool:
+    @classmethod
+    def create(cls, content: Any, ttl_seconds: Optional[float] = None,
+               metadata: Optional[Dict[str, Any]] = None, now: Optional[float] = None) -> "MemoryEntry":
+        """Build an entry, measuring its size once up front"""
+        size = ENTRY_OVERHEAD + approximate_size(content) + (approximate_size(metadata) if metadata else 0)
+        if ttl_seconds is None:
+            return cls(content, NO_EXPIRY, metadata or None, size)
+        return cls(content, (monotonic() if now is None else now) + ttl_seconds, metadata or None, size)
+    
+    @property
+    def expires(self) -> bool:
+        return self.deadline != NO_EXPIRY
+    
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if memory entry has expired"""
-        if self.ttl_seconds is None:
-            return False
-        return datetime.now() > self.timestamp + timedelta(seconds=self.ttl_seconds)
+        return (monotonic() if now is None else now) > self.deadline
+
+
+def _export(content: Any) -> Any:
+    """Copy logs out as plain lists so callers never hold the live log"""
+    if isinstance(content, ConversationLog):
+        return content.tail()
+    return content
+
+
+# (deadline, sequence, session_id, key, entry). A key of None marks a session
+# that was created empty and should be dropped if it is still empty.
+ExpiryRecord = Tuple[float, int, str, Optional[str], Optional[MemoryEntry]]
+
+
+class _Session(dict):
+    """A session's entries by key, plus their total size"""
+    __slots__ = ("size",)
+    
+    def __init__(self):
+        super().__init__()
+        self.size = 0
 
 
-class InMemoryStore:
-    """Thread-safe in-memory store for chat sessions"""
+class MemoryShard:
+    """One independently locked partition of the session store
+    
+    Entries with a TTL are also pushed onto a min-heap ordered by deadline, so
+    cleanup only touches entries that have actually expired. Overwritten or
+    deleted entries leave stale heap records behind; they are skipped when
+    popped and the heap is rebuilt once they outnumber the live records.
+    
+    Sessions are kept in least-recently-used order. Whenever a write takes
+    the shard past ``max_bytes`` or ``max_sessions`` (None for no limit), the
+    least recently used sessions are evicted, never the one being written.
+    """
     
-    def __init__(self, default_ttl: int = 3600):  # 1 hour default
-        self._store: Dict[str, Dict[str, MemoryEntry]] = {}
+    def __init__(self, default_ttl: int = 3600, max_bytes: Optional[int] = None,
+                 max_sessions: Optional[int] = None):
+        self._store: "OrderedDict[str, _Session]" = OrderedDict()
         self._lock = Lock()
         self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        # Counters are only written under the lock but may be read without it
+        self._bytes = 0
+        self._entries = 0
+        self.expired_entries = 0
+        self._expiry_heap: List[ExpiryRecord] = []
+        self._expiry_seq = count()
+        self._stale_records = 0
+        self.evicted_sessions = 0
+        self.evicted_bytes = 0
     
-    def create_session(self, session_id: Optional[str] = None) -> str:
+    def _schedule(self, session_id: str, key: Optional[str], entry: Optional[MemoryEntry],
+                  deadline: float) -> None:
+        """Push an expiry record. Caller must hold the lock."""
+        heapq.heappush(self._expiry_heap, (deadline, next(self._expiry_seq), session_id, key, entry))
+    
+    def _mark_stale(self, entries) -> None:
+        """Account for heap records whose entries were replaced or removed. Caller must hold the lock."""
+        self._stale_records += sum(1 for entry in entries if entry.expires)
+        if self._stale_records > max(1024, len(self._expiry_heap) // 2):
+            self._rebuild_heap()
+    
+    def _rebuild_heap(self) -> None:
+        """Drop stale records from the expiry heap. Caller must hold the lock."""
+        live = []
+        for record in self._expiry_heap:
+            session_data = self._store.get(record[2])
+            if session_data is None:
+                continue
+            if record[3] is None:
+                if not session_data:
+                    live.append(record)
+                continue
+            entry = session_data.get(record[3])
+            if entry is record[4] and entry.deadline == record[0]:
+                live.append(record)
+        self._expiry_heap = live
+        heapq.heapify(self._expiry_heap)
+        self._stale_records = 0
+    
+    def _session(self, session_id: str) -> _Session:
+        """Get or create a session and mark it most recently used. Caller must hold the lock."""
+        session_data = self._store.get(session_id)
+        if session_data is None:
+            session_data = self._store[session_id] = _Session()
+        else:
+            self._store.move_to_end(session_id)
+        return session_data
+    
+    def _touch(self, session_id: str) -> Optional[_Session]:
+        """Mark an existing session most recently used. Caller must hold the lock."""
+        session_data = self._store.get(session_id)
+        if session_data is not None:
+            self._store.move_to_end(session_id)
+        return session_data
+    
+    def _put_entry(self, session_data: _Session, key: str, entry: MemoryEntry) -> Optional[MemoryEntry]:
+        """Set ``key`` and update size accounting. Caller must hold the lock."""
+        previous = session_data.get(key)
+        session_data[key] = entry
+        if previous is None:
+            self._entries += 1
+        delta = entry.size - (previous.size if previous is not None else 0)
+        session_data.size += delta
+        self._bytes += delta
+        return previous
+    
+    def _pop_entry(self, session_id: str, session_data: _Session, key: str) -> MemoryEntry:
+        """Remove ``key`` and update size accounting, dropping the session once it is empty.
+        Caller must hold the lock."""
+        entry = session_data.pop(key)
+        session_data.size -= entry.size
+        self._bytes -= entry.size
+        self._entries -= 1
+        if not session_data and self._store.get(session_id) is session_data:
+            self._pop_session(session_id)
+        return entry
+    
+    def _expire_entry(self, session_id: str, session_data: _Session, key: str) -> None:
+        """Drop an entry found expired on access. Caller must hold the lock."""
+        self._mark_stale((self._pop_entry(session_id, session_data, key),))
+        self.expired_entries += 1
+    
+    def _pop_session(self, session_id: str) -> _Session:
+        """Remove a session and update size accounting. Caller must hold the lock."""
+        session_data = self._store.pop(session_id)
+        self._bytes -= session_data.size
+        self._entries -= len(session_data)
+        return session_data
+    
+    def _enforce_limits(self) -> None:
+        """Evict least recently used sessions until within budget. Caller must hold the lock."""
+        while len(self._store) > 1 and (
+            (self.max_bytes is not None and self._bytes > self.max_bytes)
+            or (self.max_sessions is not None and len(self._store) > self.max_sessions)
+        ):
+            _, session_data = self._store.popitem(last=False)
+            self._bytes -= session_data.size
+            self._entries -= len(session_data)
+            self.evicted_sessions += 1
+            self.evicted_bytes += session_data.size
+            self._mark_stale(session_data.values())
+    
+    def create_session(self, session_id: str) -> str:
         """Create a new memory session"""
-        if session_id is None:
-            session_id = str(uuid.uuid4())
-        
         with self._lock:
-            self._store[session_id] = {}
+            previous = self._store.get(session_id)
+            if previous is not None:
+                self._pop_session(session_id)
+                self._mark_stale(previous.values())
+            self._store[session_id] = _Session()
+            self._schedule(session_id, None, None, monotonic() + self.default_ttl)
+            self._enforce_limits()
         
         return session_id
     
     def store(self, session_id: str, key: str, value: Any, 
               ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
-        """Store a value in session memory"""
+        """Store a value in session memory
+        
+        Non-empty lists are kept as a packed log; reads return them as lists.
+        """
         if ttl_seconds is None:
             ttl_seconds = self.default_ttl
+        if isinstance(value, list) and value:
+            value = ConversationLog(value)
         
-        entry = MemoryEntry(
-            content=value,
-            ttl_seconds=ttl_seconds,
-            metadata=metadata or {}
-        )
+        entry = MemoryEntry.create(value, ttl_seconds, metadata)
         
         with self._lock:
-            if session_id not in self._store:
-                self._store[session_id] = {}
-            self._store[session_id][key] = entry
+            previous = self._put_entry(self._session(session_id), key, entry)
+            if previous is not None:
+                self._mark_stale((previous,))
+            if entry.expires:
+                self._schedule(session_id, key, entry, entry.deadline)
+            self._enforce_limits()
     
     def retrieve(self, session_id: str, key: str) -> Optional[Any]:
         """Retrieve a value from session memory"""
         with self._lock:
-            if session_id not in self._store:
+            session_data = self._touch(session_id)
+            if session_data is None:
                 return None
             
-            if key not in self._store[session_id]:
+            if key not in session_data:
                 return None
             
-            entry = self._store[session_id][key]
+            entry = session_data[key]
             
             # Check if expired
-            if entry.is_expired():
-                del self._store[session_id][key]
+            if monotonic() > entry.deadline:
+                self._expire_entry(session_id, session_data, key)
                 return None
             
+            return _export(entry.content)
+    
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and refresh its TTL
+        
+        A plain list stored under ``key`` is converted to a log on first
+        append; any other value is replaced. Returns the log length.
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.default_ttl
+        
+        with self._lock:
+            now = monotonic()
+            session_data = self._session(session_id)
+            entry = session_data.get(key)
+            
+            if entry is None or now > entry.deadline or not isinstance(entry.content, (list, ConversationLog)):
+                # Missing, expired or not a list: start a fresh log
+                entry = MemoryEntry.create(ConversationLog(), ttl_seconds, now=now)
+                previous = self._put_entry(session_data, key, entry)
+                if previous is not None:
+                    self._mark_stale((previous,))
+            elif isinstance(entry.content, list):
+                entry.content = ConversationLog(entry.content)
+            
+            if entry.expires and entry.deadline != now + ttl_seconds:
+                # The previous expiry record stays in the heap and is skipped when popped
+                self._stale_records += 1
+            entry.deadline = now + ttl_seconds
+            self._schedule(session_id, key, entry, entry.deadline)
+            
+            log = entry.content
+            length, before = len(log), log.nbytes
+            log.extend(messages)
+            added = log.nbytes - before + sum(approximate_size(item) for item in log.loose(length))
+            entry.size += added
+            session_data.size += added
+            self._bytes += added
+            self._enforce_limits()
+            return len(entry.content)
+    
+    def _live_log(self, session_id: str, key: str) -> Optional[ConversationLog]:
+        """Return the unexpired log under ``key``, converting a stored list. Caller must hold the lock."""
+        session_data = self._touch(session_id)
+        entry = session_data.get(key) if session_data else None
+        if entry is None:
+            return None
+        
+        if monotonic() > entry.deadline:
+            self._expire_entry(session_id, session_data, key)
+            return None
+        
+        if isinstance(entry.content, list):
+            # Token counts are cached from here on
+            entry.content = ConversationLog(entry.content)
+        if isinstance(entry.content, ConversationLog):
             return entry.content
+        return None
+    
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log, or None if there is none"""
+        with self._lock:
+            log = self._live_log(session_id, key)
+            return log.tail(n) if log is not None else None
+    
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+        with self._lock:
+            log = self._live_log(session_id, key)
+            return log.slice(start, end) if log is not None else None
+    
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``"""
+        with self._lock:
+            log = self._live_log(session_id, key)
+            return log.window(max_tokens, start) if log is not None else None
+    
+    def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+        with self._lock:
+            log = self._live_log(session_id, key)
+            return len(log) if log is not None else 0
     
     def get_all(self, session_id: str) -> Dict[str, Any]:
         """Get all non-expired entries for a session"""
         with self._lock:
-            if session_id not in self._store:
+            session_data = self._touch(session_id)
+            if session_data is None:
                 return {}
             
             result = {}
             expired_keys = []
+            now = monotonic()
             
-            for key, entry in self._store[session_id].items():
-                if entry.is_expired():
+            for key, entry in session_data.items():
+                if now > entry.deadline:
                     expired_keys.append(key)
                 else:
-                    result[key] = entry.content
+                    result[key] = _export(entry.content)
             
             # Clean up expired entries
             for key in expired_keys:
-                del self._store[session_id][key]
+                self._expire_entry(session_id, session_data, key)
             
             return result
     
@@ -104,7 +386,7 @@ class InMemoryStore:
                 return False
             
             if key in self._store[session_id]:
-                del self._store[session_id][key]
+                self._mark_stale((self._pop_entry(session_id, self._store[session_id], key),))
                 return True
             
             return False
@@ -113,54 +395,405 @@ class InMemoryStore:
         """Clear all memory for a session"""
         with self._lock:
             if session_id in self._store:
-                del self._store[session_id]
+                self._mark_stale(self._pop_session(session_id).values())
                 return True
             return False
     
-    def cleanup_expired(self) -> int:
-        """Clean up all expired entries across all sessions"""
+    def clear(self) -> None:
+        """Drop every session in the shard"""
+        with self._lock:
+            self._store.clear()
+            self._bytes = 0
+            self._entries = 0
+            self._expiry_heap = []
+            self._stale_records = 0
+    
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        """Clean up expired entries across all sessions
+        
+        With ``limit`` set, at most that many expiry records are processed so
+        callers can sweep in bounded slices.
+        """
         cleaned_count = 0
+        now = monotonic()
+        budget = limit if limit is not None else -1
         
         with self._lock:
-            sessions_to_remove = []
-            
-            for session_id, session_data in self._store.items():
-                expired_keys = []
+            heap = self._expiry_heap
+            while heap and heap[0][0] < now and budget != 0:
+                budget -= 1
+                _, _, session_id, key, entry = heapq.heappop(heap)
+                session_data = self._store.get(session_id)
                 
-                for key, entry in session_data.items():
-                    if entry.is_expired():
-                        expired_keys.append(key)
+                if key is None:
+                    # Session created empty; drop it if nothing was ever stored
+                    if session_data is not None and not session_data:
+                        self._pop_session(session_id)
+                    continue
                 
-                for key in expired_keys:
-                    del session_data[key]
-                    cleaned_count += 1
+                # Replaced, removed, or had its TTL refreshed since this record was pushed
+                if session_data is None or session_data.get(key) is not entry or entry.deadline >= now:
+                    self._stale_records = max(0, self._stale_records - 1)
+                    continue
                 
-                # Remove empty sessions
-                if not session_data:
-                    sessions_to_remove.append(session_id)
-            
-            for session_id in sessions_to_remove:
-                del self._store[session_id]
+                # Drops the session too once it is empty
+                self._pop_entry(session_id, session_data, key)
+                cleaned_count += 1
+                self.expired_entries += 1
         
         return cleaned_count
     
+    def has_expired(self) -> bool:
+        """Check whether any expiry record is due"""
+        with self._lock:
+            return bool(self._expiry_heap) and self._expiry_heap[0][0] < monotonic()
+    
     def get_session_count(self) -> int:
         """Get number of active sessions"""
+        return len(self._store)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get shard counters in O(1) without taking the lock
+        
+        Each counter is read atomically, but they may come from slightly
+        different moments if a write is in progress.
+        """
+        return {
+            "active_sessions": len(self._store),
+            "total_entries": self._entries,
+            "total_bytes": self._bytes,
+            "expiry_records": len(self._expiry_heap),
+            "expired_entries": self.expired_entries,
+            "evicted_sessions": self.evicted_sessions,
+            "evicted_bytes": self.evicted_bytes
+        }
+    
+    def list_sessions(self, after: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Details for up to ``limit`` sessions whose IDs sort after ``after``
+        
+        The lock is held only to copy the session IDs and then to read the
+        selected page, not while sorting.
+        """
+        with self._lock:
+            session_ids = list(self._store)
+        if after is not None:
+            session_ids = [session_id for session_id in session_ids if session_id > after]
+        page = heapq.nsmallest(limit, session_ids)
+        
+        sessions = []
+        with self._lock:
+            for session_id in page:
+                session_data = self._store.get(session_id)
+                if session_data is None:
+                    continue
+                sessions.append({
+                    "session_id": session_id,
+                    "entries": len(session_data),
+                    "bytes": session_data.size,
+                    "keys": list(session_data)
+                })
+        return sessions
+    
+    def export_sessions(self) -> List[Tuple[str, List[Tuple[str, float, bool, int, Any]]]]:
+        """Copy out every live entry as ``(session_id, [(key, deadline, is_log, size, content)])``
+        
+        Only the logs' packed buffers are copied under the lock, so the
+        result stays consistent while appends continue; messages are rebuilt
+        after it is released.
+        """
+        now = monotonic()
+        with self._lock:
+            copied = [
+                (session_id, [
+                    (key, entry.deadline, isinstance(entry.content, ConversationLog), entry.size,
+                     entry.content.copy() if isinstance(entry.content, ConversationLog) else entry.content)
+                    for key, entry in session_data.items()
+                    if entry.deadline >= now
+                ])
+                for session_id, session_data in self._store.items()
+                if session_data
+            ]
+        return [
+            (session_id, [
+                (key, deadline, is_log, size, _export(content))
+                for key, deadline, is_log, size, content in entries
+            ])
+            for session_id, entries in copied
+        ]
+    
+    def load_session(self, session_id: str, entries: List[Tuple[str, float, bool, int, Any]]) -> None:
+        """Insert restored entries for a session; deadlines are monotonic
+        
+        Sizes are taken as given, so a restore doesn't re-measure every value.
+        """
+        built = []
+        for key, deadline, is_log, size, content in entries:
+            if is_log:
+                content = ConversationLog(content)
+            built.append((key, MemoryEntry(content, deadline, None, size)))
+        
         with self._lock:
-            return len(self._store)
+            session_data = self._session(session_id)
+            for key, entry in built:
+                previous = self._put_entry(session_data, key, entry)
+                if previous is not None:
+                    self._mark_stale((previous,))
+                if entry.expires:
+                    self._schedule(session_id, key, entry, entry.deadline)
+            self._enforce_limits()
+
+
+class InMemoryStore(MemoryBackend):
+    """Thread-safe in-memory store for chat sessions
+    
+    Sessions are hashed into ``shard_count`` partitions, each with its own
+    lock and expiry heap, so operations on different sessions rarely contend.
+    ``max_bytes`` and ``max_sessions`` are split evenly across shards, and
+    each shard evicts its own least recently used sessions, so the totals
+    are enforced without any cross-shard locking.
+    """
+    
+    def __init__(self, default_ttl: int = 3600, shard_count: int = 16,  # 1 hour default
+                 max_bytes: Optional[int] = None, max_sessions: Optional[int] = None):
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        shard_count = max(1, shard_count)
+        shard_bytes = None if max_bytes is None else max(1, max_bytes // shard_count)
+        shard_sessions = None if max_sessions is None else max(1, -(-max_sessions // shard_count))
+        self._shards = [
+            MemoryShard(default_ttl, max_bytes=shard_bytes, max_sessions=shard_sessions)
+            for _ in range(shard_count)
+        ]
+        self._next_cleanup_shard = 0
+    
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+    
+    def _shard(self, session_id: str) -> MemoryShard:
+        return self._shards[hash(session_id) % len(self._shards)]
+    
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        return self._shard(session_id).create_session(session_id)
+    
+    def store(self, session_id: str, key: str, value: Any, 
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory"""
+        self._shard(session_id).store(session_id, key, value, ttl_seconds, metadata)
+    
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        """Retrieve a value from session memory"""
+        return self._shard(session_id).retrieve(session_id, key)
+    
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and refresh its TTL"""
+        return self._shard(session_id).append_messages(session_id, key, messages, ttl_seconds)
+    
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log"""
+        return self._shard(session_id).read_tail(session_id, key, n)
+    
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+        return self._shard(session_id).read_range(session_id, key, start, end)
+    
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``"""
+        return self._shard(session_id).read_window(session_id, key, max_tokens, start)
+    
+    def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+        return self._shard(session_id).log_length(session_id, key)
+    
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        """Get all non-expired entries for a session"""
+        return self._shard(session_id).get_all(session_id)
+    
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+        return self._shard(session_id).delete(session_id, key)
+    
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+        return self._shard(session_id).clear_session(session_id)
+    
+    def clear(self) -> None:
+        """Drop every session"""
+        for shard in self._shards:
+            shard.clear()
+    
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        """Clean up expired entries across all shards
+        
+        With ``limit`` set, the budget is split across shards, starting from a
+        different shard each call so none is starved.
+        """
+        shard_count = len(self._shards)
+        start = self._next_cleanup_shard
+        self._next_cleanup_shard = (start + 1) % shard_count
+        per_shard = None if limit is None else max(1, limit // shard_count)
+        
+        cleaned_count = 0
+        for offset in range(shard_count):
+            cleaned_count += self._shards[(start + offset) % shard_count].cleanup_expired(per_shard)
+        return cleaned_count
+    
+    def has_expired(self) -> bool:
+        """Check whether any expiry record is due"""
+        return any(shard.has_expired() for shard in self._shards)
+    
+    def get_session_count(self) -> int:
+        """Get number of active sessions"""
+        return sum(shard.get_session_count() for shard in self._shards)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get memory store statistics"""
-        with self._lock:
-            total_entries = sum(len(session) for session in self._store.values())
-            return {
-                "active_sessions": len(self._store),
-                "total_entries": total_entries,
-                "sessions": {
-                    session_id: len(entries) 
-                    for session_id, entries in self._store.items()
-                }
-            }
+        shard_stats = [shard.get_stats() for shard in self._shards]
+        return {
+            "active_sessions": sum(stats["active_sessions"] for stats in shard_stats),
+            "total_entries": sum(stats["total_entries"] for stats in shard_stats),
+            "total_bytes": sum(stats["total_bytes"] for stats in shard_stats),
+            "max_bytes": self.max_bytes,
+            "max_sessions": self.max_sessions,
+            "expired_entries": sum(stats["expired_entries"] for stats in shard_stats),
+            "evicted_sessions": sum(stats["evicted_sessions"] for stats in shard_stats),
+            "evicted_bytes": sum(stats["evicted_bytes"] for stats in shard_stats),
+            "shards": shard_stats
+        }
+    
+    def export_sessions(self) -> Iterator[Tuple[str, List[Tuple[str, float, bool, int, Any]]]]:
+        """Yield every session's live entries, copying one shard at a time"""
+        for shard in self._shards:
+            yield from shard.export_sessions()
+    
+    def load_session(self, session_id: str, entries: List[Tuple[str, float, bool, int, Any]]) -> None:
+        """Insert restored entries for a session; deadlines are monotonic"""
+        self._shard(session_id).load_session(session_id, entries)
+    
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of per-session detail, walking shards in order
+        
+        ``cursor`` is the ``next_cursor`` from the previous page, of the form
+        ``"<shard>:<last session id>"``. ``next_cursor`` is None on the last page.
+        """
+        shard_index, after = 0, None
+        if cursor:
+            index, _, last = cursor.partition(":")
+            try:
+                shard_index = int(index)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            after = last or None
+        
+        sessions: List[Dict[str, Any]] = []
+        next_cursor = None
+        while shard_index < len(self._shards):
+            remaining = limit - len(sessions)
+            page = self._shards[shard_index].list_sessions(after, remaining)
+            for session in page:
+                session["shard"] = shard_index
+            sessions.extend(page)
+            if len(page) == remaining:
+                next_cursor = f"{shard_index}:{page[-1]['session_id']}"
+                break
+            shard_index += 1
+            after = None
+        
+        return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+def _env_limit(name: str, default: int) -> Optional[int]:
+    """A positive integer limit from the environment; 0 disables it"""
+    value = int(os.getenv(name, str(default)))
+    return value if value > 0 else None
+
+
+def _with_write_behind(backend: MemoryBackend, single_writer: bool) -> MemoryBackend:
+    """Buffer writes to a durable backend when CHAT_WRITE_BEHIND is turned on
+
+    Buffered writes are invisible to other workers sharing the backend
+    until they are flushed, so interleaved requests for one session on two
+    workers could read stale history and reorder turns. That is only safe
+    when session affinity routes every session to one writer.
+    """
+    if os.getenv("CHAT_WRITE_BEHIND", "false").strip().lower() not in ("1", "true", "yes", "on"):
+        return backend
+    if not single_writer:
+        logger.warning(
+            "CHAT_WRITE_BEHIND is on without session affinity; other workers sharing the "
+            "backend won't see buffered writes until they are flushed"
+        )
+    from .write_behind import WriteBehindStore
+    return WriteBehindStore(
+        backend,
+        interval=float(os.getenv("CHAT_WRITE_BEHIND_INTERVAL", "1.0")),
+        max_pending=int(os.getenv("CHAT_WRITE_BEHIND_MAX_PENDING", "500")),
+        max_attempts=int(os.getenv("CHAT_WRITE_BEHIND_MAX_ATTEMPTS", "3"))
+    )
+
+
+def _in_memory_store() -> InMemoryStore:
+    return InMemoryStore(
+        shard_count=int(os.getenv("CHAT_MEMORY_SHARDS", "16")),
+        max_bytes=_env_limit("CHAT_MEMORY_MAX_BYTES", 256 * 1024 * 1024),
+        max_sessions=_env_limit("CHAT_MEMORY_MAX_SESSIONS", 100000)
+    )
+
+
+def _shared_memory_store(backend: str, publish: bool = False, single_writer: bool = False) -> MemoryBackend:
+    if backend == "sqlite":
+        from .sqlite_store import SQLiteStore
+        return _with_write_behind(SQLiteStore(os.getenv("CHAT_SQLITE_PATH", "chat_memory.db")), single_writer)
+    if backend == "redis":
+        from .redis_store import RedisStore
+        # Not buffered: pending writes would be invisible to the other
+        # workers that share the server, and each write is already one round trip
+        return RedisStore(
+            os.getenv("CHAT_REDIS_URL", "redis://localhost:6379/0"),
+            prefix=os.getenv("CHAT_REDIS_PREFIX", "chat:"),
+            max_connections=int(os.getenv("CHAT_REDIS_MAX_CONNECTIONS", "32")),
+            publish=publish
+        )
+    raise ValueError(f"Unknown memory backend: {backend}")
+
+
+def create_memory_store() -> MemoryBackend:
+    """Build the backend named by CHAT_MEMORY_BACKEND ("memory", "sqlite" or "redis")
+    
+    A shared backend gets a local cache in front of it: of the sessions
+    this worker owns when session affinity is configured, otherwise of
+    recently used sessions when CHAT_NEAR_CACHE is set.
+    """
+    backend = os.getenv("CHAT_MEMORY_BACKEND", "memory").strip().lower()
+    if backend == "memory":
+        return _in_memory_store()
+    near_cache = os.getenv("CHAT_NEAR_CACHE", "false").strip().lower() in ("1", "true", "yes", "on")
+    from .affinity import AffinityStore, session_affinity
+    if near_cache and session_affinity.enabled:
+        # Nothing would consume the invalidations, so don't publish them
+        logger.warning("CHAT_NEAR_CACHE is ignored because session affinity is configured")
+        near_cache = False
+    shared = _shared_memory_store(backend, publish=near_cache, single_writer=session_affinity.enabled)
+    if session_affinity.enabled:
+        return AffinityStore(_in_memory_store(), shared, session_affinity)
+    if near_cache:
+        from .near_cache import NearCacheStore
+        if not shared.supports_versions:
+            raise ValueError(f"The near cache is not supported by the {backend} backend")
+        return NearCacheStore(
+            InMemoryStore(
+                max_bytes=_env_limit("CHAT_NEAR_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                max_sessions=_env_limit("CHAT_NEAR_CACHE_SESSIONS", 10000)
+            ),
+            shared,
+            revalidate_after=float(os.getenv("CHAT_NEAR_CACHE_REVALIDATE", "5"))
+        )
+    return shared
 
 
-memory_store = InMemoryStore()
\ No newline at end of file
+memory_store = create_memory_store()
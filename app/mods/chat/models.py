@@ -2,18 +2,28 @@
 Pydantic models for chat API
 """
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
+
+
+class ArtifactRef(BaseModel):
+    id: Optional[str] = None
+    filename: str
+    language: str
+    # Kept inline unless the artifact store is durable
+    content: Optional[str] = None
 
 
 class ChatMessage(BaseModel):
     role: str
     content: str
+    artifacts: Optional[List[ArtifactRef]] = None
 
 
 class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[ChatMessage]] = []
     session_id: Optional[str] = None
+    intent: Optional[Literal["chat", "code"]] = None
 
 
 class CodeGenerationRequest(BaseModel):
@@ -24,6 +34,7 @@ class CodeFile(BaseModel):
     filename: str
     content: str
     language: str
+    artifact_id: Optional[str] = None
 
 
 class CodeGenerationResponse(BaseModel):
@@ -0,0 +1,250 @@
+"""
+Process-local cache of sessions in front of a shared, versioned backend
+"""
+import uuid
+from contextlib import ExitStack
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from .memory_backend import (
+    MemoryBackend, WriteOp, OP_APPEND, OP_CLEAR, OP_CREATE, OP_DELETE, OP_SET
+)
+from .memory_store import InMemoryStore
+
+
+# Local-only key holding ``(version, checked_at)`` for a cached session
+VERSION_KEY = "__near_cache_version__"
+
+# Sessions are hashed onto this many locks, so work on one session's copy
+# only waits for sessions on the same stripe
+LOCK_STRIPES = 64
+
+T = TypeVar("T")
+
+
+class NearCacheStore(MemoryBackend):
+    """Serves reads from a bounded local copy of recently used sessions
+
+    ``remote`` must support versions: every write to a session, from any
+    process, advances its version. A cached session is a local copy of
+    all its entries plus the version it was copied at.
+
+    - With invalidations subscribed, writes elsewhere drop the local copy
+      as they are announced, so reads are local. The version is still
+      checked once the copy is ``revalidate_after`` seconds old, which
+      bounds staleness if an announcement is lost.
+    - Without a subscription, every read first checks the version, one
+      small round trip instead of fetching the history.
+
+    Writes go to ``remote`` first. If the new version is exactly one past
+    the cached one, no other process wrote in between and the write is
+    applied to the local copy too; otherwise the copy is dropped and
+    reloaded on the next read.
+
+    Values are reloaded with the default TTL, since the remote doesn't
+    report what is left of theirs; a cached entry can outlive its remote
+    TTL until the session is next written. Sessions with no entries on the
+    remote aren't cached, so reads of unknown IDs don't fill the cache.
+    """
+
+    def __init__(self, local: InMemoryStore, remote: MemoryBackend, revalidate_after: float = 5.0):
+        if not remote.supports_versions:
+            raise ValueError("The near cache needs a backend with session versions")
+        self.local = local
+        self.remote = remote
+        self.revalidate_after = revalidate_after
+        self.default_ttl = remote.default_ttl
+        self.subscribed = False
+        self._locks = [Lock() for _ in range(LOCK_STRIPES)]
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def _lock(self, session_id: str) -> Lock:
+        return self._locks[hash(session_id) % LOCK_STRIPES]
+
+    def _cached_version(self, session_id: str) -> Optional[int]:
+        cached = self.local.retrieve(session_id, VERSION_KEY)
+        return cached[0] if cached is not None else None
+
+    def _load(self, session_id: str) -> None:
+        """Copy a session from ``remote``, unless it has no entries there
+
+        The version is read first, so a write that lands in between makes
+        the copy look older than it is and it is simply reloaded later.
+        """
+        self.loads += 1
+        version = self.remote.session_version(session_id)
+        entries = self.remote.get_all(session_id)
+        with self._lock(session_id):
+            self.local.clear_session(session_id)
+            if not entries:
+                return
+            for key, value in entries.items():
+                self.local.store(session_id, key, value)
+            self.local.store(session_id, VERSION_KEY, (version, monotonic()))
+
+    def _ensure(self, session_id: str) -> None:
+        """Make the local copy of a session current before reading it"""
+        with self._lock(session_id):
+            cached = self.local.retrieve(session_id, VERSION_KEY)
+        if cached is not None:
+            version, checked_at = cached
+            if self.subscribed and monotonic() - checked_at < self.revalidate_after:
+                self.hits += 1
+                return
+            self.revalidations += 1
+            if self.remote.session_version(session_id) == version:
+                with self._lock(session_id):
+                    if self._cached_version(session_id) == version:
+                        self.local.store(session_id, VERSION_KEY, (version, monotonic()))
+                        return
+        self._load(session_id)
+
+    def _read(self, session_id: str, read: Callable[[MemoryBackend], T]) -> T:
+        """Run ``read`` on the local copy once it is current, or on ``remote`` if there is none
+
+        The read holds the session's lock, so an invalidation can't clear
+        the copy halfway through; one landing after the check sends the
+        read remote.
+        """
+        self._ensure(session_id)
+        with self._lock(session_id):
+            if self._cached_version(session_id) is not None:
+                return read(self.local)
+        return read(self.remote)
+
+    def _write(self, session_id: str, op: WriteOp) -> bool:
+        """Write through to ``remote``; returns whether the local copy was updated too"""
+        with self._lock(session_id):
+            cached = self._cached_version(session_id)
+        version = self.remote.versioned_write(session_id, [op])
+        with self._lock(session_id):
+            if cached is not None and version == cached + 1 and self._cached_version(session_id) == cached:
+                self.local.write_batch([op])
+                self.local.store(session_id, VERSION_KEY, (version, monotonic()))
+                return True
+            self.local.clear_session(session_id)
+            return False
+
+    def invalidate(self, session_id: Optional[str], version: Optional[int]) -> None:
+        """Drop local copies older than an announced write; everything if ``session_id`` is None"""
+        if session_id is None:
+            with ExitStack() as stack:
+                for lock in self._locks:
+                    stack.enter_context(lock)
+                self.invalidations += 1
+                self.local.clear()
+            return
+        with self._lock(session_id):
+            cached = self._cached_version(session_id)
+            if cached is not None and cached < version:
+                self.invalidations += 1
+                self.local.clear_session(session_id)
+
+    # Writes
+
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        version = self.remote.versioned_write(session_id, [(OP_CREATE, session_id)])
+        with self._lock(session_id):
+            self.local.create_session(session_id)
+            self.local.store(session_id, VERSION_KEY, (version, monotonic()))
+        return session_id
+
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory"""
+        self._write(session_id, (OP_SET, session_id, key, value, ttl_seconds))
+
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and return its length"""
+        if self._write(session_id, (OP_APPEND, session_id, key, list(messages), ttl_seconds)):
+            return self.local.log_length(session_id, key)
+        return self.remote.log_length(session_id, key)
+
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+        existed = self.retrieve(session_id, key) is not None
+        self._write(session_id, (OP_DELETE, session_id, key))
+        return existed
+
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+        existed = bool(self.get_all(session_id))
+        self._write(session_id, (OP_CLEAR, session_id))
+        return existed
+
+    def write_batch(self, ops: List[WriteOp]) -> None:
+        for op in ops:
+            kind = op[0]
+            if kind in (OP_SET, OP_APPEND, OP_DELETE, OP_CLEAR):
+                self._write(op[1], op)
+            elif kind == OP_CREATE:
+                self.create_session(op[1])
+            else:
+                raise ValueError(f"Unknown write operation: {kind}")
+
+    # Reads
+
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        return self._read(session_id, lambda store: store.retrieve(session_id, key))
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        return self._read(session_id, lambda store: store.read_tail(session_id, key, n))
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        return self._read(session_id, lambda store: store.read_range(session_id, key, start, end))
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        return self._read(session_id, lambda store: store.read_window(session_id, key, max_tokens, start))
+
+    def log_length(self, session_id: str, key: str) -> int:
+        return self._read(session_id, lambda store: store.log_length(session_id, key))
+
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        result = self._read(session_id, lambda store: store.get_all(session_id))
+        result.pop(VERSION_KEY, None)
+        return result
+
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        return self.remote.cleanup_expired(limit) + self.local.cleanup_expired(limit)
+
+    def has_expired(self) -> bool:
+        return self.remote.has_expired() or self.local.has_expired()
+
+    def get_session_count(self) -> int:
+        return self.remote.get_session_count()
+
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        return self.remote.list_sessions(cursor, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.remote.get_stats()
+        local = self.local.get_stats()
+        stats["near_cache"] = {
+            "subscribed": self.subscribed,
+            "revalidate_after_seconds": self.revalidate_after,
+            "cached_sessions": local.get("active_sessions"),
+            "cached_bytes": local.get("total_bytes"),
+            "max_bytes": local.get("max_bytes"),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+            "invalidations": self.invalidations
+        }
+        return stats
+
+    def start(self) -> None:
+        self.remote.start()
+        self.subscribed = self.remote.subscribe_invalidations(self.invalidate)
+
+    async def stop(self) -> None:
+        await self.remote.stop()
+
+    def close(self) -> None:
+        self.remote.close()
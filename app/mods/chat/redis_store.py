@@ -0,0 +1,665 @@
+"""
+Redis-backed session memory shared by every worker and pod
+"""
+import logging
+import secrets
+import uuid
+from time import sleep, time
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from .context_window import message_tokens, window_start
+from .memory_backend import (
+    AsyncMemoryStore, InvalidationCallback, MemoryBackend, WriteOp,
+    OP_APPEND, OP_CLEAR, OP_CREATE, OP_DELETE, OP_SET
+)
+from .serialization import decode, encode
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # pragma: no cover - optional backend
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class CommandBatch:
+    """Redis commands recorded for one round trip
+
+    Calling a command method, such as ``batch.get(key)``, records it. A
+    store replays the batch on a sync or asyncio pipeline; ``transaction``
+    wraps it in MULTI/EXEC.
+    """
+
+    def __init__(self, transaction: bool = True):
+        self.transaction = transaction
+        self.commands: List[Tuple[str, Tuple[Any, ...], Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args: Any, **kwargs: Any) -> None:
+            self.commands.append((name, args, kwargs))
+        return record
+
+    def replay(self, pipe: Any) -> Any:
+        for name, args, kwargs in self.commands:
+            getattr(pipe, name)(*args, **kwargs)
+        return pipe
+
+
+# A plan yields the batches of an operation one round trip at a time, is
+# sent each batch's replies, and returns the operation's result
+Plan = Generator[CommandBatch, List[Any], Any]
+
+
+def _reads(*commands: Tuple[Any, ...]) -> CommandBatch:
+    """A non-transactional batch of ``(name, *args)`` commands"""
+    batch = CommandBatch(transaction=False)
+    for name, *args in commands:
+        getattr(batch, name)(*args)
+    return batch
+
+
+def _decode_entry(data: Optional[bytes], log: List[bytes]) -> Optional[Any]:
+    """The value of an entry from its plain value and its log, whichever exists"""
+    if data is not None:
+        return decode(data)
+    if log:
+        return [decode(item) for item in log]
+    return None
+
+
+def _decode_plain_list(data: Optional[bytes]) -> Optional[List[Any]]:
+    """An empty list stored as a plain value; anything else isn't a log"""
+    if data is None:
+        return None
+    value = decode(data)
+    return value if isinstance(value, list) else None
+
+
+def _window_bounds(tokens: List[bytes], start: int, max_tokens: int) -> Tuple[int, int]:
+    """Log indexes ``(first, last)`` of the newest messages from ``start`` that fit in ``max_tokens``
+
+    ``tokens`` are the token estimates of the messages at and after ``start``.
+    """
+    cumulative = [0]
+    for count in tokens:
+        cumulative.append(cumulative[-1] + int(count))
+    return start + window_start(cumulative, max_tokens), start + len(tokens) - 1
+
+
+class RedisLayout:
+    """Keys and command plans shared by ``RedisStore`` and ``AsyncRedisStore``
+
+    Nothing here talks to the server. Each operation is a ``Plan`` whose
+    batches the sync and asyncio stores run on their own clients, so both
+    read and write the same layout the same way.
+    """
+
+    def __init__(self, prefix: str = "chat:", default_ttl: int = 3600, publish: bool = False):
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.publish = publish
+        self.channel = f"{prefix}invalidations"
+        self.sessions_key = f"{prefix}sessions"
+
+    # Keys
+
+    def value_key(self, session_id: str, key: str) -> str:
+        return f"{self.prefix}{{{session_id}}}:v:{key}"
+
+    def log_key(self, session_id: str, key: str) -> str:
+        return f"{self.prefix}{{{session_id}}}:l:{key}"
+
+    def tokens_key(self, session_id: str, key: str) -> str:
+        return f"{self.prefix}{{{session_id}}}:t:{key}"
+
+    def keys_key(self, session_id: str) -> str:
+        return f"{self.prefix}{{{session_id}}}:keys"
+
+    def version_key(self, session_id: str) -> str:
+        return f"{self.prefix}{{{session_id}}}:version"
+
+    def entry_keys(self, session_id: str, key: str) -> Tuple[str, str, str]:
+        return self.value_key(session_id, key), self.log_key(session_id, key), self.tokens_key(session_id, key)
+
+    def ttl_ms(self, ttl_seconds: Optional[float]) -> int:
+        if ttl_seconds is None:
+            ttl_seconds = self.default_ttl
+        return max(1, int(ttl_seconds * 1000))
+
+    # Queued writes. Each adds commands to ``batch``.
+
+    def _register(self, batch: CommandBatch, session_id: str, key: str, ttl_ms: int, now: float) -> None:
+        """Index ``key`` under the session and extend the session's deadline"""
+        session_ms = max(ttl_ms, self.default_ttl * 1000)
+        keys_key = self.keys_key(session_id)
+        batch.sadd(keys_key, key)
+        # NX then GT: the key set lives as long as the longest-lived entry
+        batch.pexpire(keys_key, session_ms, nx=True)
+        batch.pexpire(keys_key, session_ms, gt=True)
+        batch.zadd(self.sessions_key, {session_id: now + session_ms / 1000}, gt=True)
+
+    def _queue_clear(self, batch: CommandBatch, session_id: str, keys: Iterable[bytes]) -> None:
+        doomed = [self.keys_key(session_id)]
+        for key in keys:
+            doomed.extend(self.entry_keys(session_id, key.decode("utf-8")))
+        batch.delete(*doomed)
+        batch.zrem(self.sessions_key, session_id)
+
+    def _queue_create(self, batch: CommandBatch, session_id: str, keys: Iterable[bytes], now: float) -> None:
+        self._queue_clear(batch, session_id, keys)
+        batch.zadd(self.sessions_key, {session_id: now + self.default_ttl})
+
+    def _queue_log(self, batch: CommandBatch, session_id: str, key: str, messages: List[Any],
+                   ttl_ms: int, now: float) -> None:
+        """Append to the log under ``key``, replacing any plain value"""
+        value_key, log_key, tokens_key = self.entry_keys(session_id, key)
+        batch.delete(value_key)
+        batch.rpush(log_key, *[encode(message) for message in messages])
+        batch.rpush(tokens_key, *[message_tokens(message) for message in messages])
+        batch.pexpire(log_key, ttl_ms)
+        batch.pexpire(tokens_key, ttl_ms)
+        self._register(batch, session_id, key, ttl_ms, now)
+
+    def _queue_store(self, batch: CommandBatch, session_id: str, key: str, value: Any,
+                     ttl_ms: int, now: float) -> None:
+        value_key, log_key, tokens_key = self.entry_keys(session_id, key)
+        batch.delete(log_key, tokens_key)
+        if isinstance(value, list) and value:
+            self._queue_log(batch, session_id, key, value, ttl_ms, now)
+            return
+        batch.set(value_key, encode(value), px=ttl_ms)
+        self._register(batch, session_id, key, ttl_ms, now)
+
+    def _queue_delete(self, batch: CommandBatch, session_id: str, key: str) -> None:
+        batch.delete(*self.entry_keys(session_id, key))
+        batch.srem(self.keys_key(session_id), key)
+
+    def _queue_bump(self, batch: CommandBatch, session_id: str) -> int:
+        """Advance the session's version; returns where its reply sits in the batch"""
+        version_key = self.version_key(session_id)
+        # Versions start at a random point, so a version key that expired
+        # and was recreated can't repeat numbers a cache has already seen
+        batch.set(version_key, secrets.randbits(48), nx=True)
+        index = len(batch)
+        batch.incr(version_key)
+        batch.pexpire(version_key, self.default_ttl * 1000)
+        return index
+
+    # Write plans
+
+    def session_keys(self, session_ids: List[str]) -> Plan:
+        """Read several sessions' key sets in one round trip"""
+        if not session_ids:
+            return {}
+        replies = yield _reads(*[("smembers", self.keys_key(session_id)) for session_id in session_ids])
+        return dict(zip(session_ids, replies))
+
+    def write_ops(self, ops: List[WriteOp], keys: Optional[Dict[str, List[bytes]]] = None) -> Plan:
+        """Apply ``ops`` in one transaction, advancing each written session's version once
+
+        Key sets of sessions being cleared or created are read first, in one
+        extra round trip, unless given in ``keys``. With ``publish`` set, the
+        new versions are announced afterwards. Returns the transaction's
+        replies and the new versions.
+        """
+        keys = dict(keys or {})
+        resets = [op[1] for op in ops if op[0] in (OP_CLEAR, OP_CREATE) and op[1] not in keys]
+        keys.update((yield from self.session_keys(resets)))
+        now = time()
+        batch = CommandBatch()
+        for op in ops:
+            kind = op[0]
+            if kind == OP_SET:
+                self._queue_store(batch, op[1], op[2], op[3], self.ttl_ms(op[4]), now)
+            elif kind == OP_APPEND:
+                if op[3]:
+                    self._queue_log(batch, op[1], op[2], op[3], self.ttl_ms(op[4]), now)
+            elif kind == OP_DELETE:
+                self._queue_delete(batch, op[1], op[2])
+            elif kind == OP_CLEAR:
+                self._queue_clear(batch, op[1], keys[op[1]])
+            elif kind == OP_CREATE:
+                self._queue_create(batch, op[1], keys[op[1]], now)
+            else:
+                raise ValueError(f"Unknown write operation: {kind}")
+        bumps = {
+            session_id: self._queue_bump(batch, session_id)
+            for session_id in dict.fromkeys(op[1] for op in ops)
+        }
+        replies = yield batch
+        versions = {session_id: replies[index] for session_id, index in bumps.items()}
+        if self.publish and versions:
+            yield _reads(*[
+                ("publish", self.channel, f"{session_id} {version}") for session_id, version in versions.items()
+            ])
+        return replies, versions
+
+    def create_session(self, session_id: Optional[str] = None) -> Plan:
+        keys = None
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+            keys = {session_id: []}
+        yield from self.write_ops([(OP_CREATE, session_id)], keys)
+        return session_id
+
+    def append(self, session_id: str, key: str, messages: List[Any], ttl_seconds: Optional[int] = None) -> Plan:
+        if not messages:
+            return (yield from self.log_length(session_id, key))
+        replies, _ = yield from self.write_ops([(OP_APPEND, session_id, key, messages, ttl_seconds)])
+        # DEL, then the message RPUSH, whose reply is the new length
+        return replies[1]
+
+    def delete(self, session_id: str, key: str) -> Plan:
+        replies, _ = yield from self.write_ops([(OP_DELETE, session_id, key)])
+        return replies[0] > 0
+
+    def clear_session(self, session_id: str) -> Plan:
+        replies, _ = yield from self.write_ops([(OP_CLEAR, session_id)])
+        return bool(replies[0] or replies[1])
+
+    # Read plans
+
+    def plain_list(self, session_id: str, key: str) -> Plan:
+        (data,) = yield _reads(("get", self.value_key(session_id, key)))
+        return _decode_plain_list(data)
+
+    def retrieve(self, session_id: str, key: str) -> Plan:
+        value_key, log_key, _ = self.entry_keys(session_id, key)
+        data, log = yield _reads(("get", value_key), ("lrange", log_key, 0, -1))
+        return _decode_entry(data, log)
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Plan:
+        value_key, log_key, _ = self.entry_keys(session_id, key)
+        if n is not None and n <= 0:
+            exists, data = yield _reads(("exists", log_key), ("get", value_key))
+            return [] if exists or _decode_plain_list(data) is not None else None
+        (items,) = yield _reads(("lrange", log_key, 0 if n is None else -n, -1))
+        if not items:
+            # Logs are never empty, so this is an empty list or nothing
+            return (yield from self.plain_list(session_id, key))
+        return [decode(item) for item in items]
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Plan:
+        log_key = self.log_key(session_id, key)
+        start = max(0, start)
+        if end is not None and end <= start:
+            items = []
+            (exists,) = yield _reads(("exists", log_key))
+        else:
+            items, exists = yield _reads(
+                ("lrange", log_key, start, -1 if end is None else end - 1), ("exists", log_key)
+            )
+        if not exists:
+            return (yield from self.plain_list(session_id, key))
+        return [decode(item) for item in items]
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Plan:
+        start = max(0, start)
+        tokens_key = self.tokens_key(session_id, key)
+        tokens, exists = yield _reads(("lrange", tokens_key, start, -1), ("exists", tokens_key))
+        if not exists:
+            return (yield from self.plain_list(session_id, key))
+        first, last = _window_bounds(tokens, start, max_tokens)
+        if first > last:
+            return []
+        (items,) = yield _reads(("lrange", self.log_key(session_id, key), first, last))
+        return [decode(item) for item in items]
+
+    def log_length(self, session_id: str, key: str) -> Plan:
+        (length,) = yield _reads(("llen", self.log_key(session_id, key)))
+        return length
+
+    def get_all(self, session_id: str) -> Plan:
+        (members,) = yield _reads(("smembers", self.keys_key(session_id)))
+        keys = sorted(key.decode("utf-8") for key in members)
+        if not keys:
+            return {}
+        commands = []
+        for key in keys:
+            commands.append(("get", self.value_key(session_id, key)))
+            commands.append(("lrange", self.log_key(session_id, key), 0, -1))
+        replies = yield _reads(*commands)
+        result = {}
+        for key, data, log in zip(keys, replies[::2], replies[1::2]):
+            if data is not None or log:
+                result[key] = _decode_entry(data, log)
+        return result
+
+
+class RedisStore(MemoryBackend):
+    """Session memory in Redis, or any server speaking its protocol
+
+    Each session's keys share a ``{session_id}`` hash tag, so they live in
+    one cluster slot:
+
+    - ``<prefix>{sid}:v:<key>`` holds an encoded plain value
+    - ``<prefix>{sid}:l:<key>`` and ``<prefix>{sid}:t:<key>`` hold a message
+      log as one list of encoded messages and a parallel list of their
+      token estimates, so windows are chosen without fetching content
+    - ``<prefix>{sid}:keys`` is the set of keys the session has written
+    - ``<prefix>{sid}:version`` is advanced by every write to the session
+
+    Non-empty lists are always stored as logs, so appending never has to
+    convert a stored value. Every key carries a native TTL and Redis
+    expires it. The ``<prefix>sessions`` sorted set maps session IDs to
+    their latest wall-clock deadline for counting and listing; cleanup
+    only prunes its expired members.
+
+    Each operation is one pipelined round trip, written as a MULTI/EXEC
+    transaction, except where a session's key set must be read first.
+    With ``publish`` set, every write is also announced as
+    ``"<session_id> <version>"`` on ``<prefix>invalidations`` for near
+    caches in other processes. The commands themselves come from
+    ``layout``, which ``AsyncRedisStore`` shares.
+    """
+
+    supports_versions = True
+
+    def __init__(self, url: str = "redis://localhost:6379/0", default_ttl: int = 3600,
+                 prefix: str = "chat:", max_connections: int = 32, client: Optional[Any] = None,
+                 publish: bool = False):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("The redis memory backend requires the redis package")
+            self.pool = redis.ConnectionPool.from_url(
+                url, max_connections=max_connections, socket_timeout=5,
+                socket_connect_timeout=5, health_check_interval=30
+            )
+            client = redis.Redis(connection_pool=self.pool)
+        else:
+            self.pool = None
+        self.client = client
+        self.url = url
+        self.layout = RedisLayout(prefix, default_ttl, publish)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self.max_connections = max_connections
+        self.publish = publish
+        self.channel = self.layout.channel
+        self._subscriber: Optional[Any] = None
+        self.expired_entries = 0
+
+    def _run(self, plan: Plan) -> Any:
+        """Run ``plan``, one pipeline per batch"""
+        replies = None
+        try:
+            while True:
+                batch = plan.send(replies)
+                if len(batch) == 1 and not batch.transaction:
+                    name, args, kwargs = batch.commands[0]
+                    replies = [getattr(self.client, name)(*args, **kwargs)]
+                    continue
+                with self.client.pipeline(transaction=batch.transaction) as pipe:
+                    replies = batch.replay(pipe).execute()
+        except StopIteration as done:
+            return done.value
+
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        return self._run(self.layout.create_session(session_id))
+
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory. ``metadata`` is not persisted."""
+        self._run(self.layout.write_ops([(OP_SET, session_id, key, value, ttl_seconds)]))
+
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        """Retrieve a value from session memory"""
+        return self._run(self.layout.retrieve(session_id, key))
+
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and refresh its TTL
+
+        Any plain value under ``key`` is replaced. Returns the log length.
+        """
+        return self._run(self.layout.append(session_id, key, messages, ttl_seconds))
+
+    def write_batch(self, ops: List[WriteOp]) -> None:
+        """Apply a batch of writes in one MULTI/EXEC
+
+        Key sets of sessions being cleared or created are read first, in one
+        extra round trip.
+        """
+        self._run(self.layout.write_ops(ops))
+
+    def versioned_write(self, session_id: str, ops: List[WriteOp]) -> int:
+        """Apply writes to one session and return its new version"""
+        _, versions = self._run(self.layout.write_ops(ops))
+        return versions[session_id]
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log, or None if there is none"""
+        return self._run(self.layout.read_tail(session_id, key, n))
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+        return self._run(self.layout.read_range(session_id, key, start, end))
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``
+
+        Only token counts are fetched to pick the window; message content is
+        fetched for the selected range alone.
+        """
+        return self._run(self.layout.read_window(session_id, key, max_tokens, start))
+
+    def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+        return self._run(self.layout.log_length(session_id, key))
+
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        """Get all non-expired entries for a session"""
+        return self._run(self.layout.get_all(session_id))
+
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+        return self._run(self.layout.delete(session_id, key))
+
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+        return self._run(self.layout.clear_session(session_id))
+
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        """Prune expired sessions from the session index
+
+        Redis expires the entries themselves; this removes index members
+        whose deadline has passed, up to ``limit`` of them, and returns how
+        many were removed.
+        """
+        now = time()
+        expired = self.client.zrangebyscore(
+            self.layout.sessions_key, "-inf", f"({now}", start=0, num=-1 if limit is None else limit,
+            withscores=True
+        )
+        if not expired:
+            return 0
+        # Removing by score rather than by member leaves alone any session
+        # whose deadline was extended since it was read
+        removed = self.client.zremrangebyscore(self.layout.sessions_key, "-inf", expired[-1][1])
+        self.expired_entries += removed
+        return removed
+
+    def has_expired(self) -> bool:
+        """Check whether the session index has members past their deadline"""
+        return bool(self.client.zcount(self.layout.sessions_key, "-inf", f"({time()}"))
+
+    def get_session_count(self) -> int:
+        """Get number of active sessions"""
+        return self.client.zcount(self.layout.sessions_key, time(), "+inf")
+
+    def _safe_url(self) -> str:
+        parts = urlsplit(self.url)
+        if parts.password is None:
+            return self.url
+        netloc = parts.netloc.replace(f":{parts.password}@", ":***@")
+        return urlunsplit(parts._replace(netloc=netloc))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics. ``total_bytes`` is the server's whole dataset."""
+        try:
+            used_memory = self.client.info("memory").get("used_memory")
+        except Exception:
+            used_memory = None
+        return {
+            "backend": "redis",
+            "url": self._safe_url(),
+            "prefix": self.prefix,
+            "max_connections": self.max_connections,
+            "active_sessions": self.get_session_count(),
+            "total_bytes": used_memory,
+            "expired_entries": self.expired_entries
+        }
+
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of sessions; ``cursor`` is the server's scan cursor
+
+        Pages come from ZSCAN, so their size is approximate and their order
+        is the server's, but every session present throughout the walk is
+        returned at least once.
+        """
+        next_cursor, members = self.client.zscan(self.layout.sessions_key, int(cursor or 0), count=limit)
+        now = time()
+        session_ids = [member.decode("utf-8") for member, deadline in members if deadline >= now]
+        keys = self._run(self.layout.session_keys(session_ids))
+        with self.client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                for key in keys[session_id]:
+                    pipe.llen(self.layout.log_key(session_id, key.decode("utf-8")))
+            lengths = iter(pipe.execute())
+        sessions = []
+        for session_id in session_ids:
+            names = sorted(key.decode("utf-8") for key in keys[session_id])
+            sessions.append({
+                "session_id": session_id,
+                "entries": len(names),
+                "messages": sum(next(lengths) for _ in names),
+                "keys": names
+            })
+        return {"sessions": sessions, "next_cursor": str(next_cursor) if next_cursor else None}
+
+    def session_version(self, session_id: str) -> int:
+        """Current version of a session; 0 if it has never been written"""
+        return int(self.client.get(self.layout.version_key(session_id)) or 0)
+
+    def check_server(self) -> None:
+        """Fail early if the server lacks the PEXPIRE NX/GT options every write uses (Redis 7.0+)"""
+        try:
+            self.client.pexpire(f"{self.prefix}server-check", 1, nx=True)
+        except redis.ResponseError as e:
+            raise RuntimeError(
+                f"The redis memory backend needs Redis 7.0 or newer at {self._safe_url()}: {e}"
+            ) from e
+
+    def start(self) -> None:
+        self.check_server()
+
+    def subscribe_invalidations(self, callback: InvalidationCallback) -> bool:
+        """Listen on the invalidation channel in a background thread"""
+        if self._subscriber is not None:
+            return True
+
+        def on_message(message: Dict[str, Any]) -> None:
+            session_id, _, version = message["data"].decode("utf-8").rpartition(" ")
+            callback(session_id, int(version))
+
+        def on_error(error: Exception, pubsub: Any, thread: Any) -> None:
+            # Messages sent while disconnected are lost; the subscriber
+            # reconnects and resubscribes on its next read
+            logger.warning("Invalidation subscription interrupted: %s", error)
+            callback(None, None)
+            sleep(1.0)
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: on_message})
+        self._subscriber = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=on_error)
+        return True
+
+    def close(self) -> None:
+        if self._subscriber is not None:
+            self._subscriber.stop()
+            self._subscriber = None
+        if self.pool is not None:
+            self.pool.disconnect()
+
+
+class AsyncRedisStore(AsyncMemoryStore):
+    """Native asyncio access to the data a ``RedisStore`` manages
+
+    Uses redis.asyncio with its own connection pool, and runs the same
+    ``layout`` plans as ``store``, so both can serve the same sessions side
+    by side.
+    """
+
+    def __init__(self, store: RedisStore, client: Optional[Any] = None):
+        self.backend = store
+        self.layout = store.layout
+        if client is None:
+            if redis is None:
+                raise RuntimeError("The redis memory backend requires the redis package")
+            client = redis.asyncio.Redis(connection_pool=redis.asyncio.ConnectionPool.from_url(
+                store.url, max_connections=store.max_connections, socket_timeout=5,
+                socket_connect_timeout=5, health_check_interval=30
+            ))
+        self.client = client
+        self.calls = 0
+
+    async def _run(self, plan: Plan) -> Any:
+        """Run ``plan``, one pipeline per batch"""
+        self.calls += 1
+        replies = None
+        try:
+            while True:
+                batch = plan.send(replies)
+                if len(batch) == 1 and not batch.transaction:
+                    name, args, kwargs = batch.commands[0]
+                    replies = [await getattr(self.client, name)(*args, **kwargs)]
+                    continue
+                async with self.client.pipeline(transaction=batch.transaction) as pipe:
+                    replies = await batch.replay(pipe).execute()
+        except StopIteration as done:
+            return done.value
+
+    async def create_session(self, session_id: Optional[str] = None) -> str:
+        return await self._run(self.layout.create_session(session_id))
+
+    async def get(self, session_id: str, key: str) -> Optional[Any]:
+        return await self._run(self.layout.retrieve(session_id, key))
+
+    async def set(self, session_id: str, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        await self._run(self.layout.write_ops([(OP_SET, session_id, key, value, ttl_seconds)]))
+
+    async def append(self, session_id: str, key: str, messages: List[Any],
+                     ttl_seconds: Optional[int] = None) -> int:
+        return await self._run(self.layout.append(session_id, key, messages, ttl_seconds))
+
+    async def expire(self, session_id: str, key: Optional[str] = None) -> bool:
+        if key is not None:
+            return await self._run(self.layout.delete(session_id, key))
+        return await self._run(self.layout.clear_session(session_id))
+
+    async def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        return await self._run(self.layout.read_tail(session_id, key, n))
+
+    async def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        return await self._run(self.layout.read_range(session_id, key, start, end))
+
+    async def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        return await self._run(self.layout.read_window(session_id, key, max_tokens, start))
+
+    async def log_length(self, session_id: str, key: str) -> int:
+        return await self._run(self.layout.log_length(session_id, key))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": "native", "calls": self.calls}
@@ -0,0 +1,308 @@
+"""
+Routing between code generation and streaming chat
+"""
+import os
+import json
+import math
+import hashlib
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from time import perf_counter_ns
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .intent import classify_intent
+
+ROUTE_CODE = "code"
+ROUTE_CHAT = "chat"
+ROUTES = (ROUTE_CODE, ROUTE_CHAT)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Where a message should be sent and why. ``confidence`` is P(route is code)"""
+    route: str
+    strategy: str
+    confidence: float
+    cached: bool = False
+
+
+class RoutingStrategy(ABC):
+    """Decides a route for a message. Subclasses set ``name`` and implement ``decide``"""
+    name = "base"
+
+    @abstractmethod
+    def decide(self, message: str) -> Tuple[str, float]:
+        """Return ``(route, confidence)`` where confidence is P(route is code)"""
+
+
+class KeywordStrategy(RoutingStrategy):
+    """The keyword and pattern heuristic from intent.classify_intent"""
+    name = "keyword"
+
+    def decide(self, message: str) -> Tuple[str, float]:
+        score = classify_intent(message)
+        return (ROUTE_CODE if score.is_programming else ROUTE_CHAT), score.confidence
+
+
+# Small labelled corpus the n-gram model is trained on when no weights file is
+# configured. 1 means code generation, 0 means chat.
+SEED_CORPUS: Tuple[Tuple[str, int], ...] = (
+    ("Create a simple HTML button", 1),
+    ("Build a React component for user login", 1),
+    ("Make a Python function to calculate fibonacci", 1),
+    ("Show me a CSS grid layout", 1),
+    ("Write a REST API endpoint in FastAPI", 1),
+    ("Generate a landing page with a contact form", 1),
+    ("Can you give me code for a todo list app", 1),
+    ("I need the files for a portfolio website", 1),
+    ("Write a script that renames every file in a folder", 1),
+    ("Build a full stack dashboard with charts", 1),
+    ("Implement binary search in JavaScript", 1),
+    ("Create a login page with HTML and CSS", 1),
+    ("Make a navbar component with a dropdown menu", 1),
+    ("Write a SQL query that finds duplicate emails", 1),
+    ("Generate a Vue component that shows a product card", 1),
+    ("Code a tic tac toe game in the browser", 1),
+    ("Hello, how are you?", 0),
+    ("What did we talk about earlier?", 0),
+    ("Can you summarise the plot of Moby Dick?", 0),
+    ("Thanks, that was really helpful!", 0),
+    ("What's the capital of Australia?", 0),
+    ("Explain the difference between TCP and UDP", 0),
+    ("Can I swap cinnamon for nutmeg in apple pie?", 0),
+    ("Tell me a joke about cats", 0),
+    ("How do I make my sourdough rise more?", 0),
+    ("What is the best way to learn a new language?", 0),
+    ("Please tidy up these meeting notes", 0),
+    ("Why is the sky blue?", 0),
+    ("Recommend a good science fiction book", 0),
+    ("What does a product manager do all day?", 0),
+    ("How can I build better habits?", 0),
+    ("Write me a short poem about autumn", 0),
+)
+
+
+def _features(message: str, dimensions: int) -> Dict[int, float]:
+    """Hashed word unigrams and bigrams.
+
+    Uses crc32 rather than hash() so trained weights stay valid across processes.
+    """
+    words = message.lower().split()
+    counts: Dict[int, float] = {}
+    previous = "<s>"
+    for word in words:
+        word = word.strip(".,!?;:'\"()[]{}")
+        if not word:
+            continue
+        for gram in (word, previous + " " + word):
+            index = zlib.crc32(gram.encode("utf-8", "surrogatepass")) % dimensions
+            counts[index] = counts.get(index, 0.0) + 1.0
+        previous = word
+    if counts:
+        norm = math.sqrt(sum(value * value for value in counts.values()))
+        for index in counts:
+            counts[index] /= norm
+    return counts
+
+
+class HashedNGramStrategy(RoutingStrategy):
+    """Logistic regression over hashed word n-grams"""
+    name = "ngram"
+
+    def __init__(self, dimensions: int = 2 ** 12, threshold: float = 0.5):
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.weights: List[float] = [0.0] * dimensions
+        self.bias = 0.0
+
+    def fit(self, samples: Iterable[Tuple[str, int]], epochs: int = 30,
+            learning_rate: float = 0.5, l2: float = 1e-4) -> "HashedNGramStrategy":
+        """Train with plain SGD on ``(message, label)`` pairs"""
+        featurized = [(_features(message, self.dimensions), label) for message, label in samples]
+        for _ in range(epochs):
+            for features, label in featurized:
+                error = self.predict_proba_features(features) - label
+                for index, value in features.items():
+                    self.weights[index] -= learning_rate * (error * value + l2 * self.weights[index])
+                self.bias -= learning_rate * error
+        return self
+
+    def predict_proba_features(self, features: Dict[int, float]) -> float:
+        z = self.bias + sum(self.weights[index] * value for index, value in features.items())
+        if z < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def predict_proba(self, message: str) -> float:
+        return self.predict_proba_features(_features(message, self.dimensions))
+
+    def decide(self, message: str) -> Tuple[str, float]:
+        probability = self.predict_proba(message)
+        return (ROUTE_CODE if probability >= self.threshold else ROUTE_CHAT), probability
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "dimensions": self.dimensions,
+            "threshold": self.threshold,
+            "bias": self.bias,
+            "weights": {str(i): w for i, w in enumerate(self.weights) if w}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "HashedNGramStrategy":
+        model = cls(dimensions=int(data["dimensions"]), threshold=float(data.get("threshold", 0.5)))
+        model.bias = float(data["bias"])
+        for index, weight in data["weights"].items():
+            model.weights[int(index)] = float(weight)
+        return model
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "HashedNGramStrategy":
+        """Load weights from a JSON file, or train on the seed corpus"""
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        return cls().fit(SEED_CORPUS)
+
+
+class _LatencyStats:
+    __slots__ = ("calls", "total_ns", "max_ns", "code")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.code = 0
+
+    def record(self, elapsed_ns: int, route: str) -> None:
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if route == ROUTE_CODE:
+            self.code += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "code_routes": self.code,
+            "avg_us": round(self.total_ns / self.calls / 1000, 2) if self.calls else 0.0,
+            "max_us": round(self.max_ns / 1000, 2)
+        }
+
+
+def normalize_message(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+class IntentRouter:
+    """Routes messages with one primary strategy and caches decisions.
+
+    Decisions are cached by a hash of the normalized message. ``shadow``
+    strategies run on cache misses purely to collect latency and agreement
+    numbers; they never change the route. A client hint bypasses both.
+    """
+
+    def __init__(self, strategy: RoutingStrategy, shadow: Sequence[RoutingStrategy] = (),
+                 cache_size: int = 4096):
+        self.strategy = strategy
+        self.shadow = list(shadow)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+        self._latency: Dict[str, _LatencyStats] = {
+            s.name: _LatencyStats() for s in [strategy, *self.shadow]
+        }
+        self._agreement: Dict[str, int] = {s.name: 0 for s in self.shadow}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.hinted = 0
+
+    @staticmethod
+    def _cache_key(message: str) -> bytes:
+        return hashlib.blake2b(normalize_message(message).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def route(self, message: str, hint: Optional[str] = None) -> RouteDecision:
+        if hint in ROUTES:
+            with self._lock:
+                self.hinted += 1
+            return RouteDecision(route=hint, strategy="client_hint", confidence=1.0)
+
+        key = self._cache_key(message)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return RouteDecision(route=cached[0], strategy=self.strategy.name,
+                                     confidence=cached[1], cached=True)
+            self.cache_misses += 1
+
+        route, confidence = self._timed(self.strategy, message)
+        for strategy in self.shadow:
+            shadow_route, _ = self._timed(strategy, message)
+            if shadow_route == route:
+                with self._lock:
+                    self._agreement[strategy.name] += 1
+
+        with self._lock:
+            self._cache[key] = (route, confidence)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return RouteDecision(route=route, strategy=self.strategy.name, confidence=confidence)
+
+    def _timed(self, strategy: RoutingStrategy, message: str) -> Tuple[str, float]:
+        start = perf_counter_ns()
+        route, confidence = strategy.decide(message)
+        elapsed = perf_counter_ns() - start
+        with self._lock:
+            self._latency[strategy.name].record(elapsed, route)
+        return route, confidence
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "strategy": self.strategy.name,
+                "cache": {
+                    "size": len(self._cache),
+                    "max_size": self.cache_size,
+                    "hits": self.cache_hits,
+                    "misses": self.cache_misses
+                },
+                "client_hints": self.hinted,
+                "strategies": {name: stats.as_dict() for name, stats in self._latency.items()},
+                "shadow_agreement": dict(self._agreement)
+            }
+
+
+def build_strategy(name: str) -> RoutingStrategy:
+    name = name.strip().lower()
+    if name == KeywordStrategy.name:
+        return KeywordStrategy()
+    if name == HashedNGramStrategy.name:
+        return HashedNGramStrategy.load(os.getenv("CHAT_ROUTER_MODEL_PATH"))
+    raise ValueError(f"Unknown routing strategy: {name}")
+
+
+def create_intent_router() -> IntentRouter:
+    """Build the router from CHAT_ROUTER_STRATEGY, CHAT_ROUTER_SHADOW and CHAT_ROUTER_CACHE_SIZE"""
+    strategy = build_strategy(os.getenv("CHAT_ROUTER_STRATEGY", KeywordStrategy.name))
+    shadow = [
+        build_strategy(name)
+        for name in os.getenv("CHAT_ROUTER_SHADOW", "").split(",")
+        if name.strip() and name.strip().lower() != strategy.name
+    ]
+    return IntentRouter(
+        strategy,
+        shadow=shadow,
+        cache_size=int(os.getenv("CHAT_ROUTER_CACHE_SIZE", "4096"))
+    )
+
+
+intent_router = create_intent_router()
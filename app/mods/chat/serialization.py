@@ -0,0 +1,85 @@
+"""
+Byte encoding for values kept by durable memory backends
+"""
+import json
+from typing import Any, Dict, Type
+from pydantic import BaseModel
+from .conversation_log import ConversationLog
+from .models import ArtifactRef, ChatMessage
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+
+# Models that can round-trip through a backend, by tag
+MODELS: Dict[str, Type[BaseModel]] = {
+    "ChatMessage": ChatMessage,
+    "ArtifactRef": ArtifactRef,
+}
+_MODEL_TAG = "$model"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        name = type(value).__name__
+        if name in MODELS:
+            data = value.model_dump(exclude_none=True)
+            data[_MODEL_TAG] = name
+            return data
+    if isinstance(value, ConversationLog):
+        return list(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _object_hook(data: Dict[str, Any]) -> Any:
+    name = data.pop(_MODEL_TAG, None)
+    if name is None:
+        return data
+    return MODELS[name].model_validate(data)
+
+
+_ENCODER = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+_DECODER = json.JSONDecoder(object_hook=_object_hook)
+
+
+def encode(value: Any) -> bytes:
+    """Encode a stored value as compact UTF-8 JSON, tagging known models
+
+    Lone surrogates, which clients can send as JSON escapes, are kept
+    rather than rejected.
+    """
+    return _ENCODER.encode(value).encode("utf-8", "surrogatepass")
+
+
+def decode(data: bytes) -> Any:
+    """Inverse of ``encode``; tagged objects come back as their models"""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8", "surrogatepass")
+    return _DECODER.decode(data)
+
+
+# Codec used by ``pack``; readers of packed data should record and pass it back
+BINARY_CODEC = "msgpack" if msgpack is not None else "json"
+
+
+def pack(value: Any) -> bytes:
+    """Compact binary encoding: msgpack when it is installed, otherwise ``encode``"""
+    if msgpack is not None:
+        return msgpack.packb(value, default=_default, use_bin_type=True, unicode_errors="surrogatepass")
+    return encode(value)
+
+
+def unpack(data: bytes, codec: str = BINARY_CODEC) -> Any:
+    """Inverse of ``pack`` for data written with ``codec``"""
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is required to read this data")
+        return msgpack.unpackb(data, object_hook=_object_hook, raw=False, strict_map_key=False,
+                               unicode_errors="surrogatepass")
+    return decode(data)
@@ -0,0 +1,207 @@
+"""
+Snapshots of the in-memory session store for warm restarts
+"""
+import os
+import struct
+import asyncio
+import logging
+import tempfile
+from time import monotonic, perf_counter, time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .memory_backend import MemoryBackend
+from .memory_store import InMemoryStore, memory_store
+from .serialization import BINARY_CODEC, pack, unpack
+
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, a one-byte version, a one-byte codec length and the
+# codec name, then records of a 4-byte big-endian length followed by one
+# packed session: [session_id, [[key, wall_deadline | None, is_log, size, value], ...]]
+MAGIC = b"CHATSNAP"
+VERSION = 1
+_LENGTH = struct.Struct(">I")
+
+
+def _records(store: InMemoryStore) -> Iterator[bytes]:
+    now_wall, now_mono = time(), monotonic()
+    for session_id, entries in store.export_sessions():
+        if not entries:
+            continue
+        yield pack([session_id, [
+            # Monotonic deadlines mean nothing to another process; store wall-clock
+            [key, None if deadline == float("inf") else now_wall + (deadline - now_mono), is_log, size, value]
+            for key, deadline, is_log, size, value in entries
+        ]])
+
+
+def write_snapshot(store: InMemoryStore, path: str) -> Tuple[int, int]:
+    """Write every live session to ``path`` atomically and return ``(sessions, bytes)``
+
+    The snapshot goes to a temporary file in the same directory, is fsynced
+    and then renamed over ``path``, so readers see the old or new snapshot
+    and never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    codec = BINARY_CODEC.encode("ascii")
+    sessions = 0
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb", buffering=1024 * 1024) as f:
+            f.write(MAGIC + bytes((VERSION, len(codec))) + codec)
+            for record in _records(store):
+                f.write(_LENGTH.pack(len(record)))
+                f.write(record)
+                sessions += 1
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+    return sessions, size
+
+
+def read_snapshot(path: str) -> Iterator[Any]:
+    """Yield the decoded session records of a snapshot"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"Not a session snapshot: {path}")
+    offset = len(MAGIC)
+    version, codec_length = data[offset], data[offset + 1]
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    offset += 2
+    codec = data[offset:offset + codec_length].decode("ascii")
+    offset += codec_length
+
+    view = memoryview(data)
+    end = len(data)
+    while offset < end:
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > end:
+            raise ValueError(f"Truncated snapshot: {path}")
+        yield unpack(view[offset:offset + length], codec)
+        offset += length
+
+
+def restore_snapshot(store: InMemoryStore, path: str) -> Dict[str, Any]:
+    """Load a snapshot into ``store``, skipping entries that have expired since it was taken"""
+    start = perf_counter()
+    now_wall, now_mono = time(), monotonic()
+    sessions = entries = skipped = 0
+    for session_id, records in read_snapshot(path):
+        live = []
+        for key, deadline, is_log, size, value in records:
+            if deadline is None:
+                live.append((key, float("inf"), is_log, size, value))
+            elif deadline > now_wall:
+                live.append((key, now_mono + (deadline - now_wall), is_log, size, value))
+            else:
+                skipped += 1
+        if live:
+            store.load_session(session_id, live)
+            sessions += 1
+            entries += len(live)
+    return {
+        "sessions": sessions,
+        "entries": entries,
+        "skipped_expired": skipped,
+        "seconds": round(perf_counter() - start, 3)
+    }
+
+
+class SnapshotManager:
+    """Restores the store on startup and snapshots it periodically and on shutdown"""
+
+    def __init__(self, store: MemoryBackend, path: Optional[str], interval: float = 300.0):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.snapshots = 0
+        self.last_snapshot: Optional[Dict[str, Any]] = None
+        self.last_restore: Optional[Dict[str, Any]] = None
+
+    @property
+    def enabled(self) -> bool:
+        # Durable backends already survive restarts
+        return bool(self.path) and isinstance(self.store, InMemoryStore)
+
+    def restore(self) -> Optional[Dict[str, Any]]:
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+        try:
+            self.last_restore = restore_snapshot(self.store, self.path)
+        except (OSError, ValueError):
+            logger.exception("Could not restore session snapshot from %s", self.path)
+            return None
+        logger.info("Restored session snapshot: %s", self.last_restore)
+        return self.last_restore
+
+    def save(self) -> Dict[str, Any]:
+        start = perf_counter()
+        sessions, size = write_snapshot(self.store, self.path)
+        self.snapshots += 1
+        self.last_snapshot = {
+            "sessions": sessions,
+            "bytes": size,
+            "seconds": round(perf_counter() - start, 3),
+            "taken_at": time()
+        }
+        return self.last_snapshot
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception:
+                logger.exception("Session snapshot failed")
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and take a final snapshot"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            await asyncio.to_thread(self.save)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval_seconds": self.interval,
+            "snapshots": self.snapshots,
+            "last_snapshot": self.last_snapshot,
+            "last_restore": self.last_restore
+        }
+
+
+memory_snapshots = SnapshotManager(
+    memory_store,
+    path=os.getenv("CHAT_SNAPSHOT_PATH") or None,
+    interval=float(os.getenv("CHAT_SNAPSHOT_INTERVAL", "300"))
+)
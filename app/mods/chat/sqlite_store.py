@@ -0,0 +1,465 @@
+"""
+SQLite-backed session memory that survives restarts and is shared between workers
+"""
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from threading import Lock
+from time import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from .context_window import message_tokens
+from .conversation_log import ConversationLog
+from .memory_backend import (
+    MemoryBackend, WriteOp, OP_APPEND, OP_CLEAR, OP_CREATE, OP_DELETE, OP_SET
+)
+from .serialization import decode, encode
+
+
+T = TypeVar("T")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    deadline REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_deadline ON sessions (deadline);
+
+CREATE TABLE IF NOT EXISTS entries (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB,
+    length INTEGER NOT NULL DEFAULT 0,
+    deadline REAL NOT NULL,
+    PRIMARY KEY (session_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_deadline ON entries (deadline);
+
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    prefix INTEGER NOT NULL DEFAULT 0,
+    value BLOB NOT NULL,
+    PRIMARY KEY (session_id, key, seq)
+) WITHOUT ROWID;
+"""
+# ``prefix`` is the token total of the messages before each one. Token
+# estimates are positive, so it grows with ``seq`` and a window's first
+# message is one index seek away. Created after ``_migrate`` has added the
+# column to databases from before it existed.
+PREFIX_INDEX = "CREATE INDEX IF NOT EXISTS messages_prefix ON messages (session_id, key, prefix)"
+
+# A session's deadline is never earlier than any of its entries', so an
+# expired session only holds expired entries.
+TOUCH_SESSION = """
+INSERT INTO sessions (session_id, deadline) VALUES (?, ?)
+ON CONFLICT (session_id) DO UPDATE SET deadline = max(deadline, excluded.deadline)
+"""
+PUT_VALUE = "INSERT OR REPLACE INTO entries (session_id, key, value, length, deadline) VALUES (?, ?, ?, 0, ?)"
+PUT_LOG = """
+INSERT INTO entries (session_id, key, value, length, deadline) VALUES (?, ?, NULL, ?, ?)
+ON CONFLICT (session_id, key) DO UPDATE
+SET value = NULL, length = excluded.length, deadline = excluded.deadline
+"""
+GET_ENTRY = "SELECT value, length, deadline FROM entries WHERE session_id = ? AND key = ?"
+INSERT_MESSAGE = "INSERT INTO messages (session_id, key, seq, tokens, prefix, value) VALUES (?, ?, ?, ?, ?, ?)"
+READ_MESSAGES = "SELECT value FROM messages WHERE session_id = ? AND key = ? AND seq >= ? AND seq < ? ORDER BY seq"
+LOG_TOKENS = "SELECT prefix + tokens FROM messages WHERE session_id = ? AND key = ? AND seq = ?"
+# First message whose suffix fits the budget: the earliest with ``prefix >= total - max_tokens``
+WINDOW_START = "SELECT seq FROM messages WHERE session_id = ? AND key = ? AND prefix >= ? ORDER BY prefix LIMIT 1"
+READ_SESSION_MESSAGES = "SELECT key, value FROM messages WHERE session_id = ? ORDER BY key, seq"
+# One page of sessions with each entry's key and stored bytes, log messages included
+LIST_SESSIONS = """
+WITH page AS (
+    SELECT session_id FROM sessions WHERE session_id > ? AND deadline >= ?
+    ORDER BY session_id LIMIT ?
+)
+SELECT page.session_id, e.key, COALESCE(length(e.value), 0) + COALESCE((
+    SELECT SUM(length(m.value)) FROM messages AS m WHERE m.session_id = e.session_id AND m.key = e.key
+), 0)
+FROM page LEFT JOIN entries AS e ON e.session_id = page.session_id
+ORDER BY page.session_id, e.key
+"""
+DELETE_MESSAGES = "DELETE FROM messages WHERE session_id = ? AND key = ?"
+DELETE_ENTRY = "DELETE FROM entries WHERE session_id = ? AND key = ?"
+EXPIRED_ENTRIES = "SELECT session_id, key FROM entries WHERE deadline < ? ORDER BY deadline LIMIT ?"
+DROP_EMPTY_SESSIONS = """
+DELETE FROM sessions WHERE session_id IN (
+    SELECT session_id FROM sessions AS s WHERE deadline < ?
+    AND NOT EXISTS (SELECT 1 FROM entries AS e WHERE e.session_id = s.session_id)
+    LIMIT ?
+)
+"""
+
+
+class SQLiteStore(MemoryBackend):
+    """Session memory in a SQLite database in WAL mode
+
+    Plain values are stored as encoded blobs. Message logs keep one row per
+    message with its token estimate, so appends insert only the new rows in
+    a single ``executemany`` and token windows are chosen in SQL. Deadlines
+    are wall-clock times so they stay valid across restarts and processes,
+    and are indexed so cleanup only visits expired rows.
+
+    One connection is shared behind a lock; SQL strings are module
+    constants, so sqlite3's statement cache reuses their prepared forms.
+    Reads that take several statements run in one read transaction, so
+    they see a single state of the database even with other processes
+    writing to it.
+    """
+
+    def __init__(self, path: str = "chat_memory.db", default_ttl: int = 3600):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.execute(PREFIX_INDEX)
+        self.expired_entries = 0
+
+    def _migrate(self) -> None:
+        """Add and fill ``messages.prefix`` in databases created before it"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if "prefix" in columns:
+            return
+        with self._transaction() as conn:
+            conn.execute("ALTER TABLE messages ADD COLUMN prefix INTEGER NOT NULL DEFAULT 0")
+            updates = []
+            log, prefix = None, 0
+            for session_id, key, seq, tokens in conn.execute(
+                "SELECT session_id, key, seq, tokens FROM messages ORDER BY session_id, key, seq"
+            ):
+                if (session_id, key) != log:
+                    log, prefix = (session_id, key), 0
+                updates.append((prefix, session_id, key, seq))
+                prefix += tokens
+            conn.executemany("UPDATE messages SET prefix = ? WHERE session_id = ? AND key = ? AND seq = ?", updates)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @contextmanager
+    def _snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Hold the lock and one read transaction across several statements"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _deadline(self, ttl_seconds: Optional[float], now: float) -> float:
+        if ttl_seconds is None:
+            ttl_seconds = self.default_ttl
+        return now + ttl_seconds
+
+    def _live_entry(self, conn: sqlite3.Connection, session_id: str, key: str,
+                    now: float) -> Optional[Tuple[Optional[bytes], int, float]]:
+        row = conn.execute(GET_ENTRY, (session_id, key)).fetchone()
+        if row is None or now > row[2]:
+            return None
+        return row
+
+    def _read_log(self, session_id: str, key: str,
+                  select: Callable[[sqlite3.Connection, int], T]) -> Tuple[Optional[T], Optional[ConversationLog]]:
+        """Read a log in the same snapshot as its entry
+
+        Returns ``(select(conn, length), None)`` for a stored log,
+        ``(None, log)`` for a stored list, else ``(None, None)``.
+        """
+        with self._snapshot() as conn:
+            row = self._live_entry(conn, session_id, key, time())
+            if row is None:
+                return None, None
+            if row[0] is None:
+                return select(conn, row[1]), None
+        value = decode(row[0])
+        if isinstance(value, list):
+            return None, ConversationLog(value)
+        return None, None
+
+    def _rows(self, conn: sqlite3.Connection, session_id: str, key: str, start: int, end: int) -> List[Tuple[bytes]]:
+        return conn.execute(READ_MESSAGES, (session_id, key, start, end)).fetchall()
+
+    def _window_rows(self, conn: sqlite3.Connection, session_id: str, key: str, length: int,
+                     max_tokens: int, start: int) -> List[Tuple[bytes]]:
+        """Rows of the newest messages at or after ``start`` that fit in ``max_tokens``"""
+        if length == 0:
+            return []
+        total = conn.execute(LOG_TOKENS, (session_id, key, length - 1)).fetchone()[0]
+        found = conn.execute(WINDOW_START, (session_id, key, total - max_tokens)).fetchone()
+        first = length if found is None else found[0]
+        return self._rows(conn, session_id, key, max(first, start), length)
+
+    def _create_in(self, conn: sqlite3.Connection, session_id: str, now: float) -> None:
+        self._clear_in(conn, session_id)
+        conn.execute("INSERT INTO sessions (session_id, deadline) VALUES (?, ?)",
+                     (session_id, now + self.default_ttl))
+
+    def _put_in(self, conn: sqlite3.Connection, session_id: str, key: str, data: bytes,
+                deadline: float, now: float) -> None:
+        conn.execute(DELETE_MESSAGES, (session_id, key))
+        conn.execute(PUT_VALUE, (session_id, key, data, deadline))
+        conn.execute(TOUCH_SESSION, (session_id, max(deadline, now + self.default_ttl)))
+
+    def _append_in(self, conn: sqlite3.Connection, session_id: str, key: str,
+                   encoded: List[Tuple[int, bytes]], deadline: float, now: float) -> int:
+        row = self._live_entry(conn, session_id, key, now)
+        length = prefix = 0
+        if row is None:
+            conn.execute(DELETE_MESSAGES, (session_id, key))
+        elif row[0] is not None:
+            existing = decode(row[0])
+            if isinstance(existing, list) and existing:
+                encoded = [(message_tokens(message), encode(message)) for message in existing] + encoded
+        else:
+            length = row[1]
+            if length:
+                prefix = conn.execute(LOG_TOKENS, (session_id, key, length - 1)).fetchone()[0]
+
+        rows = []
+        for i, (tokens, data) in enumerate(encoded):
+            rows.append((session_id, key, length + i, tokens, prefix, data))
+            prefix += tokens
+        conn.executemany(INSERT_MESSAGE, rows)
+        length += len(encoded)
+        conn.execute(PUT_LOG, (session_id, key, length, deadline))
+        conn.execute(TOUCH_SESSION, (session_id, max(deadline, now + self.default_ttl)))
+        return length
+
+    def _delete_in(self, conn: sqlite3.Connection, session_id: str, key: str) -> bool:
+        conn.execute(DELETE_MESSAGES, (session_id, key))
+        return conn.execute(DELETE_ENTRY, (session_id, key)).rowcount > 0
+
+    def _clear_in(self, conn: sqlite3.Connection, session_id: str) -> bool:
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        entries = conn.execute("DELETE FROM entries WHERE session_id = ?", (session_id,)).rowcount
+        sessions = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+        return bool(entries or sessions)
+
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        with self._transaction() as conn:
+            self._create_in(conn, session_id, time())
+        return session_id
+
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Store a value in session memory. ``metadata`` is not persisted."""
+        data = encode(value)
+        now = time()
+        with self._transaction() as conn:
+            self._put_in(conn, session_id, key, data, self._deadline(ttl_seconds, now), now)
+
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        """Retrieve a value from session memory"""
+        with self._snapshot() as conn:
+            row = self._live_entry(conn, session_id, key, time())
+            if row is None:
+                return None
+            if row[0] is None:
+                rows = self._rows(conn, session_id, key, 0, row[1])
+                return [decode(data) for data, in rows]
+        return decode(row[0])
+
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Append messages to a session's log and refresh its TTL
+
+        A plain list stored under ``key`` is moved into message rows on
+        first append. Returns the log length.
+        """
+        encoded = [(message_tokens(message), encode(message)) for message in messages]
+        now = time()
+        with self._transaction() as conn:
+            return self._append_in(conn, session_id, key, encoded, self._deadline(ttl_seconds, now), now)
+
+    def write_batch(self, ops: List[WriteOp]) -> None:
+        """Apply a batch of writes in a single transaction
+
+        Values are encoded before the transaction starts, so the write lock
+        is held only for the SQL itself.
+        """
+        now = time()
+        prepared = []
+        for op in ops:
+            if op[0] == OP_SET:
+                prepared.append((OP_SET, op[1], op[2], encode(op[3]), self._deadline(op[4], now)))
+            elif op[0] == OP_APPEND:
+                encoded = [(message_tokens(message), encode(message)) for message in op[3]]
+                prepared.append((OP_APPEND, op[1], op[2], encoded, self._deadline(op[4], now)))
+            else:
+                prepared.append(op)
+
+        with self._transaction() as conn:
+            for op in prepared:
+                kind = op[0]
+                if kind == OP_SET:
+                    self._put_in(conn, op[1], op[2], op[3], op[4], now)
+                elif kind == OP_APPEND:
+                    self._append_in(conn, op[1], op[2], op[3], op[4], now)
+                elif kind == OP_DELETE:
+                    self._delete_in(conn, op[1], op[2])
+                elif kind == OP_CLEAR:
+                    self._clear_in(conn, op[1])
+                elif kind == OP_CREATE:
+                    self._create_in(conn, op[1], now)
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        """Read the last ``n`` messages of a session's log, or None if there is none"""
+        rows, log = self._read_log(session_id, key, lambda conn, length: self._rows(
+            conn, session_id, key, 0 if n is None else max(0, length - max(0, n)), length
+        ))
+        if log is not None:
+            return log.tail(n)
+        return None if rows is None else [decode(data) for data, in rows]
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        """Read messages ``[start:end]`` of a session's log"""
+        rows, log = self._read_log(session_id, key, lambda conn, length: self._rows(
+            conn, session_id, key, max(0, start), length if end is None else min(end, length)
+        ))
+        if log is not None:
+            return log.slice(start, end)
+        return None if rows is None else [decode(data) for data, in rows]
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        """Read the newest messages at or after ``start`` that fit in ``max_tokens``
+
+        The first message is found by an index seek on the stored prefix
+        sums, so older messages are never visited.
+        """
+        rows, log = self._read_log(session_id, key, lambda conn, length: self._window_rows(
+            conn, session_id, key, length, max_tokens, max(0, start)
+        ))
+        if log is not None:
+            return log.window(max_tokens, start)
+        return None if rows is None else [decode(data) for data, in rows]
+
+    def log_length(self, session_id: str, key: str) -> int:
+        """Number of messages in a session's log, 0 if there is none"""
+        length, log = self._read_log(session_id, key, lambda conn, length: length)
+        if log is not None:
+            return len(log)
+        return length or 0
+
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        """Get all non-expired entries for a session"""
+        with self._snapshot() as conn:
+            entries = conn.execute(
+                "SELECT key, value FROM entries WHERE session_id = ? AND deadline >= ?",
+                (session_id, time())
+            ).fetchall()
+            logs: Dict[str, List[bytes]] = {}
+            if any(value is None for _, value in entries):
+                for key, data in conn.execute(READ_SESSION_MESSAGES, (session_id,)):
+                    logs.setdefault(key, []).append(data)
+        return {
+            key: [decode(data) for data in logs.get(key, ())] if value is None else decode(value)
+            for key, value in entries
+        }
+
+    def has_session(self, session_id: str) -> bool:
+        """Whether the session holds any non-expired entry, without reading it"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM entries WHERE session_id = ? AND deadline >= ? LIMIT 1", (session_id, time())
+            ).fetchone() is not None
+
+    def delete(self, session_id: str, key: str) -> bool:
+        """Delete a specific key from session memory"""
+        with self._transaction() as conn:
+            return self._delete_in(conn, session_id, key)
+
+    def clear_session(self, session_id: str) -> bool:
+        """Clear all memory for a session"""
+        with self._transaction() as conn:
+            return self._clear_in(conn, session_id)
+
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        """Delete expired entries in one transaction, oldest deadline first
+
+        With ``limit`` set, at most that many entries (and as many emptied
+        sessions) are removed.
+        """
+        now = time()
+        batch = -1 if limit is None else limit
+        with self._transaction() as conn:
+            expired = conn.execute(EXPIRED_ENTRIES, (now, batch)).fetchall()
+            if expired:
+                conn.executemany(DELETE_MESSAGES, expired)
+                conn.executemany(DELETE_ENTRY, expired)
+            conn.execute(DROP_EMPTY_SESSIONS, (now, batch))
+            self.expired_entries += len(expired)
+        return len(expired)
+
+    def has_expired(self) -> bool:
+        """Check whether any entry or empty session is due for cleanup"""
+        now = time()
+        with self._lock:
+            return bool(
+                self._conn.execute("SELECT 1 FROM entries WHERE deadline < ? LIMIT 1", (now,)).fetchone()
+                or self._conn.execute("SELECT 1 FROM sessions WHERE deadline < ? LIMIT 1", (now,)).fetchone()
+            )
+
+    def get_session_count(self) -> int:
+        """Get number of active sessions"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE deadline >= ?", (time(),)
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get database statistics. Counts are SQL aggregates, so they scale with table size."""
+        with self._lock:
+            conn = self._conn
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            messages = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "active_sessions": self.get_session_count(),
+            "total_entries": entries,
+            "total_messages": messages,
+            "total_bytes": page_count * page_size,
+            "expired_entries": self.expired_entries
+        }
+
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of sessions ordered by ID; ``cursor`` is the last ID of the previous page"""
+        with self._lock:
+            rows = self._conn.execute(LIST_SESSIONS, (cursor or "", time(), limit)).fetchall()
+        sessions: List[Dict[str, Any]] = []
+        for session_id, key, size in rows:
+            if not sessions or sessions[-1]["session_id"] != session_id:
+                sessions.append({"session_id": session_id, "entries": 0, "bytes": 0, "keys": []})
+            if key is not None:
+                session = sessions[-1]
+                session["entries"] += 1
+                session["bytes"] += size
+                session["keys"].append(key)
+        next_cursor = sessions[-1]["session_id"] if len(sessions) == limit else None
+        return {"sessions": sessions, "next_cursor": next_cursor}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,155 @@
+"""
+Rolling summaries of older conversation turns
+"""
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
+from .llm_registry import llm_registry, _env_flag
+from .memory_backend import AsyncMemoryStore
+from .async_store import async_memory_store
+
+
+logger = logging.getLogger(__name__)
+
+HISTORY_KEY = "conversation_history"
+SUMMARY_KEY = "conversation_summary"
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+Merge the previous summary (if any) with the new messages into one concise summary.
+Keep names, decisions, requirements, code and file names the user may refer back to.
+Drop greetings and small talk. Reply with the summary text only."""
+
+
+def _format_transcript(messages: List[Any]) -> str:
+    lines = []
+    for message in messages:
+        role = getattr(message, "role", "user")
+        content = getattr(message, "content", message)
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+class ConversationSummarizer:
+    """Compresses old turns of long sessions into a stored summary.
+
+    Once more than ``threshold`` messages sit after the last summarized
+    position, a background task folds everything except the newest
+    ``keep_recent`` messages into the summary stored under
+    ``conversation_summary`` as ``{"content": ..., "upto": index}``. The
+    request path only reads the summary; it never waits on the model.
+    """
+
+    def __init__(self, store: AsyncMemoryStore, enabled: bool = False, threshold: int = 24,
+                 keep_recent: int = 8, model: Optional[str] = None, ttl_seconds: int = 3600):
+        self.store = store
+        self.enabled = enabled
+        self.threshold = threshold
+        self.keep_recent = keep_recent
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._writes: Dict[str, asyncio.Future] = {}
+        self.runs = 0
+        self.failures = 0
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return await self.store.get(session_id, SUMMARY_KEY)
+
+    async def maybe_schedule(self, session_id: str) -> bool:
+        """Start a summarization task for the session if it has grown past the threshold"""
+        if not self.enabled or session_id in self._tasks:
+            return False
+        summary = await self.store.get(session_id, SUMMARY_KEY)
+        upto = summary["upto"] if summary else 0
+        if await self.store.log_length(session_id, HISTORY_KEY) - upto <= self.threshold:
+            return False
+        if session_id in self._tasks:
+            # Another turn scheduled one while the reads above were awaited
+            return False
+
+        task = asyncio.create_task(self._summarize(session_id, summary))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda done: self._forget(session_id, done))
+        return True
+
+    def _forget(self, session_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(session_id) is task:
+            del self._tasks[session_id]
+
+    async def invalidate(self, session_id: str) -> None:
+        """Drop the summary after the session's history was replaced"""
+        task = self._tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+        # A summary write already sent can't be recalled; let it land, then delete it
+        write = self._writes.get(session_id)
+        if write is not None:
+            await asyncio.gather(write, return_exceptions=True)
+        await self.store.expire(session_id, SUMMARY_KEY)
+
+    async def _summarize(self, session_id: str, summary: Optional[Dict[str, Any]]) -> None:
+        upto = summary["upto"] if summary else 0
+        end = await self.store.log_length(session_id, HISTORY_KEY) - self.keep_recent
+        messages = await self.store.read_range(session_id, HISTORY_KEY, upto, end) if end > upto else None
+        if not messages:
+            return
+
+        parts = []
+        if summary:
+            parts.append(f"Previous summary:\n{summary['content']}")
+        parts.append(f"New messages:\n{_format_transcript(messages)}")
+
+        try:
+            llm = llm_registry.get_llm(self.model, temperature=0.2, streaming=False)
+            response = await llm.ainvoke([
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(content="\n\n".join(parts))
+            ])
+        except Exception:
+            self.failures += 1
+            logger.exception("Conversation summary failed for session %s", session_id)
+            return
+
+        # Shielded so cancelling the task can't leave the write half-done; invalidate()
+        # waits for it instead, so its delete always comes after
+        write = asyncio.ensure_future(self.store.set(
+            session_id, SUMMARY_KEY, {"content": response.content, "upto": upto + len(messages)},
+            ttl_seconds=self.ttl_seconds
+        ))
+        self._writes[session_id] = write
+        try:
+            await asyncio.shield(write)
+        finally:
+            if self._writes.get(session_id) is write:
+                del self._writes[session_id]
+        self.runs += 1
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_messages": self.threshold,
+            "keep_recent": self.keep_recent,
+            "pending": len(self._tasks),
+            "runs": self.runs,
+            "failures": self.failures
+        }
+
+
+conversation_summarizer = ConversationSummarizer(
+    async_memory_store,
+    enabled=_env_flag("CHAT_SUMMARY_ENABLED"),
+    threshold=int(os.getenv("CHAT_SUMMARY_THRESHOLD", "24")),
+    keep_recent=int(os.getenv("CHAT_SUMMARY_KEEP_RECENT", "8")),
+    model=os.getenv("CHAT_SUMMARY_MODEL") or None
+)
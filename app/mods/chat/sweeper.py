@@ -0,0 +1,88 @@
+"""
+Background sweeper for expired memory entries
+"""
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+from .memory_backend import MemoryBackend
+from .memory_store import memory_store
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """Periodically removes expired entries from a memory store.
+    
+    Each tick processes at most ``max_batches`` slices of ``batch_size``
+    expiry records, so the store lock is never held long enough to stall
+    request handlers. Slices run in a worker thread, since durable backends
+    do blocking I/O. Anything left over is picked up on the next tick.
+    """
+    
+    def __init__(self, store: MemoryBackend, interval: float = 30.0,
+                 batch_size: int = 500, max_batches: int = 20):
+        self.store = store
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.swept = 0
+    
+    def _sweep_batch(self) -> Tuple[int, bool]:
+        """Clean one slice; returns how many were removed and whether more are due"""
+        return self.store.cleanup_expired(limit=self.batch_size), self.store.has_expired()
+    
+    async def sweep_once(self) -> int:
+        """Run one tick and return how many entries were removed"""
+        cleaned = 0
+        for _ in range(self.max_batches):
+            removed, more = await asyncio.to_thread(self._sweep_batch)
+            cleaned += removed
+            if not more:
+                break
+        self.ticks += 1
+        self.swept += cleaned
+        return cleaned
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep_once()
+            except Exception:
+                logger.exception("Memory sweep failed")
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "max_batches": self.max_batches,
+            "ticks": self.ticks,
+            "swept_entries": self.swept
+        }
+
+
+memory_sweeper = ExpirySweeper(
+    memory_store,
+    interval=float(os.getenv("CHAT_SWEEP_INTERVAL", "30")),
+    batch_size=int(os.getenv("CHAT_SWEEP_BATCH_SIZE", "500")),
+    max_batches=int(os.getenv("CHAT_SWEEP_MAX_BATCHES", "20"))
+)
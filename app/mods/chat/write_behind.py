@@ -0,0 +1,401 @@
+"""
+Write-behind buffering in front of a durable memory backend
+"""
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from .memory_backend import (
+    MemoryBackend, WriteOp, OP_APPEND, OP_CLEAR, OP_CREATE, OP_DELETE, OP_SET
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingSession:
+    """Coalesced writes waiting for one session
+
+    ``reset`` is OP_CLEAR or OP_CREATE when the session is wiped before the
+    key writes apply. Each key holds one ``[kind, payload, ttl, replace]``
+    record; ``replace`` on an append means the key is deleted first.
+    """
+    __slots__ = ("reset", "keys")
+
+    def __init__(self):
+        self.reset: Optional[str] = None
+        self.keys: Dict[str, List[Any]] = {}
+
+    def ops(self, session_id: str) -> List[WriteOp]:
+        ops: List[WriteOp] = []
+        if self.reset is not None:
+            ops.append((self.reset, session_id))
+        for key, (kind, payload, ttl, replace) in self.keys.items():
+            if kind == OP_SET:
+                ops.append((OP_SET, session_id, key, payload, ttl))
+            elif kind == OP_DELETE:
+                ops.append((OP_DELETE, session_id, key))
+            else:
+                if replace:
+                    ops.append((OP_DELETE, session_id, key))
+                ops.append((OP_APPEND, session_id, key, payload, ttl))
+        return ops
+
+
+class WriteBehindStore(MemoryBackend):
+    """Buffers writes in memory and flushes them to ``backend`` in batches.
+
+    Repeated writes to the same ``(session, key)`` are coalesced: a store
+    replaces whatever was pending, appends extend the pending messages, and
+    clearing a session drops its pending key writes. A background task
+    flushes every ``interval`` seconds, or sooner once ``max_pending``
+    writes are queued, running the backend I/O in a worker thread.
+
+    Reads of a session first flush that session's pending writes, so
+    callers always read their own writes. Writes never wait on a flush or
+    read the backend, except where ``delete`` reports whether the key had
+    a value. Other reads go straight to the
+    backend. TTLs are applied when the write is flushed.
+
+    A failed batch is retried one session at a time, so one bad write
+    can't hold back the others. A session whose writes fail
+    ``max_attempts`` flushes in a row has them dropped and logged.
+    """
+
+    def __init__(self, backend: MemoryBackend, interval: float = 1.0, max_pending: int = 500,
+                 max_attempts: int = 3):
+        self.backend = backend
+        self.default_ttl = backend.default_ttl
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        # Consecutive failed flushes per session
+        self._attempts: Dict[str, int] = {}
+        self._pending: "OrderedDict[str, _PendingSession]" = OrderedDict()
+        self._pending_count = 0
+        self._lock = Lock()
+        # Held while a batch is being written, so a session read can't slip
+        # in between a flush taking its writes and the backend applying them.
+        # Reads of sessions outside the in-flight batch never wait on it.
+        self._flush_lock = Lock()
+        self._inflight: frozenset = frozenset()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.writes = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.flush_failures = 0
+        self.dropped_ops = 0
+
+    # Queueing
+
+    def _session(self, session_id: str) -> _PendingSession:
+        """Caller must hold the lock"""
+        pending = self._pending.get(session_id)
+        if pending is None:
+            pending = self._pending[session_id] = _PendingSession()
+        return pending
+
+    def _queue_key(self, session_id: str, key: str, record: List[Any]) -> None:
+        """Caller must hold the lock"""
+        keys = self._session(session_id).keys
+        if key in keys:
+            self.coalesced += 1
+        else:
+            self._pending_count += 1
+        keys[key] = record
+
+    def _enqueue(self, op: WriteOp) -> None:
+        """Merge one write into the pending set. Caller must hold the lock."""
+        kind, session_id = op[0], op[1]
+        if kind in (OP_CLEAR, OP_CREATE):
+            pending = self._session(session_id)
+            self.coalesced += len(pending.keys) + (pending.reset is not None)
+            self._pending_count += 1 - len(pending.keys) - (pending.reset is not None)
+            pending.keys.clear()
+            pending.reset = kind
+        elif kind == OP_SET:
+            self._queue_key(session_id, op[2], [OP_SET, op[3], op[4], False])
+        elif kind == OP_DELETE:
+            self._queue_key(session_id, op[2], [OP_DELETE, None, None, False])
+        elif kind == OP_APPEND:
+            key, messages, ttl = op[2], op[3], op[4]
+            record = self._session(session_id).keys.get(key)
+            if record is None:
+                self._queue_key(session_id, key, [OP_APPEND, list(messages), ttl, False])
+            elif record[0] == OP_APPEND:
+                record[1].extend(messages)
+                record[2] = ttl
+                self.coalesced += 1
+            elif record[0] == OP_SET and isinstance(record[1], list):
+                self._queue_key(session_id, key, [OP_SET, record[1] + list(messages), ttl, False])
+            else:
+                # Appending to a deleted or non-list key starts a fresh log
+                self._queue_key(session_id, key, [OP_APPEND, list(messages), ttl, True])
+        else:
+            raise ValueError(f"Unknown write operation: {kind}")
+
+    def _write(self, op: WriteOp) -> Optional[int]:
+        """Queue ``op``; for an append, returns ``_pending_length`` of its key"""
+        with self._lock:
+            self.writes += 1
+            self._enqueue(op)
+            length = self._pending_length(op[1], op[2]) if op[0] == OP_APPEND else None
+            full = self._pending_count >= self.max_pending
+        if full and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return length
+
+    # Flushing
+
+    def _requeue(self, failed: "OrderedDict[str, _PendingSession]") -> None:
+        """Put failed writes back ahead of newer ones, or drop them once out of attempts"""
+        with self._lock:
+            newer, self._pending = self._pending, OrderedDict()
+            self._pending_count = 0
+            for session_id, pending in failed.items():
+                ops = pending.ops(session_id)
+                attempts = self._attempts.get(session_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(session_id, None)
+                    self.dropped_ops += len(ops)
+                    logger.error("Dropping %d write(s) for session %s after %d failed flushes",
+                                 len(ops), session_id, attempts)
+                    continue
+                self._attempts[session_id] = attempts
+                for op in ops:
+                    self._enqueue(op)
+            for session_id, pending in newer.items():
+                for op in pending.ops(session_id):
+                    self._enqueue(op)
+
+    def _apply(self, batch: "OrderedDict[str, _PendingSession]") -> None:
+        """Write a batch to the backend, requeueing the sessions that failed"""
+        ops: List[WriteOp] = []
+        for session_id, pending in batch.items():
+            ops.extend(pending.ops(session_id))
+        if not ops:
+            return
+        try:
+            self.backend.write_batch(ops)
+        except Exception:
+            self.flush_failures += 1
+            if len(batch) == 1:
+                self._requeue(batch)
+                raise
+            # Find the sessions at fault so the rest still get written
+            failed: "OrderedDict[str, _PendingSession]" = OrderedDict()
+            error: Optional[Exception] = None
+            for session_id, pending in batch.items():
+                session_ops = pending.ops(session_id)
+                try:
+                    self.backend.write_batch(session_ops)
+                except Exception as e:
+                    failed[session_id] = pending
+                    error = e
+                    continue
+                self.flushed_ops += len(session_ops)
+                self._attempts.pop(session_id, None)
+            if failed:
+                self._requeue(failed)
+                raise error
+            self.flushes += 1
+            return
+        self.flushes += 1
+        self.flushed_ops += len(ops)
+        if self._attempts:
+            for session_id in batch:
+                self._attempts.pop(session_id, None)
+
+    def flush(self) -> int:
+        """Write every pending operation to the backend and return how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, OrderedDict()
+                count, self._pending_count = self._pending_count, 0
+                self._inflight = frozenset(batch)
+            try:
+                self._apply(batch)
+            finally:
+                self._inflight = frozenset()
+        return count
+
+    def _flush_session(self, session_id: str) -> None:
+        """Write one session's pending operations before it is read"""
+        if session_id not in self._pending and session_id not in self._inflight:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending.pop(session_id, None)
+                if pending is None:
+                    return
+                self._pending_count -= len(pending.keys) + (pending.reset is not None)
+            self._apply(OrderedDict([(session_id, pending)]))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Write-behind flush failed")
+
+    def start(self) -> None:
+        self.backend.start()
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+        await asyncio.to_thread(self.flush)
+        await self.backend.stop()
+
+    def close(self) -> None:
+        self.flush()
+        self.backend.close()
+
+    # Writes
+
+    def create_session(self, session_id: Optional[str] = None) -> str:
+        """Create a new memory session"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+        self._write((OP_CREATE, session_id))
+        return session_id
+
+    def store(self, session_id: str, key: str, value: Any,
+              ttl_seconds: Optional[int] = None, metadata: Optional[Dict] = None) -> None:
+        """Queue a value for session memory"""
+        self._write((OP_SET, session_id, key, value, ttl_seconds))
+
+    def _pending_length(self, session_id: str, key: str) -> int:
+        """Length of ``key``'s log as far as the buffer knows. Caller must hold the lock.
+
+        Exact when the pending writes replace whatever is stored; when they
+        extend a stored log, only the number of messages queued.
+        """
+        pending = self._pending.get(session_id)
+        record = pending.keys.get(key) if pending is not None else None
+        if record is None or not isinstance(record[1], list):
+            return 0
+        return len(record[1])
+
+    def _pending_exists(self, session_id: str) -> Optional[bool]:
+        """Whether the session exists once pending writes apply; None if that depends on the backend.
+
+        Caller must hold the lock.
+        """
+        if session_id in self._inflight:
+            return True
+        pending = self._pending.get(session_id)
+        if pending is None:
+            return None
+        if any(record[0] != OP_DELETE for record in pending.keys.values()):
+            return True
+        if pending.reset is not None:
+            return pending.reset == OP_CREATE
+        return None
+
+    def append_messages(self, session_id: str, key: str, messages: List[Any],
+                        ttl_seconds: Optional[int] = None) -> int:
+        """Queue messages for a session's log
+
+        The backend isn't read here, so the returned length is exact only if
+        the key was stored or replaced, or its session reset, since the last
+        flush. Otherwise it counts just the messages still queued for the key.
+        """
+        return self._write((OP_APPEND, session_id, key, list(messages), ttl_seconds))
+
+    def delete(self, session_id: str, key: str) -> bool:
+        """Queue a delete; returns whether the key currently has a value"""
+        existed = self.retrieve(session_id, key) is not None
+        self._write((OP_DELETE, session_id, key))
+        return existed
+
+    def clear_session(self, session_id: str) -> bool:
+        """Queue clearing a session; returns whether it currently exists"""
+        with self._lock:
+            existed = self._pending_exists(session_id)
+        if existed is None:
+            existed = self.backend.has_session(session_id)
+        self._write((OP_CLEAR, session_id))
+        return existed
+
+    def write_batch(self, ops: List[WriteOp]) -> None:
+        with self._lock:
+            self.writes += len(ops)
+            for op in ops:
+                self._enqueue(op)
+
+    # Reads
+
+    def retrieve(self, session_id: str, key: str) -> Optional[Any]:
+        self._flush_session(session_id)
+        return self.backend.retrieve(session_id, key)
+
+    def read_tail(self, session_id: str, key: str, n: Optional[int] = None) -> Optional[List[Any]]:
+        self._flush_session(session_id)
+        return self.backend.read_tail(session_id, key, n)
+
+    def read_range(self, session_id: str, key: str, start: int, end: Optional[int] = None) -> Optional[List[Any]]:
+        self._flush_session(session_id)
+        return self.backend.read_range(session_id, key, start, end)
+
+    def read_window(self, session_id: str, key: str, max_tokens: int, start: int = 0) -> Optional[List[Any]]:
+        self._flush_session(session_id)
+        return self.backend.read_window(session_id, key, max_tokens, start)
+
+    def log_length(self, session_id: str, key: str) -> int:
+        self._flush_session(session_id)
+        return self.backend.log_length(session_id, key)
+
+    def get_all(self, session_id: str) -> Dict[str, Any]:
+        self._flush_session(session_id)
+        return self.backend.get_all(session_id)
+
+    def cleanup_expired(self, limit: Optional[int] = None) -> int:
+        return self.backend.cleanup_expired(limit)
+
+    def has_expired(self) -> bool:
+        return self.backend.has_expired()
+
+    def get_session_count(self) -> int:
+        return self.backend.get_session_count()
+
+    def list_sessions(self, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        return self.backend.list_sessions(cursor, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.backend.get_stats()
+        stats["write_behind"] = {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "max_pending": self.max_pending,
+            "pending_sessions": len(self._pending),
+            "pending_ops": self._pending_count,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "flush_failures": self.flush_failures,
+            "dropped_ops": self.dropped_ops
+        }
+        return stats
@@ -0,0 +1,88 @@
+"""
+Compare the legacy is_programming_question implementation with intent.classify_intent.
+
+Run from the repository root:
+
+    python benchmarks/bench_intent.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat.intent import classify_intent  # noqa: E402
+
+
+CORPUS = [
+    "Hello, how are you?",
+    "What did we talk about earlier?",
+    "Can you summarise the plot of Moby Dick in three sentences?",
+    "Thanks, that was really helpful!",
+    "What's the capital of Australia and why isn't it Sydney?",
+    "Create a simple HTML button",
+    "Build a React component for user login",
+    "Make a Python function to calculate fibonacci",
+    "Show me a CSS grid layout",
+    "Write a REST API endpoint",
+    "can you give me code for a todo list app with a frontend and a backend?",
+    "I need files for a landing page with a contact form",
+    "My grandmother's apple pie recipe calls for cinnamon; can I swap it for nutmeg?",
+    "Explain the difference between TCP and UDP like I'm five.",
+    "Generate a full-stack dashboard that shows sales by region",
+    # Long pasted message with no code request
+    "Here are my meeting notes from today, please tidy them up:\n" + (
+        "We discussed the quarterly roadmap, the hiring plan for the support team, "
+        "and the budget for the offsite. Everyone agreed to revisit priorities next week. "
+    ) * 40,
+    # Long pasted stack trace asking for a fix
+    "Why does this fail?\n" + (
+        "Traceback (most recent call last):\n  File \"main.py\", line 12, in <module>\n"
+        "    result = compute(values)\nTypeError: unsupported operand type(s)\n"
+    ) * 30,
+]
+
+
+def legacy_is_programming_question(message: str) -> bool:
+    programming_keywords = [
+        'create', 'build', 'make', 'write', 'generate', 'code',
+        'html', 'css', 'javascript', 'js', 'python', 'react',
+        'component', 'function', 'class', 'button', 'form',
+        'website', 'page', 'app', 'application', 'script'
+    ]
+
+    code_patterns = [
+        r'\b(html|css|js|javascript|python|react|vue|angular)\b',
+        r'\b(create|build|make|write|generate)\s+(a|an)?\s*(button|form|component|page|website|app)',
+        r'\b(show me|give me|can you)\s+(code|example)',
+        r'\bfiles?\s+(for|with)',
+        r'\b(frontend|backend|full.?stack)\b'
+    ]
+
+    message_lower = message.lower()
+    keyword_matches = sum(1 for keyword in programming_keywords if keyword in message_lower)
+    pattern_matches = sum(1 for pattern in code_patterns if re.search(pattern, message_lower))
+    return keyword_matches >= 2 or pattern_matches >= 1
+
+
+def main() -> None:
+    number = 2_000
+    legacy = timeit.timeit(lambda: [legacy_is_programming_question(m) for m in CORPUS], number=number)
+    compiled = timeit.timeit(lambda: [classify_intent(m) for m in CORPUS], number=number)
+    per_message = number * len(CORPUS)
+
+    print(f"messages: {len(CORPUS)}, iterations: {number}")
+    print(f"legacy:   {legacy / per_message * 1e6:7.2f} us/message")
+    print(f"compiled: {compiled / per_message * 1e6:7.2f} us/message")
+
+    print("\nmessage                                             legacy  new    confidence")
+    for message in CORPUS:
+        score = classify_intent(message)
+        preview = message.replace("\n", " ")[:50]
+        print(f"{preview:<50}  {legacy_is_programming_question(message)!s:<6}  "
+              f"{score.is_programming!s:<6} {score.confidence:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare the legacy greedy-regex JSON extraction with json_extract.
+
+Run from the repository root:
+
+    python benchmarks/bench_json_extract.py
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat import json_extract  # noqa: E402
+
+
+def build_response(files: int, file_size: int, fenced: bool = True, trailing: bool = True) -> str:
+    body = "<div class=\"card\">{{ item }}</div>\n" * (file_size // 36)
+    payload = {
+        "description": "Generated dashboard",
+        "files": [
+            {"filename": f"page_{i}.html", "language": "html", "content": body}
+            for i in range(files)
+        ]
+    }
+    content = json.dumps(payload, indent=2)
+    if fenced:
+        content = "Here is the project you asked for:\n\n```json\n" + content + "\n```"
+    if trailing:
+        content += "\n\nLet me know if you want changes to the {layout}."
+    return content
+
+
+def legacy_extract(content: str):
+    match = re.search(r'\{.*\}', content, re.DOTALL)
+    if match:
+        return json.loads(match.group())
+    return None
+
+
+def main() -> None:
+    print(f"orjson available: {json_extract.orjson is not None}")
+    cases = [
+        ("fenced, trailing brace", True, True),
+        ("fenced", True, False),
+        ("bare", False, False),
+        ("bare, trailing brace", False, True),
+    ]
+    for label, fenced, trailing in cases:
+        print(label)
+        for files, file_size in [(3, 2_000), (5, 50_000), (8, 100_000)]:
+            content = build_response(files, file_size, fenced, trailing)
+            expected = json_extract.parse_json_object(content)
+            assert expected is not None and len(expected["files"]) == files
+
+            legacy_ok = _safe(legacy_extract, content) is not None
+
+            number = 20
+            legacy = timeit.timeit(lambda: _safe(legacy_extract, content), number=number) / number
+            extractor = timeit.timeit(lambda: json_extract.parse_json_object(content), number=number) / number
+
+            print(
+                f"  {len(content) / 1024:8.1f} KiB | "
+                f"regex+json.loads {legacy * 1e3:7.2f} ms (parses: {legacy_ok}) | "
+                f"json_extract {extractor * 1e3:7.2f} ms"
+            )
+
+
+def _safe(func, content):
+    try:
+        return func(content)
+    except ValueError:
+        return None
+
+
+if __name__ == "__main__":
+    main()
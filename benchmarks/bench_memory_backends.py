@@ -0,0 +1,109 @@
+"""
+Compare per-operation latency of the in-memory, SQLite and Redis memory backends.
+
+Run from the repository root:
+
+    python benchmarks/bench_memory_backends.py
+
+Redis is included when CHAT_REDIS_URL points at a server; the benchmark
+uses its own key prefix and removes its sessions afterwards.
+
+Each operation is timed individually on a store pre-filled with sessions
+whose histories look like real chat turns. The SQLite database lives in a
+temporary directory, so numbers reflect the local disk with WAL and
+synchronous=NORMAL.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat.memory_store import InMemoryStore  # noqa: E402
+from app.mods.chat.models import ChatMessage  # noqa: E402
+from app.mods.chat.redis_store import RedisStore  # noqa: E402
+from app.mods.chat.sqlite_store import SQLiteStore  # noqa: E402
+
+
+SESSIONS = 1_000
+TURNS_PER_SESSION = 20
+OPS = 2_000
+KEY = "conversation_history"
+
+
+def turn(i: int):
+    return [
+        ChatMessage(role="user", content=f"Question {i}: " + "lorem ipsum " * 20),
+        ChatMessage(role="assistant", content=f"Answer {i}: " + "dolor sit amet " * 60)
+    ]
+
+
+def fill(store) -> list:
+    session_ids = [store.create_session() for _ in range(SESSIONS)]
+    for session_id in session_ids:
+        for i in range(TURNS_PER_SESSION):
+            store.append_messages(session_id, KEY, turn(i), ttl_seconds=3600)
+    return session_ids
+
+
+def timed(op, session_ids, rng) -> list:
+    samples = []
+    for i in range(OPS):
+        session_id = session_ids[rng.randrange(len(session_ids))]
+        start = time.perf_counter_ns()
+        op(session_id, i)
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def report(name: str, samples: list) -> str:
+    samples.sort()
+    p50 = samples[len(samples) // 2] / 1000
+    p99 = samples[int(len(samples) * 0.99)] / 1000
+    return f"{name:>8}: p50 {p50:9.1f} us  p99 {p99:9.1f} us  mean {statistics.mean(samples) / 1000:9.1f} us"
+
+
+def bench(store) -> list:
+    rng = random.Random(0)
+    session_ids = fill(store)
+    operations = {
+        "store": lambda sid, i: store.store(sid, "last_interaction", f"message {i}", ttl_seconds=1800),
+        "retrieve": lambda sid, i: store.retrieve(sid, "last_interaction"),
+        "append": lambda sid, i: store.append_messages(sid, KEY, turn(i), ttl_seconds=3600),
+        "window": lambda sid, i: store.read_window(sid, KEY, 8000),
+        "tail": lambda sid, i: store.read_tail(sid, KEY, 10),
+    }
+    for name, op in operations.items():
+        print(report(name, timed(op, session_ids, rng)))
+    return session_ids
+
+
+def main() -> None:
+    print(f"{SESSIONS} sessions x {TURNS_PER_SESSION} turns, {OPS} timed ops each")
+    print("\nInMemoryStore")
+    bench(InMemoryStore(max_bytes=None, max_sessions=None))
+
+    with tempfile.TemporaryDirectory() as directory:
+        print("\nSQLiteStore (WAL)")
+        store = SQLiteStore(os.path.join(directory, "bench.db"))
+        try:
+            bench(store)
+        finally:
+            store.close()
+
+    url = os.getenv("CHAT_REDIS_URL")
+    if url:
+        print(f"\nRedisStore ({url})")
+        store = RedisStore(url, prefix="chat-bench:")
+        try:
+            for session_id in bench(store):
+                store.clear_session(session_id)
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
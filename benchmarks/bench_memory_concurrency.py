@@ -0,0 +1,69 @@
+"""
+Measure InMemoryStore throughput as worker threads increase, for one shard
+(equivalent to the old single global lock) versus the sharded default.
+
+Run from the repository root:
+
+    python benchmarks/bench_memory_concurrency.py
+
+On a GIL build the threads mostly take turns, so this shows how much lock
+contention costs; on a free-threaded build (python3.13t) it also shows
+parallel scaling.
+"""
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat.memory_store import InMemoryStore  # noqa: E402
+
+
+SESSIONS = 10_000
+OPS_PER_THREAD = 50_000
+
+
+def worker(store: InMemoryStore, session_ids, seed: int, barrier: threading.Barrier) -> None:
+    rng = random.Random(seed)
+    barrier.wait()
+    for i in range(OPS_PER_THREAD):
+        session_id = session_ids[rng.randrange(SESSIONS)]
+        if i % 4 == 0:
+            store.store(session_id, "conversation_history", i, ttl_seconds=3600)
+        else:
+            store.retrieve(session_id, "conversation_history")
+
+
+def run(shard_count: int, threads: int) -> float:
+    store = InMemoryStore(shard_count=shard_count)
+    session_ids = [store.create_session() for _ in range(SESSIONS)]
+    barrier = threading.Barrier(threads + 1)
+    pool = [
+        threading.Thread(target=worker, args=(store, session_ids, seed, barrier))
+        for seed in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return threads * OPS_PER_THREAD / elapsed
+
+
+def main() -> None:
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"free-threaded build: {free_threaded}")
+    print(f"{'threads':>7} | {'1 shard ops/s':>14} | {'16 shards ops/s':>15} | speedup")
+    for threads in (1, 2, 4, 8, 16):
+        single = run(1, threads)
+        sharded = run(16, threads)
+        print(f"{threads:>7} | {single:>14,.0f} | {sharded:>15,.0f} | {sharded / single:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure memory per stored message: ChatMessage objects vs the packed log.
+
+Run from the repository root:
+
+    python benchmarks/bench_message_memory.py [messages]
+
+"objects" keeps every message as a ChatMessage in a list, which is how
+histories were held before the packed log. "packed" appends the same
+messages to a ConversationLog. Allocations are counted with tracemalloc,
+so content strings are included in both. Reading the newest window is
+timed too, since the packed log rebuilds ChatMessage objects on read.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat.conversation_log import ConversationLog  # noqa: E402
+from app.mods.chat.models import ChatMessage  # noqa: E402
+
+
+WORDS = ["the", "session", "memory", "function", "return", "value", "error", "request", "model", "token"]
+WINDOW_TOKENS = 8000
+
+
+def messages(count: int):
+    rng = random.Random(0)
+    for i in range(count):
+        # Short questions, longer answers, like chat_stream stores them
+        words = rng.randint(5, 30) if i % 2 == 0 else rng.randint(40, 200)
+        yield ChatMessage(
+            role="user" if i % 2 == 0 else "assistant",
+            content=" ".join(rng.choice(WORDS) for _ in range(words))
+        )
+
+
+def measure(build, count: int):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build(messages(count))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held, used
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"messages: {count:,}")
+
+    content = sum(len(message.content.encode("utf-8")) for message in messages(count))
+    print(f"content: {content / count:8.1f} bytes/message of UTF-8 text")
+
+    objects, objects_bytes = measure(list, count)
+    packed, packed_bytes = measure(ConversationLog, count)
+    print(f"objects: {objects_bytes / count:8.1f} bytes/message  {objects_bytes / 1e6:7.1f} MB")
+    print(f"packed:  {packed_bytes / count:8.1f} bytes/message  {packed_bytes / 1e6:7.1f} MB"
+          f"  ({objects_bytes / packed_bytes:.1f}x smaller)")
+
+    start = time.perf_counter()
+    window = packed.window(WINDOW_TOKENS)
+    elapsed = time.perf_counter() - start
+    print(f"window:  {elapsed * 1e6:8.0f} us for the newest {len(window)} messages")
+
+    assert window == objects[len(objects) - len(window):]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure snapshot write and warm-restore time for a large in-memory store.
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py [sessions]
+
+Each session holds a short conversation log and a last_interaction value,
+the same shape chat_stream writes. One in ten sessions also gets an entry
+that has expired by the time the snapshot is written, which must be left
+out. Packing uses msgpack when it is installed and JSON otherwise; the
+codec is printed.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.mods.chat.memory_store import InMemoryStore  # noqa: E402
+from app.mods.chat.models import ChatMessage  # noqa: E402
+from app.mods.chat.serialization import BINARY_CODEC  # noqa: E402
+from app.mods.chat.snapshot import restore_snapshot, write_snapshot  # noqa: E402
+
+
+TURNS_PER_SESSION = 3
+KEY = "conversation_history"
+
+
+def fill(store: InMemoryStore, sessions: int) -> None:
+    for i in range(sessions):
+        session_id = f"session-{i:07d}"
+        for turn in range(TURNS_PER_SESSION):
+            store.append_messages(session_id, KEY, [
+                ChatMessage(role="user", content=f"Question {turn} in session {i}"),
+                ChatMessage(role="assistant", content=f"Answer {turn}: " + "lorem ipsum " * 15)
+            ], ttl_seconds=3600)
+        store.store(session_id, "last_interaction", f"Question {TURNS_PER_SESSION - 1}", ttl_seconds=1800)
+        if i % 10 == 0:
+            store.store(session_id, "stale", "expired", ttl_seconds=0.001)
+
+
+def main() -> None:
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"codec: {BINARY_CODEC}, sessions: {sessions:,}, messages per session: {TURNS_PER_SESSION * 2}")
+
+    source = InMemoryStore(max_bytes=None, max_sessions=None)
+    start = time.perf_counter()
+    fill(source, sessions)
+    print(f"fill:    {time.perf_counter() - start:7.2f} s")
+    time.sleep(0.01)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.snap")
+        start = time.perf_counter()
+        written, size = write_snapshot(source, path)
+        print(f"write:   {time.perf_counter() - start:7.2f} s  {written:,} sessions, {size / 1e6:.1f} MB")
+
+        target = InMemoryStore(max_bytes=None, max_sessions=None)
+        result = restore_snapshot(target, path)
+        print(f"restore: {result['seconds']:7.2f} s  {result['sessions']:,} sessions, "
+              f"{result['entries']:,} entries, {result['skipped_expired']:,} expired skipped")
+
+    assert target.get_session_count() == sessions
+    assert target.read_tail("session-0000000", KEY) == source.read_tail("session-0000000", KEY)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from app.mods.chat.affinity import HYDRATED_KEY, AffinityStore, HashRing, SessionAffinity
+from app.mods.chat.memory_store import InMemoryStore
+
+
+class SlowShared(InMemoryStore):
+    """Pauses inside get_all so a write can race the hydration"""
+
+    def __init__(self):
+        super().__init__()
+        self.loading = threading.Event()
+
+    def get_all(self, session_id):
+        result = super().get_all(session_id)
+        self.loading.set()
+        time.sleep(0.05)
+        return result
+
+
+def _store(shared, local=None):
+    return AffinityStore(local or InMemoryStore(), shared, SessionAffinity(HashRing(["a"]), "a"))
+
+
+def test_append_during_hydration_is_not_lost():
+    shared = SlowShared()
+    shared.append_messages("s", "history", ["one"])
+    store = _store(shared)
+
+    reader = threading.Thread(target=store.read_tail, args=("s", "history"))
+    reader.start()
+    shared.loading.wait()
+    store.append_messages("s", "history", ["two"])
+    reader.join()
+
+    assert store.read_tail("s", "history") == ["one", "two"]
+    assert shared.read_tail("s", "history") == ["one", "two"]
+
+
+def test_marker_outlives_what_was_written():
+    store = _store(InMemoryStore(default_ttl=1), InMemoryStore(default_ttl=1))
+    session_id = store.create_session()
+    store.append_messages(session_id, "history", ["one"], ttl_seconds=60)
+    time.sleep(1.1)
+
+    assert store.local.retrieve(session_id, HYDRATED_KEY) is True
+    assert store.read_tail(session_id, "history") == ["one"]
+    assert store.hydrations == 0
+
+
+def test_near_cache_is_turned_off_under_affinity(monkeypatch, caplog):
+    pytest.importorskip("redis")
+    from app.mods.chat import affinity
+    from app.mods.chat.memory_store import create_memory_store
+
+    monkeypatch.setattr(affinity, "session_affinity", SessionAffinity(HashRing(["a"]), "a"))
+    monkeypatch.setenv("CHAT_MEMORY_BACKEND", "redis")
+    monkeypatch.setenv("CHAT_NEAR_CACHE", "true")
+    store = create_memory_store()
+    assert isinstance(store, AffinityStore)
+    assert store.shared.publish is False
+    assert "CHAT_NEAR_CACHE is ignored" in caplog.text
+    store.close()
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.libs.chat import internal_v1
+from app.mods.chat import handler
+from app.mods.chat.artifact_store import ArtifactStore, artifact_id
+
+
+def _client(store: ArtifactStore, monkeypatch) -> TestClient:
+    monkeypatch.setattr(handler, "artifact_store", store)
+    app = FastAPI()
+    app.include_router(internal_v1)
+    return TestClient(app)
+
+
+def test_unknown_artifact_is_404_even_with_if_none_match(monkeypatch):
+    client = _client(ArtifactStore(), monkeypatch)
+    missing = artifact_id("never stored")
+    for header in ("*", f'"{missing}"'):
+        response = client.get(f"/api/v1/chat/artifacts/{missing}", headers={"If-None-Match": header})
+        assert response.status_code == 404
+
+
+def test_known_artifact_matches_etag(monkeypatch):
+    store = ArtifactStore()
+    key = store.put("print(1)")
+    client = _client(store, monkeypatch)
+    assert client.get(f"/api/v1/chat/artifacts/{key}", headers={"If-None-Match": "*"}).status_code == 304
+    response = client.get(f"/api/v1/chat/artifacts/{key}")
+    assert response.status_code == 200 and response.text == "print(1)"
+
+
+def test_oversized_content_is_rejected_without_a_directory(tmp_path):
+    assert ArtifactStore(max_bytes=4).put("too large") is None
+    durable = ArtifactStore(max_bytes=4, directory=str(tmp_path))
+    key = durable.put("too large")
+    assert key is not None and durable.get(key) == "too large"
+    assert durable.durable and not ArtifactStore().durable
+
+
+def test_failed_disk_write_is_not_cached(tmp_path, monkeypatch):
+    store = ArtifactStore(directory=str(tmp_path))
+
+    def fail(key, content):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_file", fail)
+    with pytest.raises(OSError):
+        store.put("print(2)")
+    assert not store.contains(artifact_id("print(2)"))
+
+    monkeypatch.undo()
+    key = store.put("print(2)")
+    assert store.get_stats()["dedup_hits"] == 0
+    assert ArtifactStore(directory=str(tmp_path)).get(key) == "print(2)"
@@ -0,0 +1,79 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.libs.chat import internal_v1
+from app.mods.chat import gemini_bot, handler
+from app.mods.chat.artifact_store import ArtifactStore, artifact_id
+from app.mods.chat.async_store import ExecutorAsyncStore
+from app.mods.chat.gemini_bot import GeminiChatBot
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.models import ChatMessage
+
+
+CODE_RESPONSE = json.dumps({
+    "description": "A button",
+    "files": [{"filename": "index.html", "language": "html", "content": "<button>Hi</button>"}]
+})
+
+
+def _client(monkeypatch, replies, artifacts: ArtifactStore) -> TestClient:
+    chat_llm = GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+    code_llm = GenericFakeChatModel(messages=iter([AIMessage(content=CODE_RESPONSE)]))
+    bot = GeminiChatBot(llm=chat_llm, code_generator_llm=code_llm)
+    monkeypatch.setattr(handler, "get_gemini_bot", lambda: bot)
+    monkeypatch.setattr(handler, "async_memory_store", ExecutorAsyncStore(InMemoryStore()))
+    monkeypatch.setattr(handler, "artifact_store", artifacts)
+    monkeypatch.setattr(gemini_bot, "artifact_store", artifacts)
+    app = FastAPI()
+    app.include_router(internal_v1)
+    return TestClient(app)
+
+
+def _history(session_id: str):
+    return handler.async_memory_store.backend.read_tail(session_id, "conversation_history")
+
+
+def test_reply_text_is_stored_without_wire_framing(monkeypatch):
+    client = _client(monkeypatch, ["Hello there, friend"], ArtifactStore())
+    response = client.post("/api/v1/chat/stream", json={"message": "hi", "intent": "chat"})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1] == {"type": "complete", "full_response": "Hello there, friend", "message_count": 2}
+
+    assert _history(response.headers["X-Session-ID"]) == [
+        ChatMessage(role="user", content="hi"),
+        ChatMessage(role="assistant", content="Hello there, friend")
+    ]
+
+
+def test_generated_files_are_stored_as_artifact_references(monkeypatch, tmp_path):
+    client = _client(monkeypatch, [], ArtifactStore(directory=str(tmp_path)))
+    response = client.post("/api/v1/chat/stream", json={"message": "make a button", "intent": "code"})
+    assert response.status_code == 200
+
+    [user, assistant] = _history(response.headers["X-Session-ID"])
+    assert assistant.content == "I've generated 1 file(s) for you: A button"
+    [ref] = assistant.artifacts
+    assert (ref.id, ref.filename, ref.language, ref.content) == \
+        (artifact_id("<button>Hi</button>"), "index.html", "html", None)
+
+
+def test_artifact_content_is_kept_inline_without_a_durable_store(monkeypatch):
+    client = _client(monkeypatch, [], ArtifactStore())
+    response = client.post("/api/v1/chat/stream", json={"message": "make a button", "intent": "code"})
+
+    [ref] = _history(response.headers["X-Session-ID"])[1].artifacts
+    assert ref.content == "<button>Hi</button>"
+
+
+def test_later_turns_append_to_the_stored_log(monkeypatch):
+    client = _client(monkeypatch, ["first reply", "second reply"], ArtifactStore())
+    first = client.post("/api/v1/chat/stream", json={"message": "one", "intent": "chat"})
+    session_id = first.headers["X-Session-ID"]
+    client.post("/api/v1/chat/stream", json={"message": "two", "intent": "chat", "session_id": session_id})
+
+    assert [message.content for message in _history(session_id)] == ["one", "first reply", "two", "second reply"]
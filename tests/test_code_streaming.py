@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.mods.chat.code_generator import CodeGenerator
+from app.mods.chat.code_stream import CodeFileStreamParser, _safe_cut
+from app.mods.chat.llm_registry import LLMRegistry
+
+
+RESPONSE = (
+    '{"description": "Two files", "files": ['
+    '{"filename": "a.py", "language": "python", "content": "print(1)"}, '
+    '{"filename": "b.py", "language": "python", "content": "print(2)"}]}'
+)
+
+
+class CountingChatModel(GenericFakeChatModel):
+    """Streams RESPONSE word by word, counting chunks as they are produced"""
+    produced: int = 0
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            self.produced += 1
+            yield chunk
+
+
+def test_registry_code_generator_client_streams():
+    registry = LLMRegistry(api_key="test-key")
+    llm = registry.get_bot("gemini-test").code_generator.llm
+    assert llm._should_stream(async_api=True)
+
+
+def test_files_arrive_before_the_response_ends():
+    llm = CountingChatModel(messages=iter([AIMessage(content=RESPONSE)]))
+    generator = CodeGenerator(llm=llm)
+
+    async def collect():
+        seen = []
+        async for item in generator.stream_code("two files"):
+            seen.append((getattr(item, "type", None), llm.produced))
+        return seen
+
+    seen = asyncio.run(collect())
+    total = llm.produced
+    first_end = next(produced for kind, produced in seen if kind == "file_end")
+    assert total > 1
+    assert first_end < total
+
+
+ESCAPED_RESPONSE = json.dumps({
+    "description": "Escapes \"and\" surrogates",
+    "files": [
+        {"filename": "a.py", "language": "python",
+         "content": 'print("tab\\t")\n\\u1234 literal \\\\ é ✓ 😀 \ud800 lone \udc00 end'},
+        {"content": "content before filename 😀", "language": "text", "filename": "b.txt"},
+        {"filename": "c.md", "language": "markdown", "content": "", "extra": {"content": "nested"}},
+    ]
+})
+
+
+def _parse(pieces):
+    parser = CodeFileStreamParser()
+    events = []
+    for piece in pieces:
+        events.extend(parser.feed(piece))
+    return parser, events
+
+
+def _assert_matches_json(parser, events, expected):
+    assert parser.finished
+    assert parser.description == expected["description"]
+    assert parser.files == [
+        {"filename": file["filename"], "language": file["language"], "content": file["content"]}
+        for file in expected["files"]
+    ]
+    chunks = {}
+    for event in events:
+        if event.type == "file_chunk":
+            chunks.setdefault(event.index, []).append(event.content)
+    assert ["".join(chunks.get(index, [])) for index in range(len(expected["files"]))] == \
+        [file["content"] for file in expected["files"]]
+    for pieces in chunks.values():
+        for before, after in zip(pieces, pieces[1:]):
+            # A surrogate pair is never split across chunks
+            assert not ("\ud800" <= before[-1] <= "\udbff" and "\udc00" <= after[0] <= "\udfff")
+    assert next(event.type for event in events if event.index == 0) == "file_start"
+
+
+def test_escapes_and_surrogates_survive_every_split_point():
+    expected = json.loads(ESCAPED_RESPONSE)
+    for cut in range(len(ESCAPED_RESPONSE) + 1):
+        parser, events = _parse(["```json\n" + ESCAPED_RESPONSE[:cut], ESCAPED_RESPONSE[cut:] + "\n```"])
+        _assert_matches_json(parser, events, expected)
+
+
+def test_one_character_at_a_time():
+    expected = json.loads(ESCAPED_RESPONSE)
+    parser, events = _parse(ESCAPED_RESPONSE)
+    _assert_matches_json(parser, events, expected)
+    starts = [event.index for event in events if event.type == "file_start"]
+    ends = [event.index for event in events if event.type == "file_end"]
+    assert starts == ends == [0, 1, 2]
+
+
+def test_safe_cut_holds_back_incomplete_escapes():
+    assert _safe_cut("abc\\") == 3
+    assert _safe_cut("abc\\u12") == 3
+    assert _safe_cut("abc\\\\") == 5
+    assert _safe_cut("abc\\ud83d") == 3
+    assert _safe_cut("abc\\ud83d\\ude00") == 15
+    assert _safe_cut("abc\\ud83d\\u") == 3
+    assert _safe_cut("abc\\\\ud83d") == 10
@@ -0,0 +1,36 @@
+from app.mods.chat.context_window import ContextWindow, estimate_tokens, message_tokens
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.models import ChatMessage
+
+
+def _messages():
+    return [ChatMessage(role="user", content="m" * length) for length in (40, 400, 8, 120, 60, 0)]
+
+
+def test_estimate_counts_a_fixed_cost_plus_rounded_up_characters():
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("abcd") == 5
+    assert estimate_tokens("abcde") == 6
+    assert message_tokens("plain") == estimate_tokens("plain")
+
+
+def test_select_keeps_the_newest_messages_that_fit():
+    messages = _messages()
+    tokens = [message_tokens(message) for message in messages]
+
+    assert ContextWindow(max_tokens=10 ** 6).select(messages) == messages
+    assert ContextWindow(max_tokens=sum(tokens[-3:])).select(messages) == messages[-3:]
+    assert ContextWindow(max_tokens=sum(tokens[-3:]) - 1).select(messages) == messages[-2:]
+    assert ContextWindow(max_tokens=0).select(messages) == []
+    assert ContextWindow(max_tokens=100).select([]) == []
+
+
+def test_store_windows_match_list_selection():
+    messages = _messages()
+    store = InMemoryStore()
+    store.append_messages("s", "history", messages)
+
+    for max_tokens in (0, 4, 20, 50, 150, 250, 10 ** 6):
+        assert store.read_window("s", "history", max_tokens) == ContextWindow(max_tokens).select(messages)
+        assert store.read_window("s", "history", max_tokens, start=2) == ContextWindow(max_tokens).select(messages[2:])
+    assert store.read_window("missing", "history", 100) is None
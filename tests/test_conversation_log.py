@@ -0,0 +1,70 @@
+import json
+import random
+
+from app.mods.chat.artifact_store import artifact_id
+from app.mods.chat.context_window import message_tokens
+from app.mods.chat.conversation_log import ConversationLog
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.models import ArtifactRef, ChatMessage
+
+
+def test_lone_surrogates_from_json_round_trip():
+    message = ChatMessage(**json.loads('{"role":"user","content":"a\\ud800b"}'))
+    store = InMemoryStore()
+
+    assert store.append_messages("s", "history", [message]) == 1
+    assert store.read_tail("s", "history") == [message]
+    assert ConversationLog([message]).tail() == [message]
+
+
+def _messages():
+    return [
+        ChatMessage(role="user", content="hello"),
+        ChatMessage(role="assistant", content="héllo ✓ " * 40),
+        ChatMessage(role="tool", content="not a packed role"),
+        {"role": "system", "content": "a plain dict"},
+        ChatMessage(role="assistant", content="", artifacts=[ArtifactRef(id=artifact_id("x"), filename="a.py", language="python")]),
+        ChatMessage(role="system", content="x" * 1000),
+    ]
+
+
+def test_packing_round_trips_every_kind_of_message():
+    messages = _messages()
+    log = ConversationLog(messages)
+
+    assert len(log) == len(messages)
+    assert list(log) == messages
+    assert log.slice(1, 3) == messages[1:3]
+    assert log.slice(-5, 100) == messages
+    assert log.tail(2) == messages[-2:]
+    assert log.tail(0) == [] and log.tail(-1) == []
+    assert log.loose() == [messages[4].artifacts, messages[3], messages[2]]
+    assert log.loose(4) == [messages[4].artifacts]
+
+
+def test_copy_is_independent_of_later_appends():
+    log = ConversationLog(_messages())
+    copied = log.copy()
+    log.append(ChatMessage(role="user", content="later"))
+
+    assert len(copied) == len(log) - 1
+    assert list(copied) == _messages()
+    assert copied.token_count == log.token_count - message_tokens(ChatMessage(role="user", content="later"))
+
+
+def test_windows_match_a_linear_scan():
+    rng = random.Random(7)
+    messages = [
+        ChatMessage(role=rng.choice(("user", "assistant")), content="w" * rng.randrange(0, 400))
+        for _ in range(60)
+    ]
+    log = ConversationLog(messages)
+    tokens = [message_tokens(message) for message in messages]
+    assert log.token_count == sum(tokens)
+
+    for max_tokens in (0, 1, tokens[-1] - 1, tokens[-1], 250, 1000, log.token_count, log.token_count + 1):
+        for start in (0, 10, 59, 60, 80):
+            first = min(start, len(messages))
+            while sum(tokens[first:]) > max_tokens:
+                first += 1
+            assert log.window(max_tokens, start) == messages[first:], (max_tokens, start)
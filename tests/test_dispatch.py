@@ -0,0 +1,31 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from app import dispatch
+from app.mods.chat.affinity import HashRing
+
+
+def test_repeated_response_headers_are_forwarded_separately(monkeypatch):
+    def upstream(request):
+        return httpx.Response(200, headers=[
+            ("set-cookie", "a=1; Path=/"),
+            ("set-cookie", "b=2; Path=/"),
+            ("content-type", "text/plain"),
+        ], stream=httpx.ByteStream(b"ok"))
+
+    monkeypatch.setattr(dispatch.dispatcher, "ring", HashRing(["http://worker"]))
+    monkeypatch.setattr(dispatch.dispatcher, "client", httpx.AsyncClient(transport=httpx.MockTransport(upstream)))
+    response = TestClient(dispatch.app).get("/api/v1/chat/session/s")
+
+    assert response.text == "ok"
+    assert response.headers.get_list("set-cookie") == ["a=1; Path=/", "b=2; Path=/"]
+
+
+def test_dispatcher_imports_without_nodes_and_refuses_to_start(monkeypatch):
+    monkeypatch.setattr(dispatch.dispatcher, "ring", None)
+    try:
+        with TestClient(dispatch.app):
+            raise AssertionError("started without nodes")
+    except RuntimeError as e:
+        assert "CHAT_AFFINITY_NODES" in str(e)
+    assert TestClient(dispatch.app).get("/dispatch/stats").json()["nodes"] == []
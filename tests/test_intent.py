@@ -0,0 +1,75 @@
+import random
+import re
+
+from app.mods.chat.intent import PATTERN_WEIGHT, SATURATION, classify_intent
+
+
+def legacy_counts(message):
+    """The classifier as it was before intent.py, returning its two counts"""
+    programming_keywords = [
+        'create', 'build', 'make', 'write', 'generate', 'code',
+        'html', 'css', 'javascript', 'js', 'python', 'react',
+        'component', 'function', 'class', 'button', 'form',
+        'website', 'page', 'app', 'application', 'script'
+    ]
+    code_patterns = [
+        r'\b(html|css|js|javascript|python|react|vue|angular)\b',
+        r'\b(create|build|make|write|generate)\s+(a|an)?\s*(button|form|component|page|website|app)',
+        r'\b(show me|give me|can you)\s+(code|example)',
+        r'\bfiles?\s+(for|with)',
+        r'\b(frontend|backend|full.?stack)\b'
+    ]
+    message_lower = message.lower()
+    keyword_matches = sum(1 for keyword in programming_keywords if keyword in message_lower)
+    pattern_matches = sum(1 for pattern in code_patterns if re.search(pattern, message_lower))
+    return keyword_matches, pattern_matches
+
+
+CORPUS = [
+    "Hello, how are you?",
+    "Which application do you use?",
+    "Is subscript notation confusing?",
+    "I have a reformatted document and a happy cat.",
+    "Create a simple HTML button",
+    "Build a React component for user login",
+    "can you give me code for a todo list app with a frontend and a backend?",
+    "I need files for a landing page with a contact form",
+    "My grandmother's apple pie recipe calls for cinnamon",
+    "Generate a full-stack dashboard",
+    "JavaScript or TypeScript? transcript, postscript, classroom, makeup, codec",
+    "",
+]
+
+WORDS = [
+    "app", "application", "apples", "happy", "script", "javascript", "subscript", "js", "json",
+    "css", "class", "classic", "create", "recreate", "make", "remake", "build", "code", "decode",
+    "form", "format", "inform", "page", "pages", "button", "python", "react", "reactor", "website",
+    "file", "files", "for", "with", "show", "me", "give", "can", "you", "example", "a", "an",
+    "frontend", "backend", "full", "stack", "full-stack", "vue", "angular", "the", "cat", "?", "\n",
+]
+
+
+def _assert_same(message):
+    keywords, patterns = legacy_counts(message)
+    score = classify_intent(message)
+    assert score.is_programming == (keywords >= 2 or patterns >= 1), message
+    if keywords + PATTERN_WEIGHT * patterns < SATURATION:
+        assert (score.keyword_matches, score.pattern_matches) == (keywords, patterns), message
+
+
+def test_matches_the_legacy_classifier_on_a_fixed_corpus():
+    for message in CORPUS:
+        _assert_same(message)
+
+
+def test_matches_the_legacy_classifier_on_generated_messages():
+    rng = random.Random(7)
+    for _ in range(3000):
+        words = rng.choices(WORDS, k=rng.randint(1, 6))
+        _assert_same(rng.choice([" ", "", "-"]).join(words))
+
+
+def test_substring_keywords_still_count():
+    score = classify_intent("Which application do you use?")
+    assert score.is_programming
+    assert score.keyword_matches == 2
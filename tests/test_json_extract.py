@@ -0,0 +1,34 @@
+import json
+
+from app.mods.chat.json_extract import find_json_object, parse_json_object
+
+
+PAYLOAD = {"files": [{"filename": "a.js", "content": "if (x) { return \"}\"; }"}]}
+
+
+def test_fenced_object():
+    text = "Here you go:\n```json\n" + json.dumps(PAYLOAD) + "\n```\nAnything {else}?"
+    assert parse_json_object(text) == PAYLOAD
+
+
+def test_bare_object_with_braces_in_strings_and_trailing_prose():
+    text = json.dumps(PAYLOAD) + "\n\nTweak the {layout} as needed."
+    (begin, end), value = find_json_object(text)
+    assert value == PAYLOAD
+    assert text[begin:end] == json.dumps(PAYLOAD)
+
+
+def test_many_prose_braces_before_the_object():
+    prose = " ".join(f"use {{slot{i}}} here" for i in range(20))
+    assert parse_json_object(prose + "\n" + json.dumps(PAYLOAD)) == PAYLOAD
+
+
+def test_unclosed_prose_brace_does_not_hide_the_object():
+    text = 'Objects open with { and then "quotes" appear.\n' + json.dumps(PAYLOAD)
+    assert parse_json_object(text) == PAYLOAD
+
+
+def test_no_object():
+    assert parse_json_object("no json here {just prose}") is None
+    assert parse_json_object('{"unterminated": "string}') is None
+    assert parse_json_object("[1, 2, 3]") is None
@@ -0,0 +1,28 @@
+from app.mods.chat.llm_registry import LLMRegistry
+
+
+def test_clients_are_pooled_per_configuration(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "key-one")
+    registry = LLMRegistry(pool_size=2)
+
+    first = registry.get_llm("gemini-1.5-flash", temperature=0.3)
+    second = registry.get_llm("gemini-1.5-flash", temperature=0.3)
+    assert first is not second
+    assert registry.get_llm("gemini-1.5-flash", temperature=0.3) is first
+    assert registry.get_llm("gemini-1.5-flash", temperature=0.7) not in (first, second)
+
+
+def test_rotated_api_key_rebuilds_clients_and_bots(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "key-one")
+    registry = LLMRegistry()
+    llm = registry.get_llm()
+    bot = registry.get_bot()
+    assert registry.get_llm() is llm
+    assert registry.get_bot() is bot
+
+    monkeypatch.setenv("GEMINI_API_KEY", "key-two")
+    rotated = registry.get_llm()
+    assert rotated is not llm
+    assert rotated.google_api_key.get_secret_value() == "key-two"
+    assert registry.get_bot() is not bot
+    assert registry.get_stats()["rotations"] == 1
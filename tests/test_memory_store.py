@@ -0,0 +1,245 @@
+import threading
+import time
+
+import pytest
+
+from app.mods.chat.memory_store import InMemoryStore, MemoryEntry
+
+
+def _assert_empty(store: InMemoryStore) -> None:
+    assert store.get_session_count() == 0
+    stats = store.get_stats()
+    assert stats["total_entries"] == 0
+    assert stats["total_bytes"] == 0
+
+
+def test_lazily_expired_sessions_are_dropped():
+    store = InMemoryStore(shard_count=2)
+    store.store("a", "k", "value", ttl_seconds=0.01)
+    store.append_messages("b", "history", ["hello"], ttl_seconds=0.01)
+    store.store("c", "k", "value", ttl_seconds=0.01)
+    time.sleep(0.02)
+
+    assert store.retrieve("a", "k") is None
+    assert store.read_tail("b", "history") is None
+    assert store.get_all("c") == {}
+    _assert_empty(store)
+    assert store.cleanup_expired() == 0
+
+
+def test_deleting_the_last_key_drops_the_session():
+    store = InMemoryStore(shard_count=1)
+    store.store("a", "x", 1)
+    store.store("a", "y", 2)
+    assert store.delete("a", "x")
+    assert store.get_session_count() == 1
+    assert store.delete("a", "y")
+    _assert_empty(store)
+    assert not store.clear_session("a")
+
+
+def test_empty_sessions_do_not_count_against_the_session_limit():
+    store = InMemoryStore(shard_count=1, max_sessions=2, max_bytes=None)
+    store.store("old", "k", "value", ttl_seconds=0.01)
+    store.store("kept", "k", "value")
+    time.sleep(0.02)
+    assert store.retrieve("old", "k") is None
+
+    store.store("new", "k", "value")
+    assert store.retrieve("kept", "k") == "value"
+    assert store.get_stats()["evicted_sessions"] == 0
+
+
+def test_export_copies_logs_out_of_the_store():
+    store = InMemoryStore(shard_count=1)
+    store.append_messages("a", "history", ["one", "two"])
+    [(session_id, entries)] = list(store.export_sessions())
+    store.append_messages("a", "history", ["three"])
+
+    assert session_id == "a"
+    [(key, _, is_log, _, content)] = entries
+    assert (key, is_log, content) == ("history", True, ["one", "two"])
+
+
+def test_session_limit_evicts_the_least_recently_used_session():
+    store = InMemoryStore(shard_count=1, max_sessions=2, max_bytes=None)
+    store.store("a", "k", "value")
+    store.store("b", "k", "value")
+    assert store.retrieve("a", "k") == "value"
+
+    store.store("c", "k", "value")
+    assert store.get_all("b") == {}
+    assert store.retrieve("a", "k") == "value"
+    assert store.retrieve("c", "k") == "value"
+    assert store.get_stats()["evicted_sessions"] == 1
+
+
+def test_byte_budget_evicts_until_within_budget():
+    probe = InMemoryStore(shard_count=1)
+    probe.store("p", "k", "x" * 900)
+    size = probe.get_stats()["total_bytes"]
+
+    store = InMemoryStore(shard_count=1, max_bytes=3 * size, max_sessions=None)
+    for session_id in ("a", "b", "c"):
+        store.store(session_id, "k", "x" * 900)
+    assert store.get_session_count() == 3
+
+    store.store("d", "k", "y" * 1800)
+    stats = store.get_stats()
+    assert store.get_all("a") == {}
+    assert store.get_all("b") == {}
+    assert store.retrieve("c", "k") == "x" * 900
+    assert stats["evicted_sessions"] == 2
+    assert stats["evicted_bytes"] == 2 * size
+    assert stats["total_bytes"] <= 3 * size
+
+
+def test_session_over_the_byte_budget_is_kept_while_written():
+    store = InMemoryStore(shard_count=1, max_bytes=100, max_sessions=None)
+    store.store("small", "k", "value")
+    store.append_messages("big", "history", ["z" * 500])
+
+    assert store.read_tail("big", "history") == ["z" * 500]
+    assert store.get_all("small") == {}
+    stats = store.get_stats()
+    assert stats["active_sessions"] == 1
+    assert stats["total_bytes"] == stats["shards"][0]["total_bytes"]
+
+
+def test_list_sessions_pages_cover_every_session_once():
+    store = InMemoryStore(shard_count=4)
+    expected = {f"s{i:03d}" for i in range(37)}
+    for session_id in expected:
+        store.store(session_id, "k", session_id)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = store.list_sessions(cursor=cursor, limit=5)
+        assert len(page["sessions"]) <= 5
+        seen.extend(session["session_id"] for session in page["sessions"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(expected)
+    assert pages >= 8
+
+
+def test_list_sessions_rejects_a_malformed_cursor():
+    with pytest.raises(ValueError):
+        InMemoryStore().list_sessions(cursor="nope:abc")
+
+
+def test_stats_counters_track_writes_and_deletes():
+    store = InMemoryStore(shard_count=2)
+    store.store("a", "x", "value")
+    store.store("a", "y", "value")
+    store.append_messages("b", "history", ["one", "two"])
+    stats = store.get_stats()
+    assert (stats["active_sessions"], stats["total_entries"]) == (2, 3)
+    assert stats["total_bytes"] == sum(session["bytes"] for session in store.list_sessions()["sessions"])
+
+    store.store("a", "x", "a longer value than before")
+    assert store.get_stats()["total_entries"] == 3
+    store.delete("a", "y")
+    store.clear_session("b")
+    stats = store.get_stats()
+    assert (stats["active_sessions"], stats["total_entries"]) == (1, 1)
+    assert stats["total_bytes"] == store.list_sessions()["sessions"][0]["bytes"]
+
+
+def test_concurrent_writers_on_many_shards_keep_exact_counters():
+    store = InMemoryStore(shard_count=8)
+
+    def writer(worker: int) -> None:
+        for turn in range(50):
+            store.append_messages(f"w{worker}-{turn % 10}", "history", [f"{worker}:{turn}"])
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = store.get_stats()
+    assert (stats["active_sessions"], stats["total_entries"]) == (80, 80)
+    assert sum(store.log_length(f"w{worker}-{n}", "history") for worker in range(8) for n in range(10)) == 400
+    assert store.read_tail("w3-4", "history") == [f"3:{turn}" for turn in range(4, 50, 10)]
+
+
+def test_limited_cleanup_is_spread_across_shards():
+    store = InMemoryStore(shard_count=4)
+    for index in range(40):
+        store.store(f"s{index}", "k", "value", ttl_seconds=0.01)
+    time.sleep(0.02)
+
+    assert store.has_expired()
+    assert store.cleanup_expired(limit=8) <= 8
+    while store.has_expired():
+        store.cleanup_expired(limit=8)
+    _assert_empty(store)
+
+
+def test_entry_deadlines_are_monotonic():
+    entry = MemoryEntry.create("value", ttl_seconds=10, now=100.0)
+    assert entry.deadline == 110.0 and entry.expires
+    assert not entry.is_expired(110.0) and entry.is_expired(110.5)
+    assert not MemoryEntry.create("value").expires
+
+
+def test_wall_clock_jumps_do_not_expire_entries(monkeypatch):
+    store = InMemoryStore(shard_count=1)
+    store.store("a", "k", "value", ttl_seconds=60)
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+    assert store.retrieve("a", "k") == "value"
+    assert store.cleanup_expired() == 0
+
+
+def test_overwritten_entry_outlives_its_old_deadline():
+    store = InMemoryStore(shard_count=1)
+    store.store("a", "k", "old", ttl_seconds=0.01)
+    store.store("a", "k", "new", ttl_seconds=60)
+    time.sleep(0.02)
+
+    assert store.cleanup_expired() == 0
+    assert store.retrieve("a", "k") == "new"
+
+
+def test_append_extends_stored_lists_and_replaces_other_values():
+    store = InMemoryStore(shard_count=1)
+    store.store("a", "history", ["one", "two"])
+    assert store.append_messages("a", "history", ["three"]) == 3
+    assert store.read_range("a", "history", 1) == ["two", "three"]
+    assert store.read_range("a", "history", 0, 1) == ["one"]
+    assert store.read_tail("a", "history", 2) == ["two", "three"]
+    assert store.get_all("a") == {"history": ["one", "two", "three"]}
+
+    store.store("a", "history", "not a list")
+    assert store.append_messages("a", "history", ["fresh"]) == 1
+    assert store.read_tail("a", "history") == ["fresh"]
+    assert store.log_length("a", "missing") == 0
+
+
+def test_append_refreshes_the_log_ttl():
+    store = InMemoryStore(shard_count=1)
+    store.append_messages("a", "history", ["one"], ttl_seconds=0.05)
+    time.sleep(0.03)
+    store.append_messages("a", "history", ["two"], ttl_seconds=0.05)
+    time.sleep(0.03)
+
+    assert store.cleanup_expired() == 0
+    assert store.read_tail("a", "history") == ["one", "two"]
+
+
+def test_log_bytes_are_accounted_as_it_grows():
+    store = InMemoryStore(shard_count=1)
+    store.append_messages("a", "history", ["x"])
+    before = store.get_stats()["total_bytes"]
+    store.append_messages("a", "history", [{"role": "user", "content": "y" * 1000}])
+
+    after = store.get_stats()["total_bytes"]
+    assert after - before > 1000
+    assert after == store.list_sessions()["sessions"][0]["bytes"]
+    store.clear_session("a")
+    _assert_empty(store)
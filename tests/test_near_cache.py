@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.mods.chat.memory_store import InMemoryStore  # noqa: E402
+from app.mods.chat.near_cache import NearCacheStore  # noqa: E402
+from app.mods.chat.redis_store import RedisStore  # noqa: E402
+
+
+class RacingNearCache(NearCacheStore):
+    """Delivers an invalidation right after the version check, as the pub/sub thread can"""
+
+    def _ensure(self, session_id):
+        super()._ensure(session_id)
+        self.invalidate(session_id, self.remote.session_version(session_id) + 1)
+
+
+def test_read_after_racing_invalidation_falls_through_to_remote():
+    remote = RedisStore(client=fakeredis.FakeRedis())
+    remote.append_messages("s", "history", ["one", "two"])
+    remote.store("s", "last", "two")
+    cache = RacingNearCache(InMemoryStore(), remote)
+
+    assert cache.read_tail("s", "history") == ["one", "two"]
+    assert cache.read_window("s", "history", 1000) == ["one", "two"]
+    assert cache.retrieve("s", "last") == "two"
+    assert cache.get_all("s") == {"history": ["one", "two"], "last": "two"}
+
+
+def test_unknown_sessions_are_not_cached():
+    remote = RedisStore(client=fakeredis.FakeRedis())
+    cache = NearCacheStore(InMemoryStore(), remote)
+
+    assert cache.retrieve("missing", "k") is None
+    assert cache.read_tail("missing", "history") is None
+    assert cache.local.get_session_count() == 0
+
+    remote.store("missing", "k", "now here")
+    assert cache.retrieve("missing", "k") == "now here"
+    assert cache.local.get_session_count() == 1
+
+
+def test_reading_one_session_does_not_wait_for_another():
+    remote = RedisStore(client=fakeredis.FakeRedis())
+    remote.store("a", "k", "a")
+    remote.store("b", "k", "b")
+    cache = NearCacheStore(InMemoryStore(), remote)
+    other = next(f"b{i}" for i in range(1000) if cache._lock(f"b{i}") is not cache._lock("a"))
+    remote.store(other, "k", "other")
+
+    result = []
+    with cache._lock("a"):
+        reader = threading.Thread(target=lambda: result.append(cache.retrieve(other, "k")))
+        reader.start()
+        reader.join(timeout=5)
+    assert result == ["other"]
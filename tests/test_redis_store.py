@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+redis = pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.mods.chat.models import ChatMessage  # noqa: E402
+from app.mods.chat.redis_store import AsyncRedisStore, RedisStore  # noqa: E402
+
+
+class OldServer:
+    """Answers PEXPIRE NX the way Redis before 7.0 does"""
+
+    def pexpire(self, *args, **kwargs):
+        raise redis.ResponseError("wrong number of arguments for 'pexpire' command")
+
+
+def test_start_rejects_servers_without_pexpire_options():
+    store = RedisStore(client=OldServer())
+    with pytest.raises(RuntimeError, match="Redis 7.0"):
+        store.start()
+
+
+def test_start_accepts_current_servers():
+    RedisStore(client=fakeredis.FakeRedis()).start()
+
+
+def test_async_store_reads_and_writes_what_the_sync_store_does():
+    server = fakeredis.FakeServer()
+    store = RedisStore(client=fakeredis.FakeRedis(server=server))
+    messages = [ChatMessage(role="user", content="m" * size) for size in (40, 400, 80, 120)]
+
+    async def exercise():
+        native = AsyncRedisStore(store, client=fakeredis.FakeAsyncRedis(server=server))
+        assert await native.append("s", "history", messages[:2]) == 2
+        assert store.append_messages("s", "history", messages[2:]) == 4
+        for n in (None, 0, 3):
+            assert await native.read_tail("s", "history", n) == store.read_tail("s", "history", n)
+        assert await native.read_range("s", "history", 1, 3) == store.read_range("s", "history", 1, 3)
+        assert await native.read_window("s", "history", 60, 1) == store.read_window("s", "history", 60, 1)
+        await native.set("s", "empty", [])
+        assert store.read_tail("s", "empty") == []
+        assert await native.get("s", "history") == store.retrieve("s", "history") == messages
+        assert await native.expire("s", "history")
+        assert store.log_length("s", "history") == 0
+        assert await native.expire("s")
+        assert store.get_all("s") == {}
+        await native.close()
+
+    asyncio.run(exercise())
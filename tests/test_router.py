@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from app.mods.chat.router import (
+    ROUTE_CHAT, ROUTE_CODE, SEED_CORPUS, HashedNGramStrategy, IntentRouter, KeywordStrategy,
+    RoutingStrategy, build_strategy, create_intent_router
+)
+
+
+class FixedStrategy(RoutingStrategy):
+    def __init__(self, name, route):
+        self.name = name
+        self.route = route
+        self.calls = 0
+
+    def decide(self, message):
+        self.calls += 1
+        return self.route, 1.0 if self.route == ROUTE_CODE else 0.0
+
+
+def test_decisions_are_cached_by_normalized_message():
+    strategy = FixedStrategy("fixed", ROUTE_CODE)
+    router = IntentRouter(strategy)
+
+    first = router.route("Build a  Login page")
+    again = router.route("  build a login PAGE ")
+    assert (first.route, first.cached) == (ROUTE_CODE, False)
+    assert (again.route, again.cached, again.strategy) == (ROUTE_CODE, True, "fixed")
+    assert strategy.calls == 1
+    assert router.get_stats()["cache"] == {"size": 1, "max_size": 4096, "hits": 1, "misses": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    strategy = FixedStrategy("fixed", ROUTE_CHAT)
+    router = IntentRouter(strategy, cache_size=2)
+    router.route("one")
+    router.route("two")
+    router.route("one")
+    router.route("three")
+
+    assert router.route("one").cached
+    assert not router.route("two").cached
+    assert router.get_stats()["cache"]["size"] == 2
+
+
+def test_hint_bypasses_strategy_and_cache():
+    strategy = FixedStrategy("fixed", ROUTE_CHAT)
+    router = IntentRouter(strategy)
+    decision = router.route("hello", hint=ROUTE_CODE)
+
+    assert (decision.route, decision.strategy, decision.confidence) == (ROUTE_CODE, "client_hint", 1.0)
+    assert strategy.calls == 0
+    assert router.route("hello", hint="unknown").route == ROUTE_CHAT
+    assert router.get_stats()["client_hints"] == 1
+
+
+def test_shadow_strategies_never_change_the_route():
+    shadow = [FixedStrategy("agrees", ROUTE_CHAT), FixedStrategy("disagrees", ROUTE_CODE)]
+    router = IntentRouter(FixedStrategy("fixed", ROUTE_CHAT), shadow=shadow)
+    for message in ("a", "b", "a"):
+        assert router.route(message).route == ROUTE_CHAT
+
+    stats = router.get_stats()
+    assert stats["shadow_agreement"] == {"agrees": 2, "disagrees": 0}
+    assert stats["strategies"]["disagrees"]["calls"] == 2
+    assert stats["strategies"]["disagrees"]["code_routes"] == 2
+
+
+def test_ngram_model_fits_the_seed_corpus_and_round_trips(tmp_path):
+    model = HashedNGramStrategy.load()
+    assert all(model.decide(message)[0] == (ROUTE_CODE if label else ROUTE_CHAT)
+               for message, label in SEED_CORPUS)
+
+    path = tmp_path / "router.json"
+    path.write_text(json.dumps(model.to_dict()), encoding="utf-8")
+    loaded = HashedNGramStrategy.load(str(path))
+    for message, _ in SEED_CORPUS:
+        assert loaded.predict_proba(message) == pytest.approx(model.predict_proba(message))
+
+
+def test_lone_surrogates_are_routed():
+    router = IntentRouter(HashedNGramStrategy.load())
+    assert router.route("write code \ud800").route in (ROUTE_CODE, ROUTE_CHAT)
+    assert router.route("write code \ud800").cached
+
+
+def test_strategy_selection_from_environment(monkeypatch):
+    monkeypatch.setenv("CHAT_ROUTER_STRATEGY", "NGram")
+    monkeypatch.setenv("CHAT_ROUTER_SHADOW", "keyword, ngram,")
+    monkeypatch.setenv("CHAT_ROUTER_CACHE_SIZE", "8")
+    router = create_intent_router()
+
+    assert isinstance(router.strategy, HashedNGramStrategy)
+    assert [type(strategy) for strategy in router.shadow] == [KeywordStrategy]
+    assert router.cache_size == 8
+    with pytest.raises(ValueError):
+        build_strategy("regex")
@@ -0,0 +1,22 @@
+import json
+
+from app.mods.chat.models import ChatMessage
+from app.mods.chat.serialization import decode, encode, pack, unpack
+from app.mods.chat.sqlite_store import SQLiteStore
+
+
+SURROGATE = ChatMessage(**json.loads('{"role":"user","content":"a\\ud800b"}'))
+
+
+def test_lone_surrogates_survive_encoding():
+    assert decode(encode([SURROGATE])) == [SURROGATE]
+    assert unpack(pack({"history": [SURROGATE]})) == {"history": [SURROGATE]}
+
+
+def test_lone_surrogates_survive_sqlite(tmp_path):
+    store = SQLiteStore(str(tmp_path / "memory.db"))
+    store.append_messages("s", "history", [SURROGATE])
+    store.store("s", "last", SURROGATE.content)
+    assert store.read_tail("s", "history") == [SURROGATE]
+    assert store.retrieve("s", "last") == SURROGATE.content
+    store.close()
@@ -0,0 +1,67 @@
+import os
+import time
+
+import pytest
+
+from app.mods.chat import snapshot
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.snapshot import SnapshotManager, read_snapshot, restore_snapshot, write_snapshot
+
+
+def test_round_trip_restores_values_and_logs(tmp_path):
+    path = str(tmp_path / "sessions.snap")
+    store = InMemoryStore(shard_count=2)
+    store.append_messages("a", "history", [{"role": "user", "content": "hi \ud83d"}, "plain"])
+    store.store("a", "meta", {"turns": 1})
+    store.store("b", "short", "gone soon", ttl_seconds=0.01)
+    store.store("b", "kept", [1, 2, 3])
+
+    sessions, size = write_snapshot(store, path)
+    assert sessions == 2 and size == os.path.getsize(path)
+    time.sleep(0.02)
+
+    restored = InMemoryStore(shard_count=3)
+    result = restore_snapshot(restored, path)
+    assert (result["sessions"], result["entries"], result["skipped_expired"]) == (2, 3, 1)
+    assert restored.read_tail("a", "history") == [{"role": "user", "content": "hi \ud83d"}, "plain"]
+    assert restored.retrieve("a", "meta") == {"turns": 1}
+    assert restored.get_all("b") == {"kept": [1, 2, 3]}
+
+    restored.append_messages("a", "history", ["after restore"])
+    assert restored.log_length("a", "history") == 3
+
+
+def test_interrupted_write_keeps_the_previous_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.snap")
+    store = InMemoryStore()
+    store.store("a", "k", "first")
+    write_snapshot(store, path)
+    store.store("b", "k", "second")
+
+    records = snapshot._records
+
+    def interrupted(store):
+        for record in records(store):
+            yield record
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(snapshot, "_records", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        write_snapshot(store, path)
+
+    assert os.listdir(tmp_path) == ["sessions.snap"]
+    assert [session_id for session_id, _ in read_snapshot(path)] == ["a"]
+
+
+def test_truncated_snapshot_is_not_restored(tmp_path):
+    path = str(tmp_path / "sessions.snap")
+    store = InMemoryStore()
+    store.store("a", "k", "value")
+    write_snapshot(store, path)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    with pytest.raises(ValueError):
+        list(read_snapshot(path))
+    restored = InMemoryStore()
+    assert SnapshotManager(restored, path).restore() is None
@@ -0,0 +1,116 @@
+import random
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.mods.chat.context_window import message_tokens
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.models import ChatMessage
+from app.mods.chat.serialization import encode
+from app.mods.chat.sqlite_store import SCHEMA, SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "memory.db"))
+    yield store
+    store.close()
+
+
+def test_versions_are_a_gated_capability(store):
+    assert not store.supports_versions
+    with pytest.raises(TypeError, match="does not track session versions"):
+        store.session_version("s")
+    with pytest.raises(TypeError, match="does not track session versions"):
+        store.versioned_write("s", [])
+
+
+def _message(i, size=1):
+    return ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"{i}:" + "x" * size)
+
+
+def test_log_reads_match_the_in_memory_store(store):
+    reference = InMemoryStore()
+    rng = random.Random(3)
+    for i in range(400):
+        key = rng.choice(["history", "other"])
+        op = rng.randrange(10)
+        if op < 6:
+            messages = [_message(i, rng.randint(0, 120)) for _ in range(rng.randint(1, 3))]
+            assert store.append_messages("s", key, messages) == reference.append_messages("s", key, messages)
+        elif op == 6:
+            value = rng.choice([[], [_message(i)], "plain"])
+            store.store("s", key, value)
+            reference.store("s", key, value)
+        elif op == 7:
+            store.delete("s", key)
+            reference.delete("s", key)
+        n, start = rng.randint(-1, 6), rng.randint(0, 8)
+        budget = rng.randint(0, 300)
+        assert store.read_tail("s", key, n) == reference.read_tail("s", key, n)
+        assert store.read_range("s", key, start, start + 3) == reference.read_range("s", key, start, start + 3)
+        assert store.read_window("s", key, budget, start) == reference.read_window("s", key, budget, start)
+        assert store.log_length("s", key) == reference.log_length("s", key)
+    assert store.get_all("s") == reference.get_all("s")
+
+
+class InterruptedStore(SQLiteStore):
+    """Starts a concurrent rewrite of the log between reading its entry and its messages"""
+
+    writer = None
+
+    def _rows(self, conn, session_id, key, start, end):
+        if self.writer is None:
+            self.writer = threading.Thread(
+                target=self.store, args=(session_id, key, [_message(99)])
+            )
+            self.writer.start()
+            self.writer.join(timeout=0.2)
+        return super()._rows(conn, session_id, key, start, end)
+
+
+def test_reads_see_one_state_of_the_log(tmp_path):
+    store = InterruptedStore(str(tmp_path / "memory.db"))
+    store.append_messages("s", "history", [_message(0), _message(1), _message(2)])
+    assert store.read_tail("s", "history") == [_message(0), _message(1), _message(2)]
+    store.writer.join()
+    assert store.read_tail("s", "history") == [_message(99)]
+    store.close()
+
+
+def test_databases_without_prefix_sums_are_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA.replace("    prefix INTEGER NOT NULL DEFAULT 0,\n", ""))
+    conn.execute("INSERT INTO entries VALUES ('s', 'history', NULL, 3, ?)", (time.time() + 60,))
+    conn.executemany("INSERT INTO messages (session_id, key, seq, tokens, value) VALUES ('s', 'history', ?, ?, ?)", [
+        (i, message_tokens(_message(i, 40)), encode(_message(i, 40))) for i in range(3)
+    ])
+    conn.commit()
+    conn.close()
+
+    store = SQLiteStore(path)
+    budget = 2 * message_tokens(_message(0, 40))
+    assert store.read_window("s", "history", budget) == [_message(1, 40), _message(2, 40)]
+    store.append_messages("s", "history", [_message(3, 40)])
+    assert store.read_window("s", "history", budget) == [_message(2, 40), _message(3, 40)]
+    store.close()
+
+
+def test_list_sessions_pages_with_entry_detail(store):
+    for session_id in ("a", "b", "c"):
+        store.store(session_id, "k", "value")
+    store.append_messages("b", "history", [_message(0), _message(1)])
+    store.create_session("d")
+
+    first = store.list_sessions(limit=2)
+    assert [session["session_id"] for session in first["sessions"]] == ["a", "b"]
+    assert first["sessions"][1]["keys"] == ["history", "k"]
+    assert first["sessions"][1]["entries"] == 2
+    assert first["sessions"][1]["bytes"] > first["sessions"][0]["bytes"]
+
+    second = store.list_sessions(first["next_cursor"], limit=2)
+    assert [session["session_id"] for session in second["sessions"]] == ["c", "d"]
+    assert second["sessions"][1] == {"session_id": "d", "entries": 0, "bytes": 0, "keys": []}
@@ -0,0 +1,123 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from app.mods.chat import summarizer
+from app.mods.chat.async_store import ExecutorAsyncStore
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.models import ChatMessage
+from app.mods.chat.summarizer import HISTORY_KEY, SUMMARY_KEY, ConversationSummarizer
+
+
+class FakeLLM:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[-1].content)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content=f"summary {len(self.prompts)}")
+
+
+class GatedStore(ExecutorAsyncStore):
+    """Holds summary writes until ``release`` is set"""
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.writing = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def set(self, session_id, key, value, ttl_seconds=None):
+        self.writing.set()
+        await self.release.wait()
+        await super().set(session_id, key, value, ttl_seconds)
+
+
+def _turns(count: int):
+    return [ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"turn {i}") for i in range(count)]
+
+
+def _summarizer(store, monkeypatch, llm) -> ConversationSummarizer:
+    monkeypatch.setattr(summarizer.llm_registry, "get_llm", lambda *args, **kwargs: llm)
+    return ConversationSummarizer(store, enabled=True, threshold=4, keep_recent=2)
+
+
+async def _drain(instance: ConversationSummarizer) -> None:
+    await asyncio.gather(*instance._tasks.values())
+
+
+def test_older_turns_are_folded_into_the_summary(monkeypatch):
+    llm = FakeLLM()
+
+    async def run():
+        store = ExecutorAsyncStore(InMemoryStore())
+        instance = _summarizer(store, monkeypatch, llm)
+        await store.append("s", HISTORY_KEY, _turns(4))
+        assert not await instance.maybe_schedule("s")
+
+        await store.append("s", HISTORY_KEY, _turns(2))
+        assert await instance.maybe_schedule("s")
+        assert not await instance.maybe_schedule("s")
+        await _drain(instance)
+        first = await instance.get_summary("s")
+
+        await store.append("s", HISTORY_KEY, _turns(5))
+        assert await instance.maybe_schedule("s")
+        await _drain(instance)
+        return first, await instance.get_summary("s"), instance.get_stats()
+
+    first, second, stats = asyncio.run(run())
+    assert first == {"content": "summary 1", "upto": 4}
+    assert second == {"content": "summary 2", "upto": 9}
+    assert "turn 3" in llm.prompts[0] and "turn 4" not in llm.prompts[0]
+    assert llm.prompts[1].startswith("Previous summary:\nsummary 1")
+    assert (stats["runs"], stats["failures"], stats["pending"]) == (2, 0, 0)
+
+
+def test_failed_model_call_stores_nothing(monkeypatch):
+    async def run():
+        store = ExecutorAsyncStore(InMemoryStore())
+        instance = _summarizer(store, monkeypatch, FakeLLM(fail=True))
+        await store.append("s", HISTORY_KEY, _turns(8))
+        assert await instance.maybe_schedule("s")
+        await _drain(instance)
+        return await store.get("s", SUMMARY_KEY), instance.get_stats()
+
+    summary, stats = asyncio.run(run())
+    assert summary is None
+    assert (stats["runs"], stats["failures"]) == (0, 1)
+
+
+def test_invalidate_waits_for_an_in_flight_write_then_deletes_it(monkeypatch):
+    async def run():
+        store = GatedStore(InMemoryStore())
+        instance = _summarizer(store, monkeypatch, FakeLLM())
+        await store.append("s", HISTORY_KEY, _turns(8))
+        assert await instance.maybe_schedule("s")
+        task = instance._tasks["s"]
+        await store.writing.wait()
+
+        invalidated = asyncio.create_task(instance.invalidate("s"))
+        await asyncio.sleep(0)
+        assert task.cancelled() or task.cancelling()
+        assert not invalidated.done()
+
+        store.release.set()
+        await invalidated
+        return await store.get("s", SUMMARY_KEY), instance.get_stats()
+
+    summary, stats = asyncio.run(run())
+    assert summary is None
+    assert stats["pending"] == 0
+
+
+def test_disabled_summarizer_does_nothing(monkeypatch):
+    async def run():
+        store = ExecutorAsyncStore(InMemoryStore())
+        instance = ConversationSummarizer(store, threshold=1)
+        await store.append("s", HISTORY_KEY, _turns(8))
+        return await instance.maybe_schedule("s"), await instance.get_summary("s")
+
+    assert asyncio.run(run()) == (False, None)
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from app.mods.chat.memory_store import InMemoryStore
+from app.mods.chat.sweeper import ExpirySweeper
+
+
+def _expired_store(count: int) -> InMemoryStore:
+    store = InMemoryStore(shard_count=1)
+    for index in range(count):
+        store.store(f"s{index}", "k", "value", ttl_seconds=0.01)
+    store.store("kept", "k", "value")
+    time.sleep(0.02)
+    return store
+
+
+def test_each_tick_is_bounded_by_the_batch_budget():
+    store = _expired_store(25)
+    sweeper = ExpirySweeper(store, batch_size=5, max_batches=2)
+
+    assert asyncio.run(sweeper.sweep_once()) == 10
+    assert asyncio.run(sweeper.sweep_once()) == 10
+    assert asyncio.run(sweeper.sweep_once()) == 5
+    assert asyncio.run(sweeper.sweep_once()) == 0
+    assert store.get_session_count() == 1
+    assert store.retrieve("kept", "k") == "value"
+    assert sweeper.get_stats()["ticks"] == 4
+    assert sweeper.get_stats()["swept_entries"] == 25
+
+
+def test_background_task_sweeps_until_stopped():
+    store = _expired_store(3)
+    sweeper = ExpirySweeper(store, interval=0.01)
+
+    async def run():
+        sweeper.start()
+        assert sweeper.get_stats()["running"]
+        while sweeper.ticks == 0:
+            await asyncio.sleep(0.01)
+        await sweeper.stop()
+
+    asyncio.run(run())
+    assert not sweeper.get_stats()["running"]
+    assert sweeper.swept == 3
+    assert store.get_session_count() == 1
@@ -0,0 +1,85 @@
+import pytest
+
+from app.mods.chat.models import ChatMessage
+from app.mods.chat.sqlite_store import SQLiteStore
+from app.mods.chat.write_behind import WriteBehindStore
+
+
+def _message(text: str) -> ChatMessage:
+    return ChatMessage(role="user", content=text)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WriteBehindStore(SQLiteStore(str(tmp_path / "memory.db")), max_attempts=2)
+    yield store
+    store.close()
+
+
+def test_append_counts_what_the_buffer_knows_without_reading_the_backend(store, monkeypatch):
+    assert store.append_messages("s", "history", [_message("a"), _message("b")]) == 2
+    store.flush()
+
+    def no_reads(*args):
+        raise AssertionError("the append path read the backend")
+
+    monkeypatch.setattr(store.backend, "log_length", no_reads)
+    # Extending a flushed log only counts the queued messages
+    assert store.append_messages("s", "history", [_message("c")]) == 1
+    assert store.append_messages("s", "history", [_message("d")]) == 2
+    # A replaced log is fully buffered, so its length is exact
+    store.store("s", "history", [_message("x")])
+    assert store.append_messages("s", "history", [_message("y")]) == 2
+    monkeypatch.undo()
+    store.flush()
+    assert store.log_length("s", "history") == 2
+
+
+def test_append_does_not_wait_for_a_running_flush(store):
+    with store._flush_lock:
+        assert store.append_messages("s", "history", [_message("a")]) == 1
+
+
+def test_clear_session_checks_existence_cheaply(store, monkeypatch):
+    store.store("s", "k", "value")
+    store.flush()
+    monkeypatch.setattr(store.backend, "get_all", lambda session_id: pytest.fail("read the whole session"))
+    assert store.clear_session("s") is True
+    assert store.clear_session("s") is False
+    assert store.clear_session("missing") is False
+    store.store("t", "k", "value")
+    assert store.clear_session("t") is True
+
+
+def test_poison_write_is_dropped_without_blocking_others(store):
+    store.store("bad", "k", object())
+    store.store("good", "k", "value")
+    with pytest.raises(Exception):
+        store.flush()
+    # The healthy session was written despite the failing one
+    assert store.backend.retrieve("good", "k") == "value"
+
+    with pytest.raises(Exception):
+        store.flush()
+    assert store.get_stats()["write_behind"]["dropped_ops"] == 1
+
+    store.store("bad", "k", "fixed")
+    store.flush()
+    assert store.retrieve("bad", "k") == "fixed"
+
+
+def test_write_behind_is_off_by_default_for_shared_backends(tmp_path, monkeypatch, caplog):
+    from app.mods.chat.memory_store import create_memory_store
+
+    monkeypatch.setenv("CHAT_MEMORY_BACKEND", "sqlite")
+    monkeypatch.setenv("CHAT_SQLITE_PATH", str(tmp_path / "shared.db"))
+    monkeypatch.delenv("CHAT_WRITE_BEHIND", raising=False)
+    store = create_memory_store()
+    assert isinstance(store, SQLiteStore)
+    store.close()
+
+    monkeypatch.setenv("CHAT_WRITE_BEHIND", "true")
+    store = create_memory_store()
+    assert isinstance(store, WriteBehindStore)
+    assert "without session affinity" in caplog.text
+    store.close()